@@ -0,0 +1,262 @@
+import os
+import sys
+import csv
+import fitz  # PyMuPDF
+from multiprocessing import Pool
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.canonicalize import canonicalize_row  # noqa: E402
+from common.compressed import open_output, output_path  # noqa: E402
+from common.offices import office_filter  # noqa: E402
+from common.page_text import PAGE_TEXT_STORE, PageTextStore  # noqa: E402
+from common.retrieval import datetime_retrieved  # noqa: E402
+from common.turnout import turnout_row, write_turnout  # noqa: E402
+from common.validate import TOTALS_COLUMNS, totals_row  # noqa: E402
+
+# Constants
+ELECTION = "2024 GENERAL"
+STATE = "MICHIGAN"
+COUNTY = "WAYNE COUNTY"
+SOURCE_URL = "https://www.waynecounty.com/elected/clerk/election-results.aspx"
+RESULT_STATUS = "UNOFFICIAL"
+DATETIME_RETRIEVED = datetime_retrieved("federal_offices.pdf", "11/19/2024 4:43 PM")  # When common/fetch.py downloaded it; the time in the report footer if it was saved by hand
+
+# Configuration Constants
+INPUT_DIRECTORY = "split_races"  # Directory containing split PDFs
+OUTPUT_FILENAME = "wayne_parsed.csv"
+OUTPUT_COMPRESSION = None  # "gzip" or "zstd" to write the output compressed (.gz / .zst)
+UNMATCHED_FILENAME = "wayne_unmatched.txt"
+TOTALS_FILENAME = "wayne_totals.csv"  # The Total rows, for common/validate.py
+TURNOUT_FILENAME = "wayne_turnout.csv"  # Registered voters and voters cast per precinct and vote mode
+NUM_WORKERS = 4  # Number of parallel processes
+CHUNK_SIZE = 8  # Pages handed to a worker at a time
+OFFICES = None  # Races to parse, as in splitpdf.py; race PDFs left from an earlier, wider split are skipped
+selected_office = office_filter(OFFICES)
+
+# Layout of the precinct canvass pages (in PDF points). Labels sit left of the
+# first number column; the vote mode column starts at MODE_COLUMN_X.
+MODE_COLUMN_X = 135
+COLUMN_TOLERANCE = 6  # How far a number's right edge can be from its column's
+
+# Header columns that aren't candidates
+STATISTICS_COLUMNS = {"Registered Voters", "Voters Cast", "Turnout (%)"}
+SKIPPED_COLUMNS = {"Over Votes", "Under Votes", "Total Votes"}
+WRITEIN_COLUMN = "Write-ins"
+
+
+def sanitize_string(value):
+    """Collapses newlines and repeated whitespace into single spaces."""
+    return " ".join(value.replace("\n", " ").split())
+
+
+def parse_title(text):
+    """
+    Extracts the race name from a "1 <race>" title block, rejoining titles that
+    wrap on a hyphen, e.g. "Vice-\\nPresident".
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    title = lines[0][2:].strip()
+    for line in lines[1:]:
+        title = title + line if title.endswith("-") else f"{title} {line}"
+    return title
+
+
+def parse_header(header):
+    """
+    Splits a candidate column header into (candidate, party).
+    Example:
+        "DEM - Kamala D. Harris / Tim Walz" -> ("Kamala D. Harris / Tim Walz", "DEM")
+    """
+    if header == WRITEIN_COLUMN:
+        return "WRITE-IN", ""
+    party, separator, candidate = header.partition(" - ")
+    if separator and party.isupper():
+        return candidate.strip(), party
+    return header, ""
+
+
+def find_columns(layer, title_block, first_row_y):
+    """Returns [(right edge, header text)] for the rotated column headers under the title."""
+    columns = []
+    for x0, y0, x1, y1, text, *_ in layer.blocks:
+        if y0 <= title_block[1] or y1 > first_row_y or x0 < MODE_COLUMN_X:
+            continue
+        text = sanitize_string(text)
+        if any(c.isalpha() for c in text):
+            columns.append((x1, text))
+    return sorted(columns)
+
+
+def parse_number(text):
+    text = text.replace(",", "")
+    return int(text) if text.isdigit() else None
+
+
+def parse_page_words(layer):
+    """
+    Parses one precinct canvass page into
+    (office, [column headers], [(precinct, vote_mode, {column: votes})]).
+    Blank cells are left out of the text layer entirely, so numbers are matched
+    to their column by x position rather than by order.
+    """
+    blocks = layer.blocks
+    title_block = next((block for block in blocks if block[4].startswith("1 ")), None)
+    if title_block is None:
+        return None, [], []
+    office = parse_title(title_block[4])
+
+    words = [word for word in layer.words if word[1] > title_block[3]]
+    footer_y = min((word[1] for word in words if word[4] == "Printed:"), default=float("inf"))
+    words = [word for word in words if word[1] < footer_y]
+    label_words = [word for word in words if word[2] < MODE_COLUMN_X + 50 and word[0] < 190]
+    if not label_words:
+        return office, [], []
+
+    columns = find_columns(layer, title_block, min(word[1] for word in label_words))
+    if not columns:
+        return office, [], []
+    first_column_x = min(x1 for x1, _ in columns) - 30
+    registered_x = next((x1 for x1, name in columns if name == "Registered Voters"), columns[0][0])
+
+    # Every data row has a Registered Voters number; use those to anchor rows
+    anchors = sorted({round(word[1], 1) for word in words
+                      if abs(word[2] - registered_x) <= COLUMN_TOLERANCE and parse_number(word[4]) is not None})
+
+    rows = []
+    for index, anchor_y in enumerate(anchors):
+        next_y = anchors[index + 1] if index + 1 < len(anchors) else footer_y
+        # Precinct names and "Pre-Process Absentee" wrap onto the lines below the numbers
+        labels = [word for word in words
+                  if anchor_y - 1 <= word[1] < next_y - 1 and word[2] <= first_column_x]
+        precinct = " ".join(word[4] for word in labels if word[0] < MODE_COLUMN_X)
+        vote_mode = " ".join(word[4] for word in labels if word[0] >= MODE_COLUMN_X)
+        if not vote_mode or precinct.startswith("Total") or precinct.startswith("Contest Total"):
+            continue  # County-wide summary rows
+
+        values = {}
+        for word in words:
+            if abs(word[1] - anchor_y) > 1 or word[0] < first_column_x:
+                continue
+            votes = parse_number(word[4])
+            x1, name = min(columns, key=lambda column: abs(column[0] - word[2]))
+            if votes is not None and abs(x1 - word[2]) <= COLUMN_TOLERANCE:
+                values[name] = votes
+        rows.append((precinct, vote_mode, values))
+    return office, [name for _, name in columns], rows
+
+
+_open_documents = {}  # Each worker opens a PDF once and reuses it for every page
+_page_text = None  # Each worker's connection to the page-text store splitpdf.py filled
+
+
+def open_page(pdf_path, page_num):
+    if pdf_path not in _open_documents:
+        _open_documents[pdf_path] = fitz.open(pdf_path)
+    return _open_documents[pdf_path][page_num]
+
+
+def page_text(page):
+    """The page's text layer from the store, so it isn't decoded again (see common/page_text.py)."""
+    global _page_text
+    if _page_text is None:
+        _page_text = PageTextStore(PAGE_TEXT_STORE)
+    return _page_text.page(page)
+
+
+def parse_page(job):
+    """Worker entry point: parses one page and returns (common-schema rows, totals rows, turnout rows, problems)."""
+    pdf_path, page_num = job
+    page = open_page(pdf_path, page_num)
+    try:
+        office, columns, page_rows = parse_page_words(page_text(page))
+    except Exception as e:
+        return [], [], [], [f"Error processing {pdf_path}, page {page_num + 1}: {e}"]
+
+    if office is None:
+        return [], [], [], [f"No race title on {pdf_path}, page {page_num + 1}"]
+
+    candidates = [column for column in columns
+                  if column not in STATISTICS_COLUMNS and column not in SKIPPED_COLUMNS]
+    rows = []
+    totals = []
+    turnout = []
+    for precinct, vote_mode, values in page_rows:
+        # The statistics columns repeat on every race's pages; write_turnout keeps the first
+        if "Registered Voters" in values:
+            turnout.append(turnout_row(ELECTION, STATE, COUNTY, precinct, vote_mode, values["Registered Voters"],
+                                       values.get("Voters Cast", 0), os.path.basename(pdf_path), f"page {page_num + 1}"))
+        if vote_mode == "Total":
+            # Skip "Total" rows, the modes add up to it; keep them for validation
+            totals += [totals_row(STATE, COUNTY, precinct, office, parse_header(column)[0],
+                                  values.get(column, 0), os.path.basename(pdf_path), f"page {page_num + 1}")
+                       for column in candidates]
+            continue
+        for column in candidates:
+            candidate, party = parse_header(column)
+            rows.append({
+                "election": ELECTION,
+                "state": STATE,
+                "county": COUNTY,
+                "precinct": precinct,
+                "office": office,
+                "candidate": candidate,
+                "party": party,
+                "vote_mode": vote_mode,
+                "votes": values.get(column, 0),  # Blank cells are zero
+                "writein": "yes" if column == WRITEIN_COLUMN else "no",
+                "result_status": RESULT_STATUS,
+                "source_url": SOURCE_URL,
+                "source_filename": os.path.basename(pdf_path),
+                "datetime_retrieved": DATETIME_RETRIEVED,
+            })
+    return rows, totals, turnout, []
+
+
+def page_jobs(input_directory):
+    """Lists (pdf path, page index) for every page of every selected race PDF."""
+    jobs = []
+    for pdf_file in sorted(os.listdir(input_directory)):
+        if pdf_file.endswith(".pdf") and selected_office(pdf_file):
+            pdf_path = os.path.join(input_directory, pdf_file)
+            with fitz.open(pdf_path) as doc:
+                jobs += [(pdf_path, page_num) for page_num in range(len(doc))]
+    return jobs
+
+
+def main():
+    csv_columns = ["election", "state", "county", "precinct", "precinct_id", "office", "candidate", "party",
+                   "vote_mode", "votes", "writein", "result_status", "source_url", "source_filename",
+                   "datetime_retrieved"]
+    jobs = page_jobs(INPUT_DIRECTORY)
+    print(f"Parsing {len(jobs)} pages with {NUM_WORKERS} workers...")
+
+    row_count = 0
+    problems = []
+    turnout = []
+    with open_output(OUTPUT_FILENAME, OUTPUT_COMPRESSION) as output_file, \
+            open(TOTALS_FILENAME, "w", newline="") as totals_file:
+        writer = csv.DictWriter(output_file, fieldnames=csv_columns)
+        writer.writeheader()
+        totals_writer = csv.DictWriter(totals_file, fieldnames=TOTALS_COLUMNS)
+        totals_writer.writeheader()
+        # Rows are written as each page comes back, in page order, so memory
+        # stays flat no matter how big the race files get
+        with Pool(NUM_WORKERS) as pool:
+            for rows, totals, page_turnout, page_problems in pool.imap(parse_page, jobs, chunksize=CHUNK_SIZE):
+                writer.writerows(canonicalize_row(row) for row in rows)
+                totals_writer.writerows(totals)
+                turnout += page_turnout
+                row_count += len(rows)
+                problems += page_problems
+
+    if problems:
+        with open(UNMATCHED_FILENAME, "w") as unmatched_file:
+            unmatched_file.write("\n".join(problems) + "\n")
+        print(f"{len(problems)} pages could not be parsed, see {UNMATCHED_FILENAME}")
+    print(f"Wrote {row_count} rows to {output_path(OUTPUT_FILENAME, OUTPUT_COMPRESSION)}")
+    print(f"Wrote turnout for {write_turnout(TURNOUT_FILENAME, turnout)} precinct vote modes to {TURNOUT_FILENAME}")
+
+
+if __name__ == "__main__":
+    main()
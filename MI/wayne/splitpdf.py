@@ -1,10 +1,19 @@
 import fitz  # PyMuPDF
 from PyPDF2 import PdfReader, PdfWriter
 import os
+import sys
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.offices import RaceSections, office_filter, race_filename  # noqa: E402
+from common.page_text import PAGE_TEXT_STORE, PageTextStore  # noqa: E402
 
 # Configuration Constants
 INPUT_PDF = "federal_offices.pdf"
+PAGE_TEXT = PageTextStore(PAGE_TEXT_STORE)  # Each page's text and word boxes, decoded once and kept for the later stages
 OUTPUT_DIRECTORY = "split_races"  # Directory to save the split PDFs
+OFFICES = None  # Races to split, e.g. ["UNITED STATES SENATOR", "REPRESENTATIVE IN CONGRESS"] or the OFFICE_RANKING table; None for all
+selected_office = office_filter(OFFICES)
 # Header information to skip when parsing
 HEADER_KEYWORDS = [
     "Wayne County, Michigan",
@@ -15,13 +24,14 @@ HEADER_KEYWORDS = [
 
 # Open the PDF with fitz for text extraction
 doc = fitz.open(INPUT_PDF)
-split_pages = {}
+sections = RaceSections()
 current_race = None
 
 # Process each page
 for page_num in range(len(doc)):
     page = doc[page_num]
-    text = page.get_text("text")
+    layer = PAGE_TEXT.page(page)
+    text = layer.text
     lines = text.splitlines()
 
     # Skip header lines
@@ -37,9 +47,7 @@ for page_num in range(len(doc)):
             if race_name_parts:  # Save previous race if still collecting
                 race_name = " ".join(race_name_parts).strip()
                 current_race = race_name
-                if current_race not in split_pages:
-                    split_pages[current_race] = []
-                split_pages[current_race].append(page_num)
+                sections.add(current_race, page_num, layer.key)
                 race_name_parts = []  # Reset for the next race
             is_collecting_race = True
             # Remove leading "1"
@@ -58,9 +66,10 @@ for page_num in range(len(doc)):
     if race_name_parts:
         race_name = " ".join(race_name_parts).strip()
         current_race = race_name
-        if current_race not in split_pages:
-            split_pages[current_race] = []
-        split_pages[current_race].append(page_num)
+        sections.add(current_race, page_num, layer.key)
+
+# Titles wrapped differently on different pages ("Vice-" / "President") fold into one race
+sections.report()
 
 # Create output directory
 os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
@@ -68,24 +77,26 @@ os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
 # Split and save the sections
 reader = PdfReader(INPUT_PDF)
 
-for race, pages in split_pages.items():
-    sanitized_race_name = (
-        "".join(c if c.isalnum() or c in " _-" else "_" for c in race)
-        .replace(" ", "_")  # Replace spaces with underscores
-        .replace("__", "_")  # Remove double underscores
-        .strip("_")  # Remove leading and trailing underscores
-    )
+skipped_races = 0
+for race, pages in sections.items():
+    if not selected_office(race):
+        skipped_races += 1
+        continue
 
     # Write the split section to a new PDF
     writer = PdfWriter()
     for page_num in pages:
         writer.add_page(reader.pages[page_num])
 
-    output_path = os.path.join(
-        OUTPUT_DIRECTORY, f"{sanitized_race_name or 'Untitled'}.pdf"
-    )
+    output_path = os.path.join(OUTPUT_DIRECTORY, race_filename(race))
     with open(output_path, "wb") as output_file:
         writer.write(output_file)
     print(f"Saved: {output_path}")
 
+for stale_path in sections.superseded(OUTPUT_DIRECTORY):
+    os.remove(stale_path)
+    print(f"Removed: {stale_path} (an earlier split of the same race)")
+
+if skipped_races:
+    print(f"Skipped {skipped_races} races not in OFFICES.")
 print("Splitting complete.")
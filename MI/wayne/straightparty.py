@@ -0,0 +1,110 @@
+import os
+import sys
+import csv
+import fitz  # PyMuPDF
+from multiprocessing import Pool
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.canonicalize import canonical_party, canonical_vote_mode  # noqa: E402
+from common.precincts import precinct_id  # noqa: E402
+
+# The straight-party pages use the same precinct canvass layout as the races
+from parsepdf import (  # noqa: E402
+    ELECTION, STATE, COUNTY, SOURCE_URL, RESULT_STATUS, DATETIME_RETRIEVED,
+    NUM_WORKERS, CHUNK_SIZE, STATISTICS_COLUMNS, SKIPPED_COLUMNS,
+    sanitize_string, parse_page_words, open_page, page_text,
+)
+
+# Configuration Constants
+INPUT_PDF = "partisan_offices.pdf"  # The full "Partisan Offices" report, see readme.md
+STRAIGHT_PARTY_PAGES = 233  # Pages 1-233 are the straight party ticket
+OUTPUT_FILENAME = "wayne_straight_party.csv"
+UNMATCHED_FILENAME = "wayne_straight_party_unmatched.txt"
+
+
+def header_party(header):
+    """
+    Returns the party code for a straight-party column header.
+    Examples:
+        "DEM - Democratic Party" -> "DEM"
+        "Democratic Party" -> "DEM"
+    """
+    code, separator, _ = header.partition(" - ")
+    if separator and code.isupper():
+        return canonical_party(code)
+    name = sanitize_string(header)
+    if name.upper().endswith(" PARTY"):
+        name = name[:-len(" PARTY")]
+    return canonical_party(name)
+
+
+def parse_straight_party_page(job):
+    """Worker entry point: parses one straight-party page into table rows."""
+    pdf_path, page_num = job
+    try:
+        office, columns, page_rows = parse_page_words(page_text(open_page(pdf_path, page_num)))
+    except Exception as e:
+        return [], [f"Error processing {pdf_path}, page {page_num + 1}: {e}"]
+    if office is None:
+        return [], [f"No title on {pdf_path}, page {page_num + 1}"]
+
+    parties = [column for column in columns
+               if column not in STATISTICS_COLUMNS and column not in SKIPPED_COLUMNS]
+    rows = []
+    for precinct, vote_mode, values in page_rows:
+        if vote_mode == "Total":
+            continue  # Skip "Total" rows, the modes add up to it
+        for column in parties:
+            rows.append({
+                "election": ELECTION,
+                "state": STATE,
+                "county": COUNTY,
+                "precinct": precinct,
+                # Same IDs and vote modes as wayne_parsed.csv, so the two join
+                "precinct_id": precinct_id(STATE, COUNTY, precinct),
+                "party": header_party(column),
+                "vote_mode": canonical_vote_mode(vote_mode),
+                "votes": values.get(column, 0),  # Blank cells are zero
+                "result_status": RESULT_STATUS,
+                "source_url": SOURCE_URL,
+                "source_filename": os.path.basename(pdf_path),
+                "datetime_retrieved": DATETIME_RETRIEVED,
+            })
+    return rows, []
+
+
+def main():
+    if not os.path.exists(INPUT_PDF):
+        print(f"{INPUT_PDF} not found. Download the Partisan Offices report (see readme.md) first.")
+        return
+
+    with fitz.open(INPUT_PDF) as doc:
+        page_count = min(len(doc), STRAIGHT_PARTY_PAGES)
+    jobs = [(INPUT_PDF, page_num) for page_num in range(page_count)]
+    print(f"Parsing {len(jobs)} straight-party pages with {NUM_WORKERS} workers...")
+
+    csv_columns = ["election", "state", "county", "precinct", "precinct_id", "party", "vote_mode", "votes",
+                   "result_status", "source_url", "source_filename", "datetime_retrieved"]
+    row_count = 0
+    problems = []
+    with open(OUTPUT_FILENAME, "w", newline="") as output_file:
+        writer = csv.DictWriter(output_file, fieldnames=csv_columns)
+        writer.writeheader()
+        # Rows are written as each page comes back, in page order,
+        # so memory doesn't grow with the number of pages
+        with Pool(NUM_WORKERS) as pool:
+            for rows, page_problems in pool.imap(parse_straight_party_page, jobs, chunksize=CHUNK_SIZE):
+                writer.writerows(rows)
+                row_count += len(rows)
+                problems += page_problems
+
+    if problems:
+        with open(UNMATCHED_FILENAME, "w") as unmatched_file:
+            unmatched_file.write("\n".join(problems) + "\n")
+        print(f"{len(problems)} pages could not be parsed, see {UNMATCHED_FILENAME}")
+    print(f"Wrote {row_count} rows to {OUTPUT_FILENAME}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,33 @@
 import fitz  # PyMuPDF
 from PyPDF2 import PdfReader, PdfWriter
 import os
+import sys
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.offices import RaceSections, office_filter, race_filename  # noqa: E402
+from common.page_text import PAGE_TEXT_STORE, PageTextStore  # noqa: E402
 
 # Configuration Constants
 INPUT_PDF = "./StatementOfVotesCastRPT.pdf"
+PAGE_TEXT = PageTextStore(PAGE_TEXT_STORE)  # Each page's text and word boxes, decoded once and kept for the later stages
 OUTPUT_DIRECTORY = "split_sections"  # Directory to save the split PDFs
+OFFICES = None  # Races to split, e.g. ["UNITED STATES SENATOR", "REPRESENTATIVE IN CONGRESS"] or the OFFICE_RANKING table; None for all
+selected_office = office_filter(OFFICES)
 # Keyword to search for in the PDF. this finds the office titles since they each say something like (Vote for 1)
 KEYWORD = "Vote for"
 
 # Open the PDF with fitz for text extraction
 doc = fitz.open(INPUT_PDF)
-split_pages = []
-titles = []
+sections = RaceSections()
+title = None
 
-# Scan each page for the keyword
+# Scan each page for the keyword. Pages up to the next title belong to the
+# race; a title seen again later adds its pages to the same section
 for page_num in range(len(doc)):
     page = doc[page_num]
-    text = page.get_text("text")
+    layer = PAGE_TEXT.page(page)
+    text = layer.text
 
     if KEYWORD in text:
         # Extract the title (text before "Vote for")
@@ -24,35 +35,35 @@ for page_num in range(len(doc)):
         for line in lines:
             if KEYWORD in line:
                 title = line.split(KEYWORD)[0].strip()
-                titles.append(title)
-                split_pages.append(page_num)
                 break
 
-split_pages.append(len(doc))  # Add the last page as the endpoint
+    if title is not None:
+        sections.add(title, page_num, layer.key)
+
+sections.report()
 
 # Split and save the sections
 reader = PdfReader(INPUT_PDF)
 os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
+skipped_races = 0
 
-for i in range(len(split_pages) - 1):
-    start_page = split_pages[i]
-    end_page = split_pages[i + 1]  # End is exclusive
-    title = titles[i]
-    sanitized_title = (
-        "".join(c if c.isalnum() or c in " _-" else "_" for c in title)
-        .replace(" ", "_")  # Replace spaces with underscores
-        .replace("__", "_")  # Remove double underscores
-        .strip("_")  # Remove leading and trailing underscores
-    )
+for title, pages in sections.items():
+    if not selected_office(title):
+        skipped_races += 1
+        continue
     # Write the split section to a new PDF
     writer = PdfWriter()
-    for page_num in range(start_page, end_page):
+    for page_num in pages:
         writer.add_page(reader.pages[page_num])
 
-    output_path = os.path.join(
-        OUTPUT_DIRECTORY, f"{sanitized_title or 'Untitled'}.pdf")
+    output_path = os.path.join(OUTPUT_DIRECTORY, race_filename(title))
     with open(output_path, "wb") as output_file:
         writer.write(output_file)
     print(f"Saved: {output_path}")
 
+for stale_path in sections.superseded(OUTPUT_DIRECTORY):
+    os.remove(stale_path)
+    print(f"Removed: {stale_path} (an earlier split of the same race)")
+if skipped_races:
+    print(f"Skipped {skipped_races} races not in OFFICES.")
 print("Splitting complete.")
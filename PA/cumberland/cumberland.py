@@ -1,4 +1,13 @@
 import csv
+import os
+import sys
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.canonicalize import canonicalize_row  # noqa: E402
+from common.compressed import open_output, output_path  # noqa: E402
+from common.retrieval import datetime_retrieved  # noqa: E402
+from common.validate import totals_row, write_totals  # noqa: E402
 
 # Constants
 ELECTION = "2024 GENERAL"
@@ -7,18 +16,21 @@ COUNTY = "CUMBERLAND COUNTY"
 SOURCE_FILENAME = "cumberland_cleaned.txt"
 SOURCE_URL = "https://www.cumberlandcountypa.gov/DocumentCenter/View/52475/Official-Precinct-Report"
 RESULT_STATUS = "OFFICIAL"
-DATETIME_RETRIEVED = "11/19/2024 08:53AM"
+DATETIME_RETRIEVED = datetime_retrieved("cumberland_data.txt", "11/19/2024 08:53AM")  # When common/fetch.py downloaded it, else when it was saved by hand
 
 # File paths
 input_filename = "cumberland_cleaned.txt"
 output_filename = "cumberland_parsed.csv"
+OUTPUT_COMPRESSION = None  # "gzip" or "zstd" to write the output compressed (.gz / .zst)
 unmatched_filename = "cumberland_unmatched.txt"
+totals_filename = "cumberland_totals.csv"  # The TOTAL column, for common/validate.py
 
 with open(input_filename, "r") as file:
     lines = file.readlines()
 
 # Parsing and processing
 rows = []
+totals = []
 unmatched_lines = []  # To collect unmatched lines
 current_precinct = None
 current_office = None
@@ -52,6 +64,9 @@ for index, line in enumerate(lines):
                 candidate_name = "WRITE-IN"
                 party = ""
 
+            totals.append(totals_row(STATE, COUNTY, current_precinct, current_office, candidate_name,
+                                     votes_total, SOURCE_FILENAME, f"line {index + 1}"))
+
             # Append processed data to rows
             vote_modes = [
                 ("Total", votes_total),
@@ -98,14 +113,16 @@ if unmatched_lines:
 
 # Write processed rows to CSV
 csv_columns = [
-    "election", "state", "county", "precinct", "office",
+    "election", "state", "county", "precinct", "precinct_id", "office",
     "candidate", "party", "vote_mode", "votes", "writein",
     "result_status", "source_url", "source_filename", "datetime_retrieved"
 ]
 
-with open(output_filename, "w", newline="") as csvfile:
+with open_output(output_filename, OUTPUT_COMPRESSION) as csvfile:
     writer = csv.DictWriter(csvfile, fieldnames=csv_columns)
     writer.writeheader()
-    writer.writerows(rows)
+    writer.writerows(canonicalize_row(row) for row in rows)
+
+write_totals(totals_filename, totals)
 
-print(f"Results written to {output_filename}")
+print(f"Results written to {output_path(output_filename, OUTPUT_COMPRESSION)}")
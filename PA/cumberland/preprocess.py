@@ -1,14 +1,29 @@
+import os
 import re
+import sys
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.turnout import parse_count, parse_percent, turnout_row, write_turnout  # noqa: E402
+
+# Constants for the turnout table
+ELECTION = "2024 GENERAL"
+STATE = "PENNSYLVANIA"
+COUNTY = "CUMBERLAND COUNTY"
+TURNOUT_MODES = ["Total", "Election Day", "Mail", "Provisional"]  # Order of the "Ballots Cast" counts
 
 # File paths
 input_filename = "cumberland_data.txt"
 output_filename = "cumberland_cleaned.txt"
+turnout_filename = "cumberland_turnout.csv"  # Registered voters and ballots cast per precinct
 
 with open(input_filename, "r") as file:
     lines = file.readlines()
 
 # Preprocessing steps
 cleaned_lines = []
+statistics = {}  # precinct -> the STATISTICS block's figures, for the turnout table
+current_precinct = None
 
 # List of line prefixes to skip
 skip_prefixes = [
@@ -27,11 +42,25 @@ skip_prefixes = [
 for index, line in enumerate(lines):
     line = line.strip()
 
+    # The STATISTICS lines aren't results, but they're the turnout table
+    if current_precinct and line.startswith(("Registered Voters - Total", "Ballots Cast - Total", "Voter Turnout - Total")):
+        figures = statistics.setdefault(current_precinct, {})
+        values = line.split("Total", 1)[1].split()
+        if line.startswith("Registered"):
+            figures["registered"] = parse_count(values[0])
+        elif line.startswith("Ballots"):
+            figures["ballots"] = [parse_count(value) for value in values]
+            figures["line"] = index + 1
+        else:
+            figures["turnout"] = parse_percent(values[0])
+
     # Skip lines that start with any prefix in skip_prefixes
     if any(line.startswith(prefix) for prefix in skip_prefixes):
         continue
     if line.startswith("November 5, 2024 Cumberland County"):
         cleaned_lines.append("-PAGE-BREAK-")
+        # The precinct name follows the page header
+        current_precinct = lines[index + 1].strip() if index + 1 < len(lines) else None
         continue
 
     # Remove commas from numbers (e.g., 1,235 -> 1235)
@@ -46,3 +75,14 @@ with open(output_filename, "w") as output_file:
     output_file.write("\n".join(cleaned_lines))
 
 print(f"Cleaned data written to {output_filename}")
+
+turnout = []
+for precinct, figures in statistics.items():
+    if "ballots" not in figures:
+        continue
+    for vote_mode, ballots_cast in zip(TURNOUT_MODES, figures["ballots"]):
+        turnout.append(turnout_row(ELECTION, STATE, COUNTY, precinct, vote_mode, figures.get("registered"),
+                                   ballots_cast, input_filename, f"line {figures['line']}",
+                                   figures.get("turnout") if vote_mode == "Total" else None))
+count = write_turnout(turnout_filename, turnout)
+print(f"Turnout for {count // len(TURNOUT_MODES)} precincts written to {turnout_filename}")
@@ -1,4 +1,14 @@
 import csv
+import os
+import sys
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.canonicalize import canonicalize_row  # noqa: E402
+from common.compressed import open_output, output_path  # noqa: E402
+from common.candidate_registry import CandidateRegistry, NON_CANDIDATES  # noqa: E402
+from common.retrieval import datetime_retrieved  # noqa: E402
+from common.validate import totals_row, write_totals  # noqa: E402
 
 # Constants
 ELECTION = "2024 GENERAL"
@@ -6,85 +16,35 @@ STATE = "PENNSYLVANIA"
 COUNTY = "DAUPHIN COUNTY"
 SOURCE_FILENAME = "dauphin_data.txt"
 RESULT_STATUS = "PRELIMINARY"
-DATETIME_RETRIEVED = "11/25/2024 12:36"
+DATETIME_RETRIEVED = datetime_retrieved("dauphin_data.txt", "11/25/2024 12:36")  # When common/fetch.py downloaded it, else when it was saved by hand
 JURISDICTION = "DAUPHIN COUNTY"
 
-# Party lookup table
-PARTY_LOOKUP = {
-    # PRESIDENT OF THE UNITED STATES
-    "KAMALA D HARRIS": "DEM",
-    "DONALD J TRUMP": "REP",
-    "CHASE OLIVER": "LIBRT",
-    "JILL STEIN": "GREEN",
-    # UNITED STATES SENATOR
-    "ROBERT P CASEY JR": "DEM",
-    "DAVE MCCORMICK": "REP",
-    "JOHN C THOMAS": "LIBRT",
-    "LEILA HAZOU": "GREEN",
-    "MARTY SELKER": "CONSTITUTION",
-    # ATTORNEY GENERAL
-    "EUGENE DEPASQUALE": "DEM",
-    "DAVE SUNDAY": "REP",
-    "ROBERT COWBURN": "LIBRT",
-    "RICHARD L WEISS": "GREEN",
-    "JUSTIN L MAGILL": "CONSTITUTION",
-    "ERIC L SETTLE": "FORWARD",
-    # AUDITOR GENERAL
-    "MALCOLM KENYATTA": "DEM",
-    "TIM DEFOOR": "REP",
-    "REECE SMITH": "LIBRT",
-    "ERIC K ANTON": "AMERICAN SOLIDARITY",
-    "BOB GOODRICH": "CONSTITUTION",
-    # STATE TREASURER
-    "ERIN MCCLELLAND": "DEM",
-    "STACY GARRITY": "REP",
-    "NICKOLAS CIESIELSKI": "LIBRT",
-    "TROY BOWMAN": "CONSTITUTION",
-    "CHRIS FOSTER": "FOWARD",
-    # REPRESENTATIVE IN CONGRESS
-    "JANELLE STELSON": "DEM",
-    "SCOTT PERRY": "REP",
-    # SENATOR IN THE GENERAL ASSEMBLY - SD15
-    "PATTY KIM": "DEM",
-    "NICK DIFRANCESCO": "REP",
-    # REPRESENTATIVE IN THE GENERAL ASSEMBLY - HD103
-    "NATE DAVIDSON": "DEM",
-    "CINDI WARD": "REP",
-    # REPRESENTATIVE IN THE GENERAL ASSEMBLY - HD104
-    "DAVE MADSEN": "DEM",
-    # REPRESENTATIVE IN THE GENERAL ASSEMBLY - HD105
-    "JUSTIN C FLEMING": "DEM",
-    # REPRESENTATIVE IN THE GENERAL ASSEMBLY - HD106
-    "ANJU SINGH": "DEM",
-    "TOM MEHAFFIE": "REP",
-    # REPRESENTATIVE IN THE GENERAL ASSEMBLY - HD125
-    "GENE STILP": "DEM",
-    "JOE KERWIN": "REP",
-    # PENBROOK BREWERY LICENSES
-    # SUSQUEHANNA TOWNSHIP SCHOOL DISTRICT TAX REFERENDUM
-}
+# Parties come from the shared candidate registry (common/candidate_registry.json).
+# Candidates it can't resolve are printed at the end so they can be added to it.
+CANDIDATE_REGISTRY = CandidateRegistry.load()
 
 
 # Load input text from file
 input_filename = "./dauphin_data.txt"
 output_filename = "dauphin_parsed.csv"
+OUTPUT_COMPRESSION = None  # "gzip" or "zstd" to write the output compressed (.gz / .zst)
+totals_filename = "dauphin_totals.csv"  # The Total column, for common/validate.py
 
 with open(input_filename, "r") as file:
     lines = file.readlines()
 
 # Parsing and processing
 rows = []
+totals = []
 unmatched_lines = []  # To collect lines that don't match
 current_precinct = None
 current_office = None
 current_source_url = None
 
-# Track printed offices and candidates -- this is used mostly to help me generate the party lookup table below
-# printed_offices = set()
-# printed_candidates = set()
+unresolved_candidates = set()  # Candidates the registry has no party for
 
 
-for line in lines:
+for index, line in enumerate(lines):
     line = line.strip()
     if not line:  # Skip blank lines
         continue
@@ -103,16 +63,13 @@ for line in lines:
                 votes_machine, votes_mail, votes_provisional, votes_total = map(
                     int, parts[-4:])
 
-                # # Print the office if it hasn't been printed yet
-                # if current_office and current_office not in printed_offices:
-                #     print(f"# {current_office}")
-                #     printed_offices.add(current_office)
+                party = CANDIDATE_REGISTRY.lookup_party(
+                    candidate_name, current_office)
+                if not party and candidate_name not in NON_CANDIDATES:
+                    unresolved_candidates.add((current_office, candidate_name))
 
-                # # Print the candidate and their party if they haven't been printed yet
-                # if candidate_name not in printed_candidates and (candidate_name != "WRITE-IN" and candidate_name != "YES" and candidate_name != "NO"):
-                #     party = PARTY_LOOKUP.get(candidate_name, "")
-                #     print(f"\"{candidate_name}\" : \"{party}\",")
-                #     printed_candidates.add(candidate_name)
+                totals.append(totals_row(STATE, COUNTY, current_precinct, current_office, candidate_name,
+                                         votes_total, SOURCE_FILENAME, f"line {index + 1}"))
 
                 # Append processed data to rows
                 vote_modes = [("Machine", votes_machine), ("Mail-in",
@@ -126,7 +83,7 @@ for line in lines:
                         "jurisdiction": JURISDICTION,
                         "office": current_office,
                         "candidate": candidate_name,
-                        "party": PARTY_LOOKUP.get(candidate_name, ""),
+                        "party": party,
                         "vote_mode": vote_mode,
                         "votes": votes,
                         "writein": "yes" if candidate_name == "WRITE-IN" else "no",
@@ -153,17 +110,23 @@ if unmatched_lines:
     for unmatched_line in unmatched_lines:
         print(unmatched_line)
 
+if unresolved_candidates:
+    print("Candidates missing from the registry:")
+    for office, candidate_name in sorted(unresolved_candidates):
+        print(f"{office}: {candidate_name}")
 
 # Write to CSV
 csv_columns = [
-    "election", "state", "county", "precinct", "jurisdiction", "office",
-    "candidate", "party", "vote_mode", "votes", "writein",
+    "election", "state", "county", "precinct", "precinct_id", "jurisdiction",
+    "office", "candidate", "party", "vote_mode", "votes", "writein",
     "result_status", "source_url", "source_filename", "datetime_retrieved"
 ]
 
-with open(output_filename, "w", newline="") as csvfile:
+with open_output(output_filename, OUTPUT_COMPRESSION) as csvfile:
     writer = csv.DictWriter(csvfile, fieldnames=csv_columns)
     writer.writeheader()
-    writer.writerows(rows)
+    writer.writerows(canonicalize_row(row) for row in rows)
+
+write_totals(totals_filename, totals)
 
-print(f"Results written to {output_filename}")
+print(f"Results written to {output_path(output_filename, OUTPUT_COMPRESSION)}")
@@ -1,4 +1,13 @@
 import csv
+import os
+import sys
+
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.canonicalize import canonicalize_row  # noqa: E402
+from common.compressed import open_output, output_path  # noqa: E402
+from common.retrieval import datetime_retrieved  # noqa: E402
+from common.turnout import parse_percent, turnout_row, write_turnout  # noqa: E402
 
 # Constants
 ELECTION = "2024 GENERAL"
@@ -7,21 +16,24 @@ COUNTY = "LEHIGH COUNTY"
 SOURCE_FILENAME = "precincts_8.csv"
 SOURCE_URL = "https://www.livevoterturnout.com/ENR/lehighpaenr/8/en/Index_8.html"
 RESULT_STATUS = "OFFICIAL"
-DATETIME_RETRIEVED = "12/7/2024 10:39PM"
+DATETIME_RETRIEVED = datetime_retrieved("precincts_8.csv", "12/7/2024 10:39PM")  # When common/fetch.py downloaded it, else when it was saved by hand
 
 # File paths
 input_filename = "precincts_8.csv"
 output_filename = "lehigh_parsed.csv"
+OUTPUT_COMPRESSION = None  # "gzip" or "zstd" to write the output compressed (.gz / .zst)
 unmatched_filename = "lehigh_unmatched.txt"
+turnout_filename = "lehigh_turnout.csv"  # Each precinct's Voter Turnout, which is all Lehigh reports
 
 with open(input_filename, "r") as file:
     lines = file.readlines()
 
 # Parsing and processing
 rows = []
+turnout = []
 unmatched_lines = []  # To collect unmatched lines
 
-for line in lines:
+for index, line in enumerate(lines):
     line = line.strip()
     if not line:  # Skip blank lines
         continue
@@ -39,9 +51,18 @@ for line in lines:
             # Remove the party prefix and trim the remaining name
             candidate_name = candidate_raw[4:]
 
+            # Ballot questions are just "Yes" / "No", with no party prefix
+            if candidate_raw in ("Yes", "No"):
+                candidate_name = candidate_raw.upper()
+                party = ""
+
             # Convert votes to integer
             votes = int(votes)
 
+            # Every row repeats its precinct's turnout; write_turnout keeps the first
+            turnout.append(turnout_row(ELECTION, STATE, COUNTY, precinct, "Total", None, None,
+                                       SOURCE_FILENAME, f"line {index + 1}", parse_percent(voter_turnout)))
+
             # Append processed data to rows
             rows.append({
                 "election": ELECTION,
@@ -73,14 +94,17 @@ if unmatched_lines:
 
 # Write processed rows to CSV
 csv_columns = [
-    "election", "state", "county", "precinct", "office",
+    "election", "state", "county", "precinct", "precinct_id", "office",
     "candidate", "party", "vote_mode", "votes", "writein",
     "result_status", "source_url", "source_filename", "datetime_retrieved"
 ]
 
-with open(output_filename, "w", newline="") as csvfile:
+with open_output(output_filename, OUTPUT_COMPRESSION) as csvfile:
     writer = csv.DictWriter(csvfile, fieldnames=csv_columns)
     writer.writeheader()
-    writer.writerows(rows)
+    writer.writerows(canonicalize_row(row) for row in rows)
+
+print(f"Results written to {output_path(output_filename, OUTPUT_COMPRESSION)}")
 
-print(f"Results written to {output_filename}")
+count = write_turnout(turnout_filename, turnout)
+print(f"Turnout for {count} precincts written to {turnout_filename}")
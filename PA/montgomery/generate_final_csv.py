@@ -1,20 +1,35 @@
 import os
+import sys
 import csv
+import glob
 import pandas as pd
 import re
 
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.canonicalize import canonicalize_row  # noqa: E402
+from common.compressed import open_output, output_path  # noqa: E402
+from common.progressive import write_county_coverage  # noqa: E402
+from common.race_frames import MASKED_VOTES, read_race_csv, map_categories, concat_race_frames  # noqa: E402
+from common.retrieval import datetime_retrieved  # noqa: E402
+from common.sort_results import office_ranker, result_sort_key, external_sort  # noqa: E402
+from common.turnout import parse_count, read_turnout, turnout_row, write_turnout  # noqa: E402
+
 # Constants
 ELECTION = "2024 GENERAL"
 STATE = "PENNSYLVANIA"
 COUNTY = "MONTGOMERY COUNTY"
 SOURCE_URL = "https://www.montgomerycountypa.gov/DocumentCenter/View/45586/2024UnofficialGeneralElectionStatementofVotesCast?bidId="
 RESULT_STATUS = "UNOFFICIAL"
-DATETIME_RETRIEVED = "11/19/2024 3:35:01 PM"
+QUALIFIED_WRITE_IN = "QUALIFIED WRITE IN"  # The "party" a write-in candidate is printed with
+DATETIME_RETRIEVED = datetime_retrieved("StatementOfVotesCastRPT.pdf", "11/19/2024 3:35:01 PM")  # When common/fetch.py downloaded it, else when it was saved by hand
 
 # Directory paths
 RACES_DIRECTORY = "races"
 OUTPUT_FILENAME = "parsed_results.csv"
+OUTPUT_COMPRESSION = None  # "gzip" or "zstd" to write the output compressed (.gz / .zst)
 UNMATCHED_FILENAME = "unmatched_lines.txt"
+TURNOUT_FILENAME = "montgomery_turnout.csv"  # Times cast and registered voters per precinct and vote mode
 
 # Define office importance ranking
 OFFICE_RANKING = {
@@ -26,21 +41,104 @@ OFFICE_RANKING = {
     "SENATOR IN THE GENERAL ASSEMBLY": 6,
 }
 
-# Helper function to determine office rank
-
-
-def get_office_rank(office):
-    for key, rank in OFFICE_RANKING.items():
-        if office.startswith(key):
-            return rank
-    return float("inf")  # Default rank for unlisted offices
+# Ranks are looked up once per distinct office
+get_office_rank = office_ranker(OFFICE_RANKING)
+
+
+def split_candidate(raw):
+    """
+    Splits a race CSV candidate into (candidate, party, writein).
+    Examples:
+        "KAMALA D HARRIS(DEM)" -> ("KAMALA D HARRIS", "DEM", "no")
+        "Unresolved Write-In" -> ("(Other)", "Unresolved Write-In", "yes")
+    """
+    candidate = " ".join(raw.upper().split())
+    party = ""
+
+    # Handle Unresolved Write-In
+    if candidate.lower() == "unresolved write-in":
+        return "(Other)", "Unresolved Write-In", "yes"
+
+    # Extract party name from candidate if in parentheses
+    match = re.search(r"\(([^)]+)\)", candidate)
+    if match:
+        party = match.group(1).strip()
+        candidate = re.sub(r"\s*\([^)]*\)", "", candidate).strip()
+    elif candidate.endswith(" " + QUALIFIED_WRITE_IN):
+        # Some camelot builds drop the parentheses around it
+        candidate, party = candidate[:-len(QUALIFIED_WRITE_IN)].strip(), QUALIFIED_WRITE_IN
+
+    # Detect write-ins based on party name
+    return candidate, party, "yes" if "write" in party.lower() else "no"
+
+
+def race_results(df, office_title, race_csv):
+    """
+    Builds the common-schema columns for one race. Every transformation runs
+    once per distinct value (category), not once per row.
+    """
+    candidates = {raw: split_candidate(raw) for raw in df["candidate"].cat.categories}
+    if "method" in df.columns:
+        vote_mode = map_categories(df["method"], str.strip)
+    else:
+        vote_mode = pd.Series("", index=df.index, dtype="category")
+    return pd.DataFrame({
+        "precinct": map_categories(df["precinct"], str.strip),
+        "office": pd.Series(office_title, index=df.index, dtype="category"),
+        "candidate": map_categories(df["candidate"], lambda raw: candidates[raw][0]),
+        "party": map_categories(df["candidate"], lambda raw: candidates[raw][1]),
+        "vote_mode": vote_mode,
+        "votes": df["votes"],
+        "writein": map_categories(df["candidate"], lambda raw: candidates[raw][2]),
+        "source_filename": pd.Series(race_csv, index=df.index, dtype="category"),
+    })
+
+
+def turnout_rows(races_directory):
+    """
+    Yields turnout rows from the Times Cast tables parsepdf.py set aside while
+    extracting the results (races/<race>/skipped/<race>_page_<n>.csv_table_<i>_turnout.csv).
+    Every race repeats them, so races and pages are read in order and
+    write_turnout keeps the first copy of each precinct.
+    """
+    def page_order(path):
+        race, page = os.path.basename(path).split(".csv_table_")[0].rsplit("_page_", 1)
+        return race, int(page), path
+
+    for race, page, path in sorted(map(page_order, glob.glob(
+            os.path.join(races_directory, "*", "skipped", "*_turnout.csv")))):
+        for row in read_turnout(path):
+            yield turnout_row(ELECTION, STATE, COUNTY, row["precinct"].strip(), row["method"],
+                              parse_count(row["registered_voters"]), parse_count(row["ballots_cast"]),
+                              f"{race}.pdf", f"page {page}")
+
+
+def result_rows(results):
+    """Yields each row as a common-schema dict, one at a time."""
+    for row in results.itertuples(index=False):
+        yield {
+            "election": ELECTION,
+            "state": STATE,
+            "county": COUNTY,
+            "precinct": row.precinct,
+            "office": row.office,
+            "candidate": row.candidate,
+            "party": row.party,
+            "vote_mode": row.vote_mode,
+            "votes": MASKED_VOTES if pd.isna(row.votes) else row.votes,
+            "writein": row.writein,
+            "result_status": RESULT_STATUS,
+            "source_url": SOURCE_URL,
+            "source_filename": row.source_filename,
+            "datetime_retrieved": DATETIME_RETRIEVED,
+        }
 
 
 # Collect unmatched lines for logging
 unmatched_lines = []
 
 # Process each race-level CSV
-rows = []
+races = []
 
 for race_dir in os.listdir(RACES_DIRECTORY):
     race_path = os.path.join(RACES_DIRECTORY, race_dir)
@@ -58,60 +156,11 @@ for race_dir in os.listdir(RACES_DIRECTORY):
 
     try:
         # Read the race-level CSV
-        df = pd.read_csv(race_csv)
-
-        for _, row in df.iterrows():
-            try:
-                # Extract necessary fields
-                precinct = row.get("precinct", "").strip()
-                candidate = row.get("candidate", "").upper().strip()
-                party = row.get("party", "").strip()
-                votes = row.get("votes", 0)
-                vote_mode = row.get("method", "").strip()
-
-                # Handle Unresolved Write-In
-                if candidate.lower() == "unresolved write-in":
-                    candidate = "(Other)"
-                    party = "Unresolved Write-In"
-                    is_writein = "yes"
-
-                else:
-                    # Extract party name from candidate if in parentheses
-                    match = re.search(r"\(([^)]+)\)", candidate)
-                    if match:
-                        party = match.group(1).strip()
-                        candidate = re.sub(
-                            r"\s*\([^)]*\)", "", candidate).strip()
-
-                    # Detect write-ins based on party name
-                    is_writein = "yes" if "write" in party.lower() else "no"
-
-                # Append processed data to rows
-                rows.append({
-                    "election": ELECTION,
-                    "state": STATE,
-                    "county": COUNTY,
-                    "precinct": precinct,
-                    "office": office_title,
-                    "candidate": candidate,
-                    "party": party,
-                    "vote_mode": vote_mode,
-                    "votes": votes,
-                    "writein": is_writein,
-                    "result_status": RESULT_STATUS,
-                    "source_url": SOURCE_URL,
-                    "source_filename": race_csv,
-                    "datetime_retrieved": DATETIME_RETRIEVED,
-                })
-            except Exception as e:
-                unmatched_lines.append(
-                    f"Error processing row in {race_csv}: {e}")
-
+        races.append(race_results(read_race_csv(race_csv), office_title, race_csv))
     except Exception as e:
         unmatched_lines.append(f"Error reading {race_csv}: {e}")
 
-# Sort rows by office ranking
-rows = sorted(rows, key=lambda x: get_office_rank(x["office"]))
+results = concat_race_frames(races)
 
 # Write unmatched lines to a separate file
 if unmatched_lines:
@@ -121,14 +170,29 @@ if unmatched_lines:
 
 # Write processed rows to CSV
 csv_columns = [
-    "election", "state", "county", "precinct", "office",
+    "election", "state", "county", "precinct", "precinct_id", "office",
     "candidate", "party", "vote_mode", "votes", "writein",
     "result_status", "source_url", "source_filename", "datetime_retrieved"
 ]
 
-with open(OUTPUT_FILENAME, "w", newline="") as csvfile:
+# Written under a temporary name and renamed, so readers never see half a file
+# (parsepdf.py's progressive mode reruns this while the races are extracted)
+with open_output(f"{OUTPUT_FILENAME}.tmp", OUTPUT_COMPRESSION) as csvfile:
     writer = csv.DictWriter(csvfile, fieldnames=csv_columns)
     writer.writeheader()
-    writer.writerows(rows)
-
-print(f"Results written to {OUTPUT_FILENAME}")
+    # Sort by office rank, office, precinct, candidate and vote mode, spilling
+    # sorted runs to disk if there are more rows than fit in the sort budget
+    rows = (canonicalize_row(row) for row in result_rows(results))
+    writer.writerows(external_sort(rows, result_sort_key(get_office_rank), csv_columns))
+
+os.replace(output_path(f"{OUTPUT_FILENAME}.tmp", OUTPUT_COMPRESSION), output_path(OUTPUT_FILENAME, OUTPUT_COMPRESSION))
+print(f"Results written to {output_path(OUTPUT_FILENAME, OUTPUT_COMPRESSION)}")
+
+# After a progressive run, say how much of the county the results cover
+coverage = write_county_coverage(RACES_DIRECTORY)
+if coverage and not coverage["complete"]:
+    print(f"Partial results: {coverage['pages_done']}/{coverage['pages_total']} pages extracted")
+
+turnout_count = write_turnout(TURNOUT_FILENAME, turnout_rows(RACES_DIRECTORY))
+if turnout_count:
+    print(f"Turnout for {turnout_count} precinct vote modes written to {TURNOUT_FILENAME}")
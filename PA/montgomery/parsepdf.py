@@ -1,16 +1,40 @@
 import os
+import sys
+import glob
 import random
 import camelot
 import pandas as pd
 from PyPDF2 import PdfReader, PdfWriter
+from contextlib import nullcontext
 from multiprocessing import Pool
 
+# Shared helpers live in common/ at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.offices import office_filter  # noqa: E402
+from common.profiling import trace_page, collect_traces  # noqa: E402
+from common.progress import ProgressAggregator, init_worker, start_race, page_done  # noqa: E402
+from common.progressive import FinalRefresher, clear_coverage, count_precincts, write_coverage  # noqa: E402
+from common.rasterize import PageRasterizer  # noqa: E402
+from common.race_frames import race_frame, read_race_csv, concat_race_frames, write_race_csv  # noqa: E402
+from common.work_queue import run_county  # noqa: E402
+
 # Configuration Constants
 INPUT_DIRECTORY = "split_sections"  # Directory containing split PDFs
 RACES_DIRECTORY = "races"  # Top-level directory for race-specific folders
 NUM_WORKERS = 4  # Number of parallel processes
 DEBUG_MODE = False
-EXTRA_LOGGING = False
+EXTRA_LOGGING = False  # Per-page messages; otherwise progress goes to one status line
+TRACE_DIRECTORY = "traces"  # Per-worker page timings, merged into TRACE_FILE at the end
+TRACE_FILE = "trace.jsonl"  # Summarize with: python ../../common/profiling.py trace.jsonl
+RUN_SUMMARY_FILE = "run_summary.json"  # Pages, statuses, errors and timings per race for the last run
+PROFILE_STAGE = None  # Set to a phase (e.g. "transform") to cProfile it on every page
+RASTERIZER = PageRasterizer()  # Renders pages for lattice with PyMuPDF, cached per process
+PAGE_CACHE = True  # Keep each page's table in races/<race>/parsed so re-runs (and the watch mode) skip it
+PROGRESSIVE_PAGES = None  # e.g. 25: publish each race's partial results every 25 pages, and refresh FINAL_SCRIPT's output as they land
+FINAL_SCRIPT = "generate_final_csv.py"
+WORK_QUEUE = None  # e.g. "tcp://coordinator:8765" to share the pages with other hosts (see common/work_queue.py)
+OFFICES = None  # Races to parse, as in splitpdf.py; race PDFs left from an earlier, wider split are skipped
+selected_office = office_filter(OFFICES)
 
 
 def create_directories(race_name):
@@ -63,65 +87,141 @@ def transform_table_precinct(df):
                 })
 
     # Convert to DataFrame
-    return pd.DataFrame(transformed_data)
+    return race_frame(transformed_data, ["precinct", "method", "candidate", "votes"])
+
+
+def transform_table_turnout(df):
+    """
+    Transforms a "Times Cast" table (precinct, then one row per voting method
+    with times cast and registered voters) into long format, for the turnout
+    table generate_final_csv.py writes.
+    """
+    header = [" ".join(str(cell).split()) for cell in df.iloc[0]]
+    times_cast = header.index("Times Cast")
+    registered = header.index("Registered Voters")
+    valid_methods = {"Mail-in", "Provisional", "Election Day", "Total"}
+    special_values = {"County", "PA County"}
+
+    transformed_data = []
+    current_precinct = None
+    for _, row in df.iloc[1:].iterrows():
+        first_col = row.iloc[0]
+        if first_col in valid_methods:
+            transformed_data.append({
+                "precinct": current_precinct,
+                "method": first_col,
+                "ballots_cast": row.iloc[times_cast],
+                "registered_voters": row.iloc[registered],
+            })
+        elif first_col not in special_values:
+            current_precinct = first_col
+    return pd.DataFrame(transformed_data, columns=["precinct", "method", "ballots_cast", "registered_voters"])
 
 
 def process_page(pdf_path, page_num, parsed_dir, skipped_dir):
-    """Processes a single page."""
+    """
+    Processes a single page and returns its transformed table (None if it has
+    none, or was already processed). The table is only written to parsed_dir
+    with PAGE_CACHE on; otherwise process_pdf merges what this returns.
+    """
     page_str = str(page_num)
     base_name = os.path.splitext(os.path.basename(pdf_path))[0]
     output_file = os.path.join(parsed_dir, f"{base_name}_page_{page_num}.csv")
     skipped_file = os.path.join(
         skipped_dir, f"{base_name}_page_{page_num}.csv")
 
-    print(f"Processing {base_name}, page {page_num}...")
+    if EXTRA_LOGGING:
+        print(f"Processing {base_name}, page {page_num}...")
 
-    if os.path.exists(output_file) or os.path.exists(skipped_file):
-        print(f"  Skipping {base_name}, page {page_num}: already processed.")
+    if PAGE_CACHE and (os.path.exists(output_file) or os.path.exists(skipped_file)):
+        if EXTRA_LOGGING:
+            print(f"  Skipping {base_name}, page {page_num}: already processed.")
+        page_done(base_name, page_num, "cached")
         return
 
-    try:
-        tables = camelot.read_pdf(pdf_path, pages=page_str, flavor="lattice")
-        if EXTRA_LOGGING:
-            print(f"  Found {len(tables)} tables on {
-                  base_name}, page {page_num}.")
-
-        if len(tables) == 0:
-            print(f"  No tables found on {base_name}, page {page_num}.")
-            return
-        # Check for tables with "Times Cast" and filter them out
-        valid_tables = []
-        for i, table in enumerate(tables):
-            if "Times Cast" in table.df.to_string():
-                # Save the skipped table
-                table.df.to_csv(f"{skipped_file}_table_{
-                                i + 1}.csv", index=False)
-            else:
-                valid_tables.append(table)
-
-        # If no valid tables remain, save the entire page's data and skip
-        if not valid_tables:
-            print(f"All tables on {base_name}, page {
-                  page_num} were skipped. Saving to skipped_pages.")
+    with trace_page(base_name, page_num, TRACE_DIRECTORY, PROFILE_STAGE) as trace:
+        status, table_count, row_count, error = "error", 0, 0, None
+        try:
+            with trace.phase("open"):
+                tables = camelot.read_pdf(
+                    pdf_path, pages=page_str, flavor="lattice", backend=RASTERIZER)
+            table_count = len(tables)
+            if EXTRA_LOGGING:
+                print(f"  Found {len(tables)} tables on {
+                      base_name}, page {page_num}.")
+
+            if len(tables) == 0:
+                if EXTRA_LOGGING:
+                    print(f"  No tables found on {base_name}, page {page_num}.")
+                status = "no_tables"
+                return
+            # Check for tables with "Times Cast" and filter them out
+            valid_tables = []
             for i, table in enumerate(tables):
-                table.df.to_csv(f"{skipped_file}_table_{
-                                i + 1}.csv", index=False)
-            return
-
-        # Process the remaining valid table(s)
-        for table in valid_tables:
-            # Convert the table to a DataFrame
-            df = table.df
-
-            # Transform the table
-            transformed_df = transform_table_precinct(df)
-
-            # Save the transformed table to a CSV
-            transformed_df.to_csv(output_file, index=False)
-    except Exception as e:
-        print(f"  Error processing {base_name}, page {page_num}: {e}")
-        with open(f"{skipped_file}_error.txt", "w") as error_file:
-            error_file.write(str(e))
+                if "Times Cast" in table.df.to_string():
+                    # Save the skipped table, and its turnout figures from the same extraction
+                    table.df.to_csv(f"{skipped_file}_table_{
+                                    i + 1}.csv", index=False)
+                    transform_table_turnout(table.df).to_csv(
+                        f"{skipped_file}_table_{i + 1}_turnout.csv", index=False)
+                else:
+                    valid_tables.append(table)
+
+            # If no valid tables remain, save the entire page's data and skip
+            if not valid_tables:
+                if EXTRA_LOGGING:
+                    print(f"All tables on {base_name}, page {
+                          page_num} were skipped. Saving to skipped_pages.")
+                for i, table in enumerate(tables):
+                    table.df.to_csv(f"{skipped_file}_table_{
+                                    i + 1}.csv", index=False)
+                status = "skipped"
+                return
+
+            # Process the remaining valid table(s); like the page file, the last one wins
+            page_df = None
+            for table in valid_tables:
+                # Convert the table to a DataFrame
+                df = table.df
+
+                # Transform the table
+                with trace.phase("transform"):
+                    transformed_df = transform_table_precinct(df)
+                row_count += len(transformed_df)
+
+                # Save the transformed table to a CSV
+                if PAGE_CACHE:
+                    with trace.phase("write"):
+                        write_race_csv(transformed_df, output_file)
+                page_df = transformed_df
+            status = "parsed"
+            return page_df
+        except Exception as e:
+            error = str(e)
+            if EXTRA_LOGGING:
+                print(f"  Error processing {base_name}, page {page_num}: {e}")
+            with open(f"{skipped_file}_error.txt", "w") as error_file:
+                error_file.write(str(e))
+        finally:
+            record = trace.finish(status, table_count, row_count)
+            page_done(base_name, page_num, status, record["seconds"], error)
+
+
+def invalidate_pages(pdf_file, page_nums):
+    """
+    Removes the parsed and skipped output for the given pages of a race PDF,
+    so the next process_pdf call extracts just those pages again.
+    """
+    race_name = os.path.splitext(pdf_file)[0]
+    parsed_dir, skipped_dir = create_directories(race_name)
+    for page_num in page_nums:
+        page_file = f"{race_name}_page_{page_num}.csv"
+        stale_files = [os.path.join(parsed_dir, page_file),
+                       os.path.join(skipped_dir, page_file)]
+        stale_files += glob.glob(os.path.join(skipped_dir, f"{page_file}_*"))
+        for stale_file in stale_files:
+            if os.path.exists(stale_file):
+                os.remove(stale_file)
 
 
 def process_pdf(pdf_file):
@@ -135,14 +235,38 @@ def process_pdf(pdf_file):
         reader = PdfReader(pdf_path)
         total_pages = len(reader.pages)
 
-        print(f"Processing {pdf_file} with {total_pages} pages...")
-        for page_num in range(1, total_pages + 1):
-            process_page(pdf_path, page_num, parsed_dir, skipped_dir)
-
+        if EXTRA_LOGGING:
+            print(f"Processing {pdf_file} with {total_pages} pages...")
         output_file = os.path.join(RACES_DIRECTORY, race_name, f"{
                                    race_name.lower()}.csv")
-        merge_parsed_csvs(parsed_dir, output_file)
-        print(f"  Merged all parsed tables into {output_file}.")
+        # Without the page cache the tables go straight from here to the merge,
+        # with no CSV written and parsed back in between
+        frames = []
+        for page_num in range(1, total_pages + 1):
+            page_df = process_page(pdf_path, page_num, parsed_dir, skipped_dir)
+            page_file = os.path.join(parsed_dir, f"{race_name}_page_{page_num}.csv")
+            if page_df is None and PROGRESSIVE_PAGES and PAGE_CACHE and os.path.exists(page_file):
+                page_df = read_race_csv(page_file)  # Already processed, but part of the partial results
+            if page_df is not None and (not PAGE_CACHE or PROGRESSIVE_PAGES):
+                frames.append(page_df)  # With the page cache, and no partial results, the race is merged from parsed/
+            if PROGRESSIVE_PAGES and page_num % PROGRESSIVE_PAGES == 0 and page_num < total_pages:
+                # Partial results: the race CSV so far, and how much of the race it covers
+                merged_df = merge_race_frames(frames, output_file) if frames else None
+                write_coverage(os.path.dirname(output_file), page_num, total_pages, count_precincts(merged_df))
+
+        if PAGE_CACHE:
+            merged_df = merge_parsed_csvs(parsed_dir, output_file)
+        elif frames:
+            merged_df = merge_race_frames(frames, output_file)
+        else:
+            merged_df = None
+            print(f"  No parsed tables to merge for {race_name}.")
+        if PROGRESSIVE_PAGES:
+            write_coverage(os.path.dirname(output_file), total_pages, total_pages, count_precincts(merged_df))
+        else:
+            clear_coverage(os.path.dirname(output_file))
+        if EXTRA_LOGGING:
+            print(f"  Merged all parsed tables into {output_file}.")
     except Exception as e:
         print(f"Error processing {pdf_file}: {e}")
 
@@ -155,15 +279,23 @@ def merge_parsed_csvs(parsed_dir, output_file):
         print(f"  No parsed CSV files to merge in {parsed_dir}.")
         return
 
-    merged_df = pd.concat((pd.read_csv(f)
-                          for f in csv_files), ignore_index=True)
-    merged_df.to_csv(output_file, index=False)
+    return merge_race_frames((read_race_csv(f) for f in csv_files), output_file)
+
+
+def merge_race_frames(frames, output_file):
+    """Concatenates a race's page tables into a single CSV, and returns them."""
+    merged_df = concat_race_frames(frames)
+    # Written under a temporary name first so generate_final_csv.py never
+    # reads half a race during a progressive run
+    write_race_csv(merged_df, f"{output_file}.tmp")
+    os.replace(f"{output_file}.tmp", output_file)
+    return merged_df
 
 
 if __name__ == '__main__':
     os.makedirs(RACES_DIRECTORY, exist_ok=True)
 
-    pdf_files = [f for f in os.listdir(INPUT_DIRECTORY) if f.endswith(".pdf")]
+    pdf_files = [f for f in os.listdir(INPUT_DIRECTORY) if f.endswith(".pdf") and selected_office(f)]
     if DEBUG_MODE:
         debug_file = "PRESIDENTIAL_ELECTORS.pdf"
         pdf_path = os.path.join(INPUT_DIRECTORY, debug_file)
@@ -204,7 +336,7 @@ if __name__ == '__main__':
 
                     # Extract and process tables from the page
                     tables = camelot.read_pdf(
-                        pdf_path, pages=str(page_num), flavor="lattice")
+                        pdf_path, pages=str(page_num), flavor="lattice", backend=RASTERIZER)
                     print(f"  Found {len(tables)} tables on page {page_num}.")
 
                     race_name = os.path.splitext(debug_file)[0]
@@ -231,7 +363,7 @@ if __name__ == '__main__':
                                     i + 1} is empty. Skipping...")
                                 continue
 
-                            transformed_df.to_csv(output_file, index=False)
+                            write_race_csv(transformed_df, output_file)
                             print(f"    Saved transformed table {
                                 i + 1} to {output_file}.")
                         except Exception as e:
@@ -243,9 +375,34 @@ if __name__ == '__main__':
                                 error_file.write(str(e))
             except Exception as e:
                 print(f"  Error processing {debug_file}: {e}")
+    elif WORK_QUEUE:
+        # Queue the pages; this host works on them alongside any remote workers
+        failed = run_county(WORK_QUEUE, os.path.dirname(os.path.abspath(__file__)), NUM_WORKERS)
+        records = collect_traces(TRACE_DIRECTORY, TRACE_FILE)
+        print(f"Wrote timings for {len(records)} pages processed here to {TRACE_FILE}")
+        if failed:
+            print(f"{failed} jobs failed; their pages are missing from the merged races.")
     else:
         # Process all files in parallel
-        with Pool(NUM_WORKERS) as pool:
-            pool.map(process_pdf, pdf_files)
+        for stale_trace in glob.glob(os.path.join(TRACE_DIRECTORY, "worker_*.jsonl")):
+            os.remove(stale_trace)
+        # In progressive mode the final output is regenerated as the races' partial results land
+        refresher = FinalRefresher(FINAL_SCRIPT, RACES_DIRECTORY) if PROGRESSIVE_PAGES else nullcontext()
+        with ProgressAggregator(RUN_SUMMARY_FILE) as progress, refresher:
+            for pdf_file in pdf_files:
+                race_name = os.path.splitext(pdf_file)[0]
+                total_pages = len(PdfReader(os.path.join(INPUT_DIRECTORY, pdf_file)).pages)
+                start_race(race_name, total_pages)
+                if PROGRESSIVE_PAGES:
+                    # Races a worker hasn't reached yet still count towards the pages to go
+                    create_directories(race_name)
+                    write_coverage(os.path.join(RACES_DIRECTORY, race_name), 0, total_pages, 0)
+            with Pool(NUM_WORKERS, initializer=init_worker, initargs=(progress.events,)) as pool:
+                pool.map(process_pdf, pdf_files)
+                # Let the workers exit on their own so their last progress events are flushed
+                pool.close()
+                pool.join()
+        records = collect_traces(TRACE_DIRECTORY, TRACE_FILE)
+        print(f"Wrote timings for {len(records)} pages to {TRACE_FILE}")
 
     print("Table extraction complete.")
@@ -0,0 +1,279 @@
+import io
+import os
+import sys
+import csv
+import json
+import glob
+import time
+import runpy
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import importlib.util
+from datetime import datetime
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+EXTRACT_PAGE_LIMIT = 25  # Pages per PDF for the camelot stages, unless --full is given
+TRANSFORM_REPEATS = 20  # transform_table_precinct is fast, so run it over the tables several times
+
+
+def repo_path(*parts):
+    return os.path.join(REPO_ROOT, *parts)
+
+
+def load_module(path, name):
+    """Imports a county script that has a __main__ guard (e.g. parsepdf.py) by path."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_script(script, workdir):
+    """Runs a county script from workdir, like we do by hand, with its printing silenced."""
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            runpy.run_path(script, run_name="__main__")
+    finally:
+        os.chdir(cwd)
+
+
+def count_lines(filename):
+    with open(filename, "r", encoding="utf-8-sig") as input_file:
+        return sum(1 for _ in input_file)
+
+
+def count_rows(filename):
+    with open(filename, "r", newline="") as csvfile:
+        return sum(1 for _ in csv.DictReader(csvfile))
+
+
+def pdf_page_count(pdf_path):
+    from PyPDF2 import PdfReader
+    return len(PdfReader(pdf_path).pages)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+# Each benchmark gets a scratch directory and returns (seconds, count, unit).
+# Only the stage itself is timed; copying inputs into place is not.
+
+def bench_split(script, input_pdf, workdir):
+    shutil.copy(input_pdf, workdir)
+    seconds = timed(lambda: run_script(script, workdir))
+    return seconds, pdf_page_count(input_pdf), "pages"
+
+
+def bench_extract(pdf_paths, page_limit, workdir):
+    import camelot
+    from common.rasterize import PageRasterizer
+    jobs = []
+    for pdf_path in pdf_paths:
+        total_pages = pdf_page_count(pdf_path)
+        jobs += [(pdf_path, page) for page in range(1, min(total_pages, page_limit or total_pages) + 1)]
+
+    def extract():
+        rasterizer = PageRasterizer()  # What parsepdf.py uses, starting cold
+        for pdf_path, page in jobs:
+            camelot.read_pdf(pdf_path, pages=str(page), flavor="lattice", backend=rasterizer)
+
+    return timed(extract), len(jobs), "pages"
+
+
+def bench_transform(county, pdf_path, page_limit, workdir):
+    import camelot
+    from common.rasterize import PageRasterizer
+    parsepdf = load_module(repo_path("PA", county, "parsepdf.py"), f"{county}_parsepdf")
+    total_pages = pdf_page_count(pdf_path)
+    pages = f"1-{min(total_pages, page_limit or total_pages)}"
+    frames = [table.df for table in camelot.read_pdf(pdf_path, pages=pages, flavor="lattice", backend=PageRasterizer())]
+
+    rows = 0
+
+    def transform():
+        nonlocal rows
+        for _ in range(TRANSFORM_REPEATS):
+            for df in frames:
+                rows += len(parsepdf.transform_table_precinct(df.copy()))
+
+    return timed(transform), rows, "rows"
+
+
+def bench_merge(county, workdir):
+    parsepdf = load_module(repo_path("PA", county, "parsepdf.py"), f"{county}_parsepdf")
+    parsed_dirs = sorted(glob.glob(repo_path("PA", county, "races", "*", "parsed")))
+    outputs = [os.path.join(workdir, f"{index}.csv") for index in range(len(parsed_dirs))]
+
+    def merge():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for parsed_dir, output in zip(parsed_dirs, outputs):
+                parsepdf.merge_parsed_csvs(parsed_dir, output)
+
+    seconds = timed(merge)
+    return seconds, sum(count_rows(output) for output in outputs if os.path.exists(output)), "rows"
+
+
+def bench_generate_final(county, workdir):
+    for race_csv in glob.glob(repo_path("PA", county, "races", "*", "*.csv")):
+        race_dir = os.path.join(workdir, "races", os.path.basename(os.path.dirname(race_csv)))
+        os.makedirs(race_dir, exist_ok=True)
+        shutil.copy(race_csv, race_dir)
+    seconds = timed(lambda: run_script(repo_path("PA", county, "generate_final_csv.py"), workdir))
+    return seconds, count_rows(os.path.join(workdir, "parsed_results.csv")), "rows"
+
+
+def bench_text_parser(script, input_file, workdir):
+    shutil.copy(input_file, workdir)
+    seconds = timed(lambda: run_script(script, workdir))
+    return seconds, count_lines(input_file), "lines"
+
+
+def bench_wayne(workdir):
+    shutil.copytree(repo_path("MI", "wayne", "split_races"), os.path.join(workdir, "split_races"))
+    pages = sum(pdf_page_count(pdf_path) for pdf_path in glob.glob(os.path.join(workdir, "split_races", "*.pdf")))
+    seconds = timed(lambda: run_script(repo_path("MI", "wayne", "parsepdf.py"), workdir))
+    return seconds, pages, "pages"
+
+
+def benchmarks(page_limit):
+    """Returns {stage name: callable(workdir)} for every benchmark."""
+    carbon_sections = sorted(glob.glob(repo_path("PA", "carbon", "split_sections", "*.pdf")))
+    montgomery_electors = repo_path("PA", "montgomery", "split_sections", "PRESIDENTIAL_ELECTORS.pdf")
+    return {
+        "split/carbon": lambda workdir: bench_split(
+            repo_path("PA", "carbon", "splitpdf.py"),
+            repo_path("PA", "carbon", "StatementOfVotesCastRPT.pdf"), workdir),
+        "split/wayne": lambda workdir: bench_split(
+            repo_path("MI", "wayne", "splitpdf.py"),
+            repo_path("MI", "wayne", "federal_offices.pdf"), workdir),
+        "extract/carbon": lambda workdir: bench_extract(carbon_sections, page_limit, workdir),
+        "extract/montgomery": lambda workdir: bench_extract([montgomery_electors], page_limit, workdir),
+        "transform/carbon": lambda workdir: bench_transform(
+            "carbon", carbon_sections[0], page_limit, workdir),
+        "transform/montgomery": lambda workdir: bench_transform(
+            "montgomery", montgomery_electors, page_limit, workdir),
+        "merge/carbon": lambda workdir: bench_merge("carbon", workdir),
+        "merge/montgomery": lambda workdir: bench_merge("montgomery", workdir),
+        "generate_final/carbon": lambda workdir: bench_generate_final("carbon", workdir),
+        "generate_final/montgomery": lambda workdir: bench_generate_final("montgomery", workdir),
+        "parse/cumberland_preprocess": lambda workdir: bench_text_parser(
+            repo_path("PA", "cumberland", "preprocess.py"),
+            repo_path("PA", "cumberland", "cumberland_data.txt"), workdir),
+        "parse/cumberland": lambda workdir: bench_text_parser(
+            repo_path("PA", "cumberland", "cumberland.py"),
+            repo_path("PA", "cumberland", "cumberland_cleaned.txt"), workdir),
+        "parse/dauphin": lambda workdir: bench_text_parser(
+            repo_path("PA", "dauphin", "dauphin.py"),
+            repo_path("PA", "dauphin", "dauphin_data.txt"), workdir),
+        "parse/lehigh": lambda workdir: bench_text_parser(
+            repo_path("PA", "lehigh", "lehigh.py"),
+            repo_path("PA", "lehigh", "precincts_8.csv"), workdir),
+        "parse/wayne": lambda workdir: bench_wayne(workdir),
+    }
+
+
+def run_child(stage, page_limit):
+    """Runs one benchmark in this process and prints its result as JSON; run_stage adds its peak memory."""
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        seconds, count, unit = benchmarks(page_limit)[stage](workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps({
+        "stage": stage,
+        "seconds": round(seconds, 4),
+        "count": count,
+        "unit": unit,
+        "throughput": round(count / seconds, 1) if seconds else None,
+    }))
+
+
+def run_stage(stage, page_limit):
+    """Runs a benchmark in a fresh interpreter so peak memory is measured per stage."""
+    args = [sys.executable, os.path.abspath(__file__), "--child", stage]
+    if page_limit is None:
+        args.append("--full")
+    # Output goes to files rather than pipes, since nothing reads them until the child exits
+    with tempfile.TemporaryFile("w+") as output, tempfile.TemporaryFile("w+") as errors:
+        process = subprocess.Popen(args, stdout=output, stderr=errors, text=True)
+        # wait4's peak RSS covers the stage and the worker processes it waited for, like
+        # regress.run_stage; the parent's own RUSAGE_SELF would leave the workers out (ru_maxrss is in KB)
+        _, status, usage = os.wait4(process.pid, 0)
+        output.seek(0)
+        errors.seek(0)
+        if os.waitstatus_to_exitcode(status) != 0:
+            return {"stage": stage, "error": errors.read().strip().splitlines()[-1:]}
+        result = json.loads(output.read().strip().splitlines()[-1])
+    result["peak_rss_mb"] = round(usage.ru_maxrss / 1024, 1)
+    return result
+
+
+def git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                            cwd=REPO_ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def print_results(results, baseline=None):
+    baseline = {result["stage"]: result for result in (baseline or {}).get("results", [])}
+    for result in results:
+        if "error" in result:
+            print(f"{result['stage']:<28} ERROR {result['error']}")
+            continue
+        line = (f"{result['stage']:<28} {result['seconds']:>8.2f}s "
+                f"{result['throughput']:>10} {result['unit']}/s "
+                f"{result['peak_rss_mb']:>8} MB peak")
+        previous = baseline.get(result["stage"])
+        if previous and previous.get("throughput"):
+            line += f"  ({result['throughput'] / previous['throughput']:.2f}x vs baseline)"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark each pipeline stage against the county inputs in the tree.")
+    parser.add_argument("stages", nargs="*", help="Stages to run (default: all). Prefixes like 'parse/' work too.")
+    parser.add_argument("--full", action="store_true",
+                        help=f"Extract every page instead of the first {EXTRACT_PAGE_LIMIT} of each PDF")
+    parser.add_argument("-o", "--output", help="Write results as JSON, for comparing across commits")
+    parser.add_argument("--compare", help="JSON results from an earlier run to compare against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    page_limit = None if args.full else EXTRACT_PAGE_LIMIT
+
+    if args.child:
+        run_child(args.child, page_limit)
+        sys.exit(0)
+
+    stages = [stage for stage in benchmarks(page_limit)
+              if not args.stages or any(stage.startswith(prefix) for prefix in args.stages)]
+    results = [run_stage(stage, page_limit) for stage in stages]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({
+                "commit": git_commit(),
+                "datetime": datetime.now().astimezone().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "page_limit": page_limit,
+                "results": results,
+            }, output_file, indent=2)
+        print(f"Results written to {args.output}")
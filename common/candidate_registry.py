@@ -0,0 +1,164 @@
+import os
+import csv
+import sys
+import json
+from difflib import SequenceMatcher
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.canonicalize import canonical_candidate, canonical_party, collapse_whitespace  # noqa: E402
+
+# Persistent registry file, shared by every county
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+REGISTRY_FILENAME = os.path.join(REPO_ROOT, "common", "candidate_registry.json")
+
+# Counties that print the party next to the candidate. Paths are relative to
+# the repository root; race CSVs without a party column take the office from
+# the race directory name.
+SEED_SOURCES = [
+    "PA/cumberland/cumberland_parsed.csv",
+    "PA/lehigh/lehigh_parsed.csv",
+    "PA/carbon/parsed_results.csv",
+    "PA/montgomery/races",
+]
+
+# Offices are spelled differently from county to county, so candidates are
+# blocked on the office family rather than the full office title.
+OFFICE_FAMILIES = [
+    ("PRESIDENT", "PRESIDENT"),
+    ("UNITED STATES SENATOR", "US SENATE"),
+    ("REPRESENTATIVE IN CONGRESS", "US HOUSE"),
+    ("ATTORNEY GENERAL", "ATTORNEY GENERAL"),
+    ("AUDITOR GENERAL", "AUDITOR GENERAL"),
+    ("STATE TREASURER", "STATE TREASURER"),
+    ("SENATOR IN THE GENERAL ASSEMBLY", "STATE SENATE"),
+    ("REPRESENTATIVE IN THE GENERAL ASSEMBLY", "STATE HOUSE"),
+]
+
+NAME_SUFFIXES = {"JR", "SR", "II", "III", "IV"}
+MATCH_THRESHOLD = 0.85  # Minimum similarity for a fuzzy match inside a block
+NON_CANDIDATES = {"", "WRITE-IN", "YES", "NO"}
+
+
+def office_family(office):
+    """Maps an office title onto its office family, e.g. "PRESIDENT OF THE UNITED STATES" -> "PRESIDENT"."""
+    office = collapse_whitespace(office or "").upper().replace("_", " ")
+    for prefix, family in OFFICE_FAMILIES:
+        if office.startswith(prefix):
+            return family
+    return office
+
+
+def last_name(candidate):
+    """Returns the last name of a canonical candidate name, ignoring suffixes like JR."""
+    parts = [part for part in candidate.split() if part not in NAME_SUFFIXES]
+    return parts[-1] if parts else candidate
+
+
+class CandidateRegistry:
+    """
+    Known candidates and their parties.
+    - Exact (name, office family) hits are a single dict lookup.
+    - Everything else is fuzzy matched, but only against the candidates that
+      share a last name (the blocking index), so lookups stay cheap no matter
+      how many races and years the registry holds.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.exact = {}  # (name, office family) -> entry
+        self.blocks = {}  # last name -> [entries]
+
+    def add(self, candidate, party, office="", source=""):
+        """Adds a candidate, returning False if it was missing a party or already known."""
+        name, inline_party = canonical_candidate(candidate)
+        party = canonical_party(party) or inline_party
+        family = office_family(office)
+        if name in NON_CANDIDATES or not party or (name, family) in self.exact:
+            return False
+
+        entry = {"name": name, "party": party, "office": family, "source": source}
+        self.entries.append(entry)
+        self.exact[(name, family)] = entry
+        self.blocks.setdefault(last_name(name), []).append(entry)
+        return True
+
+    def match(self, candidate, office=""):
+        """Returns the best registry entry for a candidate, or None if nothing is close enough."""
+        name, _ = canonical_candidate(candidate)
+        family = office_family(office)
+        entry = self.exact.get((name, family))
+        if entry:
+            return entry
+
+        block = self.blocks.get(last_name(name), [])
+        # Only candidates from the same office family: a shared last name in
+        # another race is a different person. Without an office, the whole block
+        if family:
+            block = [entry for entry in block if entry["office"] == family]
+        best, best_score = None, MATCH_THRESHOLD
+        for entry in block:
+            score = SequenceMatcher(None, name, entry["name"]).ratio()
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def lookup_party(self, candidate, office=""):
+        """Returns the party for a bare candidate name, or "" if it isn't in the registry."""
+        entry = self.match(candidate, office)
+        return entry["party"] if entry else ""
+
+    def save(self, filename=REGISTRY_FILENAME):
+        with open(filename, "w") as registry_file:
+            json.dump(self.entries, registry_file, indent=2)
+            registry_file.write("\n")
+
+    @classmethod
+    def load(cls, filename=REGISTRY_FILENAME):
+        registry = cls()
+        if os.path.exists(filename):
+            with open(filename, "r") as registry_file:
+                for entry in json.load(registry_file):
+                    registry.add(entry["name"], entry["party"],
+                                 entry["office"], entry.get("source", ""))
+        return registry
+
+
+def seed_from_csv(registry, csv_path, office="", source=""):
+    """
+    Adds every candidate in a results CSV to the registry.
+    Works with common-schema files (office and party columns) and with race
+    CSVs where the party is printed inline, e.g. "KAMALA D HARRIS(DEM)".
+    """
+    added = 0
+    with open(csv_path, "r", newline="") as csvfile:
+        for row in csv.DictReader(csvfile):
+            if registry.add(row.get("candidate"), row.get("party"),
+                            row.get("office") or office, source or csv_path):
+                added += 1
+    return added
+
+
+def seed_registry(registry, sources=SEED_SOURCES):
+    """Seeds the registry from SEED_SOURCES, walking race directories for race CSVs."""
+    for source in sources:
+        path = os.path.join(REPO_ROOT, source)
+        if os.path.isdir(path):
+            for race_dir in sorted(os.listdir(path)):
+                race_csv = os.path.join(path, race_dir, f"{race_dir.lower()}.csv")
+                if os.path.exists(race_csv):
+                    seed_from_csv(registry, race_csv, office=race_dir,
+                                  source=f"{source}/{race_dir}")
+        elif os.path.exists(path):
+            added = seed_from_csv(registry, path, source=source)
+            print(f"Added {added} candidates from {source}")
+        else:
+            print(f"Skipping {source}: not found.")
+    return registry
+
+
+if __name__ == "__main__":
+    # Rebuild the registry from the seed counties, keeping any hand-added entries
+    registry = seed_registry(CandidateRegistry.load())
+    registry.save()
+    print(f"Registry written to {REGISTRY_FILENAME} ({len(registry.entries)} candidates)")
@@ -0,0 +1,160 @@
+import re
+from functools import lru_cache
+
+from common.precincts import precinct_id
+
+# Canonical vote modes. Every county spells these a little differently, so each
+# raw spelling (upper-cased) maps onto one of "Election Day", "Mail-in",
+# "Provisional" or "Total".
+VOTE_MODE_RULES = {
+    "": "Total",  # Carbon only reports the per-precinct total
+    "TOTAL": "Total",
+    "TOTALS": "Total",
+    "ELECTION DAY": "Election Day",
+    "MACHINE": "Election Day",
+    "POLLS": "Election Day",
+    "MAIL": "Mail-in",
+    "MAIL-IN": "Mail-in",
+    "MAIL IN": "Mail-in",
+    "ABSENTEE": "Mail-in",
+    "ABSENTEE/MAIL-IN": "Mail-in",
+    "PROVISIONAL": "Provisional",
+    # Michigan (Wayne) reports early in-person voting, and absentee ballots
+    # processed before election day, separately from the other absentees
+    "EARLY VOTING": "Early Voting",
+    "PRE-PROCESS ABSENTEE": "Pre-Process Absentee",
+}
+
+WRITE_IN = "WRITE-IN"  # The canonical candidate for write-in votes that aren't tallied by name
+UNRESOLVED = "UNRESOLVED"  # The party of write-ins the county never resolved to a candidate (Carbon, Montgomery)
+
+# Canonical party codes use the three letter abbreviations printed by
+# Cumberland and Lehigh.
+PARTY_RULES = {
+    "DEM": "DEM",
+    "DEMOCRATIC": "DEM",
+    "REP": "REP",
+    "REPUBLICAN": "REP",
+    "LIB": "LIB",
+    "LIBRT": "LIB",
+    "LIBERTARIAN": "LIB",
+    "GRN": "GRN",
+    "GREEN": "GRN",
+    "CST": "CST",
+    "CON": "CST",
+    "CONSTITUTION": "CST",
+    "FWD": "FWD",
+    "FORWARD": "FWD",
+    "FOWARD": "FWD",
+    "ASP": "ASP",
+    "AMERICAN SOLIDARITY": "ASP",
+    # Michigan minor parties, as Wayne abbreviates them
+    "UST": "UST",
+    "U.S. TAXPAYERS": "UST",
+    "US TAXPAYERS": "UST",
+    "NLP": "NLP",
+    "NATURAL LAW": "NLP",
+    "WCP": "WCP",
+    "WORKING CLASS": "WCP",
+    "WRITE-IN": "",
+    "UNRESOLVED WRITE-IN": UNRESOLVED,
+}
+
+# Candidate spellings that can't be fixed by the generic cleanup below, e.g.
+# Lehigh prints presidential tickets as "Harris and Walz".
+CANDIDATE_ALIASES = {
+    "HARRIS AND WALZ": "KAMALA D HARRIS",
+    "TRUMP AND VANCE": "DONALD J TRUMP",
+    "OLIVER AND TER MAAT": "CHASE OLIVER",
+    "STEIN AND WARE": "JILL STEIN",
+    "WRITE-IN TOTALS": WRITE_IN,
+    "TOTALS": WRITE_IN,
+}
+
+# Candidate spellings of unresolved write-ins. They become WRITE-IN with the
+# UNRESOLVED party, so they stay apart from write-ins the county did resolve.
+UNRESOLVED_WRITE_INS = {"UNRESOLVED WRITE-IN", "(OTHER)"}
+
+INLINE_PARTY_PATTERN = re.compile(r"\(([^)]+)\)")
+RUNNING_MATE_PATTERN = re.compile(r"\s*/[^()]*")
+
+
+def collapse_whitespace(value):
+    """Collapses newlines, tabs and repeated spaces into single spaces."""
+    return " ".join(str(value).split())
+
+
+@lru_cache(maxsize=None)
+def canonical_vote_mode(raw):
+    """
+    Returns the canonical vote mode for a raw spelling.
+    Unknown spellings are returned cleaned up but otherwise unchanged.
+    """
+    if not isinstance(raw, str):
+        raw = ""
+    cleaned = collapse_whitespace(raw)
+    return VOTE_MODE_RULES.get(cleaned.upper(), cleaned)
+
+
+@lru_cache(maxsize=None)
+def canonical_party(raw):
+    """
+    Returns the canonical party code for a raw spelling.
+    Unknown parties are returned upper-cased so they still group together.
+    """
+    if not isinstance(raw, str):
+        return ""
+    cleaned = collapse_whitespace(raw).upper()
+    return PARTY_RULES.get(cleaned, cleaned)
+
+
+@lru_cache(maxsize=None)
+def canonical_candidate(raw):
+    """
+    Returns a (candidate, party) tuple for a raw candidate string.
+    - Upper-cases and collapses whitespace.
+    - Drops the running mate after a slash.
+    - Pulls an inline "(PARTY)" out of the name.
+    - Applies CANDIDATE_ALIASES.
+    party is "" when the raw string doesn't carry one.
+    Example:
+        "KAMALA D HARRIS / TIM WALZ (DEM)" -> ("KAMALA D HARRIS", "DEM")
+        "Harris and Walz" -> ("KAMALA D HARRIS", "")
+        "(Other)" -> ("WRITE-IN", "UNRESOLVED")
+    """
+    if not isinstance(raw, str):
+        return "", ""
+    candidate = collapse_whitespace(raw).upper()
+    if candidate in UNRESOLVED_WRITE_INS:
+        return WRITE_IN, UNRESOLVED
+    if candidate in CANDIDATE_ALIASES:
+        return CANDIDATE_ALIASES[candidate], ""
+
+    party = ""
+    match = INLINE_PARTY_PATTERN.search(candidate)
+    if match:
+        party = canonical_party(match.group(1))
+        candidate = INLINE_PARTY_PATTERN.sub("", candidate)
+
+    candidate = RUNNING_MATE_PATTERN.sub("", candidate)
+    candidate = collapse_whitespace(candidate.replace(".", ""))
+    return CANDIDATE_ALIASES.get(candidate, candidate), party
+
+
+def canonicalize_row(row):
+    """
+    Canonicalizes the candidate, party and vote_mode fields of a common-schema
+    row in place, adds its precinct_id, and returns it. WRITE-IN rows are
+    marked writein="yes" whatever the parser set. Each distinct raw value
+    is only resolved once, so this is cheap enough to call on every row as it
+    is written.
+    """
+    candidate, inline_party = canonical_candidate(row.get("candidate"))
+    row["candidate"] = candidate
+    row["party"] = canonical_party(row.get("party")) or inline_party
+    if candidate == WRITE_IN:
+        row["writein"] = "yes"
+    row["vote_mode"] = canonical_vote_mode(row.get("vote_mode"))
+    row["precinct_id"] = precinct_id(
+        row.get("state"), row.get("county"), row.get("precinct"))
+    return row
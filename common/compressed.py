@@ -0,0 +1,152 @@
+import io
+import os
+import gzip
+import queue
+import threading
+
+# Compression for open_output: None, "gzip" or "zstd". The county scripts pass
+# their own OUTPUT_COMPRESSION setting; zstd needs the zstandard package.
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+MAGIC = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+WRITE_CHUNK_BYTES = 1 << 20  # Text is handed to the compressor in chunks of this size
+WRITE_QUEUE_CHUNKS = 4  # Chunks waiting to be compressed before the writer blocks
+
+
+def output_path(path, compression=None):
+    """
+    Returns the file a writer actually writes.
+    Example:
+        ("parsed_results.csv", "gzip") -> "parsed_results.csv.gz"
+    """
+    if compression is None:
+        return path
+    if compression not in SUFFIXES:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {', '.join(SUFFIXES)}")
+    suffix = SUFFIXES[compression]
+    return path if path.endswith(suffix) else path + suffix
+
+
+def base_path(path):
+    """Strips a compression suffix: "lehigh_parsed.csv.zst" -> "lehigh_parsed.csv"."""
+    for suffix in SUFFIXES.values():
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def resolve_input(path):
+    """
+    Returns the file to read for a logical output name: whichever of path,
+    path.gz and path.zst was written last, so switching compression on or
+    off never leaves a reader on a stale copy. Returns path if none exist.
+    """
+    base = base_path(path)
+    candidates = [candidate for candidate in [base] + [base + suffix for suffix in SUFFIXES.values()]
+                  if os.path.exists(candidate)]
+    if not candidates:
+        return path
+    return max(candidates, key=os.path.getmtime)
+
+
+def input_exists(path):
+    return os.path.exists(resolve_input(path))
+
+
+class BackgroundWriter(io.RawIOBase):
+    """
+    Hands writes to a thread that compresses and writes them, so compression
+    overlaps with producing the rows (zlib releases the GIL while it works).
+    """
+
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+        self.chunks = queue.Queue(maxsize=WRITE_QUEUE_CHUNKS)
+        self.error = None
+        self.thread = threading.Thread(target=self.drain, daemon=True)
+        self.thread.start()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.error is not None:
+            raise self.error
+        self.chunks.put(bytes(data))
+        return len(data)
+
+    def drain(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                return
+            if self.error is None:
+                try:
+                    self.target.write(chunk)
+                except Exception as e:
+                    self.error = e
+
+    def close(self):
+        if self.closed:
+            return
+        self.chunks.put(None)
+        self.thread.join()
+        self.target.close()
+        super().close()
+        if self.error is not None:
+            raise self.error
+
+
+def zstandard_module():
+    try:
+        import zstandard
+    except ModuleNotFoundError as e:
+        raise RuntimeError("zstd compression requires the zstandard package (pip install zstandard)") from e
+    return zstandard
+
+
+def open_output(path, compression=None):
+    """
+    Opens a text file for writing (newline="" as the csv module wants),
+    compressed if compression is "gzip" or "zstd", in which case the suffix
+    is added to path. Compression runs off the writing thread: gzip in a
+    background thread, zstd on its own worker threads.
+    """
+    path = output_path(path, compression)
+    if compression is None:
+        return open(path, "w", newline="", encoding="utf-8")
+    if compression == "gzip":
+        raw = BackgroundWriter(gzip.open(path, "wb", compresslevel=GZIP_LEVEL))
+    else:
+        compressor = zstandard_module().ZstdCompressor(level=ZSTD_LEVEL, threads=-1)
+        raw = BackgroundWriter(compressor.stream_writer(open(path, "wb"), closefd=True))
+    return io.TextIOWrapper(io.BufferedWriter(raw, buffer_size=WRITE_CHUNK_BYTES), encoding="utf-8", newline="")
+
+
+def detect_compression(path):
+    with open(path, "rb") as input_file:
+        head = input_file.read(4)
+    for magic, compression in MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_input(path):
+    """
+    Opens a file written by open_output for reading as text (newline=""),
+    whatever its compression. The compression is sniffed from the first
+    bytes, and path may be the uncompressed name (see resolve_input).
+    """
+    path = resolve_input(path)
+    compression = detect_compression(path)
+    if compression is None:
+        return open(path, "r", newline="", encoding="utf-8-sig")
+    if compression == "gzip":
+        binary = gzip.open(path, "rb")
+    else:
+        binary = zstandard_module().ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        binary = io.BufferedReader(binary, buffer_size=WRITE_CHUNK_BYTES)
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
@@ -0,0 +1,132 @@
+import os
+import csv
+import sys
+import argparse
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.canonicalize import canonical_candidate, canonical_party, canonical_vote_mode  # noqa: E402
+from common.compressed import open_input  # noqa: E402
+from common.precincts import precinct_id  # noqa: E402
+
+DIFF_COLUMNS = [
+    "change", "precinct", "precinct_id", "office", "candidate", "party", "vote_mode",
+    "old_votes", "new_votes", "delta",
+]
+BALLOT_CHOICES = {"YES", "NO"}  # Older outputs put a ballot question's choice in party, with no candidate
+
+
+def parse_votes(value):
+    """Converts a votes cell to an int, treating blanks and masked values ("****") as 0."""
+    value = (value or "").replace(",", "").strip()
+    return int(value) if value.isdigit() else 0
+
+
+def row_key(row):
+    """
+    Returns the join key for a common-schema row:
+    (precinct_id, office, candidate, party, vote_mode).
+    Older outputs without canonical values or a precinct_id column are
+    canonicalized here, so releases written by different versions still line up.
+    """
+    pid = row.get("precinct_id") or precinct_id(
+        row.get("state"), row.get("county"), row.get("precinct"))
+    candidate, inline_party = canonical_candidate(row.get("candidate"))
+    party = canonical_party(row.get("party")) or inline_party
+    if not candidate and party in BALLOT_CHOICES:
+        candidate, party = party, ""
+    office = " ".join((row.get("office") or "").upper().split())
+    return pid, office, candidate, party, canonical_vote_mode(row.get("vote_mode"))
+
+
+def read_rows(filename):
+    """Streams the rows of a common-schema CSV, compressed or not."""
+    with open_input(filename) as csvfile:
+        yield from csv.DictReader(csvfile)
+
+
+def diff_rows(old_rows, new_rows, include_unchanged=False):
+    """
+    Hash joins two releases and yields one record per added, removed or
+    changed row. Only the old release's keys and votes are held in memory; the
+    new release is streamed past them.
+    - Rows that share a key (a source listing the same line twice) are all
+      kept and matched up in the order they appear.
+    """
+    old_votes = {}  # key -> [(votes, precinct)], in file order
+    for row in old_rows:
+        old_votes.setdefault(row_key(row), []).append((parse_votes(row.get("votes")), row.get("precinct")))
+
+    for row in new_rows:
+        key = row_key(row)
+        votes = parse_votes(row.get("votes"))
+        matches = old_votes.get(key)
+        if not matches:
+            change, old = "added", 0
+        else:
+            old, _ = matches.pop(0)
+            if not matches:
+                del old_votes[key]
+            if old == votes and not include_unchanged:
+                continue
+            change = "changed" if old != votes else "unchanged"
+        yield make_record(change, key, row.get("precinct"), old, votes)
+
+    # Whatever is left over was dropped from the new release
+    for key, matches in old_votes.items():
+        for votes, precinct in matches:
+            yield make_record("removed", key, precinct, votes, 0)
+
+
+def make_record(change, key, precinct, old_votes, new_votes):
+    pid, office, candidate, party, vote_mode = key
+    return {
+        "change": change,
+        "precinct": precinct,
+        "precinct_id": pid,
+        "office": office,
+        "candidate": candidate,
+        "party": party,
+        "vote_mode": vote_mode,
+        "old_votes": old_votes,
+        "new_votes": new_votes,
+        "delta": new_votes - old_votes,
+    }
+
+
+def diff_files(old_filename, new_filename, output_filename=None):
+    """
+    Diffs two common-schema outputs for the same county, writes the changed
+    rows to output_filename (if given) and returns summary counts.
+    """
+    summary = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0, "vote_delta": 0}
+    output_file = open(output_filename, "w", newline="") if output_filename else None
+    try:
+        writer = None
+        if output_file:
+            writer = csv.DictWriter(output_file, fieldnames=DIFF_COLUMNS)
+            writer.writeheader()
+        for record in diff_rows(read_rows(old_filename), read_rows(new_filename)):
+            summary[record["change"]] += 1
+            summary["vote_delta"] += record["delta"]
+            if writer:
+                writer.writerow(record)
+    finally:
+        if output_file:
+            output_file.close()
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Report what moved between two releases of a county's results.")
+    parser.add_argument("old", help="Earlier common-schema CSV, e.g. the UNOFFICIAL release")
+    parser.add_argument("new", help="Later common-schema CSV, e.g. the OFFICIAL release")
+    parser.add_argument("-o", "--output", help="Where to write the changed rows as CSV")
+    args = parser.parse_args()
+
+    summary = diff_files(args.old, args.new, args.output)
+    print(f"Added: {summary['added']}, removed: {summary['removed']}, "
+          f"changed: {summary['changed']}, net vote change: {summary['vote_delta']:+d}")
+    if args.output:
+        print(f"Changed rows written to {args.output}")
@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+from datetime import datetime
+
+import aiohttp
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.retrieval import file_digest, record_retrieval  # noqa: E402
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CACHE_DIRECTORY = os.path.join(REPO_ROOT, ".fetch_cache")  # Content-addressed copies of every download
+MAX_CONNECTIONS = 32  # Size of the shared connection pool
+PER_HOST_LIMIT = 4  # Concurrent requests allowed against any one county server
+REQUEST_TIMEOUT = 60  # Seconds
+POLL_INTERVAL = 180  # Seconds between polls with --poll
+
+# Where each county publishes its results, and the file in the tree the
+# county's first stage reads ("destination"). Where the county doesn't publish
+# that file itself, the download is saved as "download" and either:
+# - "convert" names a function in CONVERSIONS that builds the destination from it, or
+# - "manual" says how the destination is still made by hand; a changed
+#   download is reported rather than fed to the parse stages.
+# Destinations are only rewritten when their content changes, so the watch mode
+# (common/watch.py) only reprocesses counties that actually posted something new.
+SOURCES = [
+    {
+        "url": "https://cms5.revize.com/revize/carboncounty/Document%20Center/Service/Elections%20Voter%20Registration/2024%20General%20Results/StatementOfVotesCastRPT.pdf",
+        "destination": "PA/carbon/StatementOfVotesCastRPT.pdf",
+    },
+    {
+        # splitpdf.py picks the races out of the full report (its OFFICES)
+        "url": "https://www.montgomerycountypa.gov/DocumentCenter/View/45586/2024UnofficialGeneralElectionStatementofVotesCast?bidId=",
+        "destination": "PA/montgomery/StatementOfVotesCastRPT.pdf",
+    },
+    {
+        "url": "https://www.cumberlandcountypa.gov/DocumentCenter/View/52475/Official-Precinct-Report",
+        "download": "PA/cumberland/Official-Precinct-Report.pdf",
+        "destination": "PA/cumberland/cumberland_data.txt",
+        "convert": "pdf_text",
+    },
+    {
+        "url": "https://www.livevoterturnout.com/ENR/lehighpaenr/8/en/Index_8.html",
+        "download": "PA/lehigh/Index_8.html",
+        "destination": "PA/lehigh/precincts_8.csv",
+        "manual": "export the precinct results from the page as CSV and save them as precincts_8.csv",
+    },
+    {
+        "url": "https://www.dauphinc.org/election/?key=38",
+        "download": "PA/dauphin/election.html",
+        "destination": "PA/dauphin/dauphin_data.txt",
+        "manual": "copy each race's \"precinct by ballot\" page into dauphin_data.txt after its URL (see notes.txt)",
+    },
+    {
+        "url": "https://www.waynecounty.com/elected/clerk/election-results.aspx",
+        "download": "MI/wayne/election-results.html",
+        "destination": "MI/wayne/federal_offices.pdf",
+        "manual": "save the \"Partisan Offices\" report as partisan_offices.pdf; "
+                  "federal_offices.pdf is its pages 233-699 (see readme.md)",
+    },
+]
+
+
+class FetchCache:
+    """
+    Remembers what we downloaded from each URL:
+    - the ETag / Last-Modified validators for conditional requests.
+    - the sha256 of the content, which is also its filename under objects/.
+    - when it was last retrieved, and when it last changed.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        self.index_file = os.path.join(directory, "index.json")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.index = {}
+        if os.path.exists(self.index_file):
+            with open(self.index_file, "r") as index_file:
+                self.index = json.load(index_file)
+
+    def get(self, url):
+        return self.index.get(url)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest)
+
+    def store(self, url, body, headers, retrieved):
+        """Stores a downloaded body and returns True if it differs from the last download."""
+        digest = hashlib.sha256(body).hexdigest()
+        if not os.path.exists(self.object_path(digest)):
+            write_atomic(self.object_path(digest), body)
+
+        previous = self.index.get(url, {})
+        changed = previous.get("sha256") != digest
+        self.index[url] = {
+            "sha256": digest,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "datetime_retrieved": retrieved,
+            "datetime_changed": retrieved if changed else previous.get("datetime_changed", retrieved),
+            "size": len(body),
+        }
+        return changed
+
+    def touch(self, url, retrieved):
+        """Records a 304 Not Modified response."""
+        self.index[url]["datetime_retrieved"] = retrieved
+
+    def save(self):
+        write_atomic(self.index_file, json.dumps(self.index, indent=2).encode())
+
+
+def write_atomic(path, data):
+    """Writes a file via a temp file so readers never see a partial download."""
+    temp_path = f"{path}.part"
+    with open(temp_path, "wb") as output_file:
+        output_file.write(data)
+    os.replace(temp_path, path)
+
+
+def pdf_text(download):
+    """A PDF's text layer page by page, as selecting all of it in a viewer and pasting gives."""
+    import fitz  # PyMuPDF
+    with fitz.open(download) as doc:
+        return "".join(page.get_text() for page in doc).encode()
+
+
+# Conversions a source's "convert" can name: download path -> destination content
+CONVERSIONS = {
+    "pdf_text": pdf_text,
+}
+
+
+async def fetch_source(session, cache, source, root=REPO_ROOT):
+    """
+    Fetches one source with a conditional request and returns its status:
+    "unchanged" (304 or same content), "changed", "manual" (changed, but the
+    destination is still made by hand) or "error".
+    - Changed content is written to the source's destination in the tree
+      (converted first if the source says so), and when it was retrieved is
+      recorded next to it for the county scripts' DATETIME_RETRIEVED.
+    """
+    url = source["url"]
+    headers = {}
+    entry = cache.get(url)
+    if entry and os.path.exists(cache.object_path(entry["sha256"])):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    retrieved = datetime.now().astimezone().isoformat(timespec="seconds")
+    try:
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304:
+                cache.touch(url, retrieved)
+                return "unchanged"
+            response.raise_for_status()
+            body = await response.read()
+            response_headers = response.headers
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"  Error fetching {url}: {e}")
+        return "error"
+
+    download = os.path.join(root, source.get("download", source["destination"]))
+    if not cache.store(url, body, response_headers, retrieved) and os.path.exists(download):
+        return "unchanged"
+
+    os.makedirs(os.path.dirname(download), exist_ok=True)
+    write_atomic(download, body)
+    print(f"  Updated {source.get('download', source['destination'])} ({len(body)} bytes)")
+    if "manual" in source:
+        print(f"  {source['destination']} is made by hand: {source['manual']}")
+        return "manual"
+
+    destination = os.path.join(root, source["destination"])
+    if "convert" in source:
+        write_atomic(destination, CONVERSIONS[source["convert"]](download))
+        print(f"  Converted it to {source['destination']}")
+    record_retrieval(destination, url, retrieved, file_digest(destination))
+    return "changed"
+
+
+async def fetch_all(sources=SOURCES, cache=None, root=REPO_ROOT):
+    """Fetches every source concurrently over one pooled session and returns {url: status}."""
+    cache = cache or FetchCache()
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=PER_HOST_LIMIT)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        statuses = await asyncio.gather(
+            *(fetch_source(session, cache, source, root) for source in sources))
+    cache.save()
+    return {source["url"]: status for source, status in zip(sources, statuses)}
+
+
+async def poll(interval):
+    cache = FetchCache()
+    while True:
+        statuses = await fetch_all(cache=cache)
+        changed = sum(status == "changed" for status in statuses.values())
+        manual = sum(status == "manual" for status in statuses.values())
+        errors = sum(status == "error" for status in statuses.values())
+        print(f"{datetime.now():%H:%M:%S} polled {len(statuses)} sources: "
+              f"{changed} changed, {manual} to update by hand, {errors} errors")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Download county result files, skipping anything that hasn't changed.")
+    parser.add_argument("--poll", action="store_true",
+                        help=f"Keep polling every {POLL_INTERVAL} seconds")
+    args = parser.parse_args()
+
+    try:
+        if args.poll:
+            asyncio.run(poll(POLL_INTERVAL))
+        else:
+            statuses = asyncio.run(fetch_all())
+            for url, status in statuses.items():
+                print(f"{status:>9}  {url}")
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,142 @@
+import os
+import re
+from functools import lru_cache
+
+
+def office_key(title):
+    """
+    Puts a race title, or the name of the PDF it was split into, in the form
+    office patterns are matched against: upper case, with underscores and
+    punctuation as single spaces.
+    Examples:
+        "Representative_in_Congress_7th_District.pdf" -> "REPRESENTATIVE IN CONGRESS 7TH DISTRICT"
+        "REPRESENTATIVE IN CONGRESS-1ST CONGRESSIONAL DISTRICT" -> "REPRESENTATIVE IN CONGRESS 1ST CONGRESSIONAL DISTRICT"
+    """
+    if title.lower().endswith(".pdf"):
+        title = os.path.splitext(title)[0]
+    return re.sub(r"[^A-Z0-9]+", " ", title.upper()).strip()
+
+
+def office_filter(offices=None):
+    """
+    Returns a function telling whether a race title (or race PDF name) is one
+    of the offices to process, so the split and parse stages can skip the rest:
+        selected_office = office_filter(["UNITED STATES SENATOR", "REPRESENTATIVE IN CONGRESS"])
+        selected_office("Representative_in_Congress_7th_District.pdf") -> True
+    - offices is None for every race, a list of regular expressions, or a
+      ranking table like OFFICE_RANKING (its offices are taken literally).
+    - A pattern matches the start of the title as office_key gives it, the way
+      office_ranker matches prefixes.
+    - Each distinct title is only looked up once.
+    """
+    if offices is None:
+        return lambda title: True
+    if isinstance(offices, dict):
+        patterns = [re.escape(office_key(office)) for office in offices]
+    else:
+        patterns = list(offices)
+    if not patterns:
+        return lambda title: False
+    combined = re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+    @lru_cache(maxsize=None)
+    def selected_office(title):
+        return combined.match(office_key(title)) is not None
+    return selected_office
+
+
+def race_title(title):
+    """
+    Canonical form of a race title as a splitter read it: whitespace collapsed
+    and hyphen wraps rejoined.
+    Example:
+        "Electors of President and Vice- President of the United States"
+        -> "Electors of President and Vice-President of the United States"
+    """
+    title = " ".join(title.split())
+    return re.sub(r"(\w)- (\w)", r"\1-\2", title)
+
+
+def race_key(title):
+    """
+    Folds the forms one race's title takes on different pages (or in the
+    names of PDFs split from it) into one key: letters and digits only.
+    Example:
+        "Vice-President", "VicePresident", "Vice_President" -> "VICEPRESIDENT"
+    """
+    if title.lower().endswith(".pdf"):
+        title = os.path.splitext(title)[0]
+    return re.sub(r"[^A-Z0-9]", "", title.upper())
+
+
+def race_filename(title):
+    """The name a race's split PDF is saved under, e.g. "United States Senator" -> "United_States_Senator.pdf"."""
+    sanitized_title = (
+        "".join(c if c.isalnum() or c in " _-" else "_" for c in title)
+        .replace(" ", "_")  # Replace spaces with underscores
+        .replace("__", "_")  # Remove double underscores
+        .strip("_")  # Remove leading and trailing underscores
+    )
+    return f"{sanitized_title or 'Untitled'}.pdf"
+
+
+class RaceSections:
+    """
+    Collects each race's pages while a splitter scans a county PDF:
+        sections = RaceSections()
+        sections.add(title, page_num, layer.key)  # For every page of a race
+        for title, pages in sections.items(): ...  # One section per race
+    - Titles are canonicalized, and titles that only differ in how they
+      wrapped (race_key) fold into the first one seen, so a race that comes
+      back later in the document, or prints its title differently on its
+      continuation pages, still ends up in one section.
+    - A page whose fingerprint was already added to the same race is left
+      out, so a page the source repeats is only extracted once. A page that
+      holds several races is added to each of them.
+    """
+
+    def __init__(self):
+        self.titles = {}  # Race key -> title as first seen
+        self.pages = {}  # Race key -> page numbers
+        self.fingerprints = set()  # (race key, fingerprint) of every page added
+        self.folded = {}  # Other title -> the title it was folded into
+        self.duplicate_pages = []
+
+    def add(self, title, page_num, fingerprint):
+        """Adds a page to its race's section. Returns False if the page was already added to that race."""
+        title = race_title(title)
+        key = race_key(title)
+        if key not in self.titles:
+            self.titles[key] = title
+            self.pages[key] = []
+        elif title != self.titles[key]:
+            self.folded[title] = self.titles[key]
+        if (key, fingerprint) in self.fingerprints:
+            self.duplicate_pages.append(page_num)
+            return False
+        self.fingerprints.add((key, fingerprint))
+        self.pages[key].append(page_num)
+        return True
+
+    def items(self):
+        """(title, page numbers) per race, in the order the races first appear."""
+        return [(self.titles[key], pages) for key, pages in self.pages.items()]
+
+    def superseded(self, directory):
+        """
+        Lists split PDFs in directory left by an earlier split under another
+        form of one of these races' titles (e.g. "..._VicePresident_..." next to
+        "..._Vice-President_..."), which would otherwise be parsed twice.
+        """
+        if not os.path.isdir(directory):
+            return []
+        return [os.path.join(directory, pdf_file) for pdf_file in sorted(os.listdir(directory))
+                if pdf_file.endswith(".pdf") and race_key(pdf_file) in self.titles
+                and pdf_file != race_filename(self.titles[race_key(pdf_file)])]
+
+    def report(self):
+        for title, canonical in self.folded.items():
+            print(f"Folded \"{title}\" into \"{canonical}\"")
+        if self.duplicate_pages:
+            pages = ", ".join(str(page_num + 1) for page_num in self.duplicate_pages)
+            print(f"Left out {len(self.duplicate_pages)} duplicate pages (pages {pages})")
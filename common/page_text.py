@@ -0,0 +1,197 @@
+import re
+import sys
+import zlib
+import pickle
+import sqlite3
+import hashlib
+import argparse
+from contextlib import contextmanager
+
+import fitz  # PyMuPDF
+
+PAGE_TEXT_STORE = "page_text.sqlite"  # In the county directory, next to the source PDF
+
+# One row per distinct page. Pages are keyed by page_hash (like the watch
+# mode's page hashes), so a page has the same key in the county's PDF and in
+# the split race PDF it was copied into.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    hash TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    words BLOB NOT NULL,
+    blocks BLOB NOT NULL
+);
+"""
+
+
+PDF_REFERENCE = re.compile(r"(\d+) 0 R")
+UNHASHED_KEYS = {"Parent", "Contents"}  # The page tree, and the content stream page_hash reads itself
+
+
+def object_digest(doc, xref, digests, active=None):
+    """
+    Hash of a PDF object and everything it refers to, with references
+    replaced by the digests of their targets so the result doesn't depend on
+    object numbers. Keys are hashed in sorted order, streams decompressed.
+    digests memoizes objects by xref, for the pages of one document.
+    """
+    if xref in digests:
+        return digests[xref]
+    active = active if active is not None else set()
+    if xref in active:  # A back reference, e.g. an annotation's /P
+        return "cycle"
+    active.add(xref)
+    digest = hashlib.sha1()
+    for key in sorted(doc.xref_get_keys(xref)):
+        if key in UNHASHED_KEYS:
+            continue
+        kind, value = doc.xref_get_key(xref, key)
+        value = PDF_REFERENCE.sub(lambda match: object_digest(doc, int(match.group(1)), digests, active), value)
+        digest.update(f"/{key} {kind} {value}\n".encode())
+    if doc.xref_is_stream(xref):
+        digest.update(doc.xref_stream(xref) or b"")
+    active.discard(xref)
+    digests[xref] = digest.hexdigest()
+    return digests[xref]
+
+
+def page_hash(page, digests=None):
+    """
+    Fingerprint of everything a page's text layer is decoded from: its content
+    stream plus its resolved resources (fonts with their encodings and
+    ToUnicode maps, Form XObjects), media box and rotation. Pages that draw
+    the same content stream with different fonts or XObjects get different
+    hashes. Pass one digests dict for all the pages of a document so shared
+    resources are only hashed once.
+    """
+    digests = digests if digests is not None else {}
+    digest = hashlib.sha1(page.read_contents())
+    digest.update(object_digest(page.parent, page.xref, digests).encode())
+    return digest.hexdigest()
+
+
+def pack(rows):
+    """
+    Word and block tuples, pickled (exact floats, and 5x faster than JSON) and
+    lightly compressed. The store is a local cache only the pipeline writes.
+    """
+    return zlib.compress(pickle.dumps(rows, protocol=5), 1)
+
+
+def unpack(blob):
+    return pickle.loads(zlib.decompress(blob))
+
+
+class PageTextStore:
+    """
+    Every page's decoded text layer, stored once per distinct page:
+        store = PageTextStore("page_text.sqlite")
+        layer = store.page(doc[0])  # layer.text / .words / .blocks, as page.get_text would give them
+    - The split stage fills it while it scans the county PDF; later stages
+      look their pages up instead of decoding the text layer again.
+    - A page that isn't stored yet is decoded and added, so a stage never
+      depends on another having run first.
+    - words and blocks are only unpacked when asked for.
+    """
+
+    def __init__(self, path=PAGE_TEXT_STORE):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")  # It's a cache: losing the last pages on a crash is fine
+        self.connection.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.document = None  # The document digests belongs to
+        self.digests = {}
+
+    def decode(self, page):
+        """Decodes a page's text layer with PyMuPDF, once for all three forms; the one place it happens."""
+        textpage = page.get_textpage()
+        return (page.get_text("text", textpage=textpage), page.get_text("words", textpage=textpage),
+                page.get_text("blocks", textpage=textpage))
+
+    def page(self, page):
+        """Returns a page's PageText, decoding and storing it if it isn't stored yet."""
+        if page.parent is not self.document:
+            self.document, self.digests = page.parent, {}
+        key = page_hash(page, self.digests)
+        row = self.connection.execute("SELECT text, words, blocks FROM pages WHERE hash = ?", (key,)).fetchone()
+        if row is not None:
+            self.hits += 1
+            return PageText(key, *row)
+
+        self.misses += 1
+        text, words, blocks = self.decode(page)
+        words, blocks = pack(words), pack(blocks)
+        # Another process may have stored the same page meanwhile; the content is the same
+        self.connection.execute("INSERT OR IGNORE INTO pages (hash, text, words, blocks) VALUES (?, ?, ?, ?)",
+                                (key, text, words, blocks))
+        return PageText(key, text, words, blocks)
+
+    @contextmanager
+    def transaction(self):
+        """Groups the inserts of a scan over many pages into one commit."""
+        self.connection.execute("BEGIN")
+        try:
+            yield self
+        finally:
+            self.connection.execute("COMMIT")
+
+    def add_document(self, pdf_path):
+        """Stores every page of a PDF. Returns (pages, newly decoded)."""
+        misses = self.misses
+        with fitz.open(pdf_path) as doc, self.transaction():
+            for page in doc:
+                self.page(page)
+            return len(doc), self.misses - misses
+
+    def stats(self):
+        pages, stored_bytes = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(text) + LENGTH(words) + LENGTH(blocks)), 0) FROM pages").fetchone()
+        return {"pages": pages, "bytes": stored_bytes}
+
+    def close(self):
+        self.connection.close()
+
+
+class PageText:
+    """
+    A stored page's text layer. words and blocks are decompressed on first use;
+    key is the page's page_hash, which the splitters also use as its
+    fingerprint.
+    """
+
+    def __init__(self, key, text, words, blocks):
+        self.key = key
+        self.text = text
+        self.packed = {"words": words, "blocks": blocks}
+        self.unpacked = {}
+
+    def get(self, kind):
+        if kind not in self.unpacked:
+            self.unpacked[kind] = unpack(self.packed[kind])
+        return self.unpacked[kind]
+
+    @property
+    def words(self):
+        return self.get("words")
+
+    @property
+    def blocks(self):
+        return self.get("blocks")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill or inspect a county's page-text store.")
+    parser.add_argument("pdfs", nargs="*", help="PDFs whose pages to store")
+    parser.add_argument("--store", default=PAGE_TEXT_STORE)
+    args = parser.parse_args()
+
+    store = PageTextStore(args.store)
+    for pdf_path in args.pdfs:
+        pages, decoded = store.add_document(pdf_path)
+        print(f"{pdf_path}: {pages} pages, {decoded} decoded")
+    stats = store.stats()
+    print(f"{args.store}: {stats['pages']} pages, {stats['bytes'] / 1024 / 1024:.1f} MB", file=sys.stderr)
+    store.close()
@@ -0,0 +1,97 @@
+import re
+from functools import lru_cache
+
+# Precinct labels are spelled differently by every source, e.g.
+#   Lehigh:     "Allentown 10th Ward 1st Dist- 0017"
+#   Dauphin:    "City--1st Ward, 1st Precinct"
+#   Cumberland: "CARLISLE 1-1"
+#   Carbon:     "Summit Hill Borough - First Ward"
+# precinct_id() reduces each label to a normalized key and builds a stable ID
+# from it, e.g. "PA:DAUPHIN:CITY_W1_P1". The same precinct always gets the same
+# ID, so joins across releases and sources are plain dict lookups.
+
+STATE_CODES = {
+    "PENNSYLVANIA": "PA",
+    "MICHIGAN": "MI",
+}
+
+# Hand-maintained fixes for labels the normalization rules can't reconcile,
+# keyed by (county code, normalized key) -> normalized key.
+PRECINCT_ALIASES = {}
+
+ORDINAL_WORDS = {
+    "FIRST": "1", "SECOND": "2", "THIRD": "3", "FOURTH": "4", "FIFTH": "5",
+    "SIXTH": "6", "SEVENTH": "7", "EIGHTH": "8", "NINTH": "9", "TENTH": "10",
+}
+
+WORD_ABBREVIATIONS = {
+    "TOWNSHIP": "TWP",
+    "BOROUGH": "BORO",
+    "MOUNT": "MT",
+    "SAINT": "ST",
+}
+
+LEHIGH_CODE_PATTERN = re.compile(r"-\s*\d{4}$")  # "Alburtis- 0068"
+ORDINAL_PATTERN = re.compile(r"\b(\d+)(ST|ND|RD|TH)\b")
+WARD_PATTERN = re.compile(r"\b(\d+) WARD\b|\bWARD (\d+)\b")
+DISTRICT_PATTERN = re.compile(r"\b(\d+) (?:PRECINCT|PCT|DISTRICT|DIST)\b|\b(?:PRECINCT|PCT|DISTRICT|DIST) (\d+)\b")
+WARD_DISTRICT_PATTERN = re.compile(r"\b(\d+)-(\d+)$")  # "CARLISLE 1-1"
+TRAILING_NUMBER_PATTERN = re.compile(r"\b(\d+)$")  # "CAMP HILL 1"
+
+
+def county_code(state, county):
+    """Returns the ID prefix for a county, e.g. ("PENNSYLVANIA", "LEHIGH COUNTY") -> "PA:LEHIGH"."""
+    state = (state or "").strip().upper()
+    county = (county or "").strip().upper()
+    if county.endswith(" COUNTY"):
+        county = county[:-len(" COUNTY")]
+    return f"{STATE_CODES.get(state, state)}:{county.replace(' ', '_')}"
+
+
+@lru_cache(maxsize=None)
+def normalize_precinct(label):
+    """
+    Normalizes a precinct label into a key that is the same for every spelling:
+    - Upper-cases and drops Lehigh's trailing precinct code.
+    - Turns ordinals and ordinal words into plain numbers.
+    - Writes wards as "W<n>" and precincts/districts as "P<n>".
+    - Abbreviates TOWNSHIP, BOROUGH, etc.
+    Example:
+        "City--1st Ward, 1st Precinct" -> "CITY W1 P1"
+        "Allentown 10th Ward 1st Dist- 0017" -> "ALLENTOWN W10 P1"
+        "CARLISLE 1-1" -> "CARLISLE W1 P1"
+    """
+    if not isinstance(label, str):
+        return ""
+    key = LEHIGH_CODE_PATTERN.sub("", label.strip()).upper()
+    key = WARD_DISTRICT_PATTERN.sub(r"W\1 P\2", key)
+    key = re.sub(r"[^A-Z0-9 ]+", " ", key)
+    words = [ORDINAL_WORDS.get(word, WORD_ABBREVIATIONS.get(word, word))
+             for word in key.split()]
+    key = ORDINAL_PATTERN.sub(r"\1", " ".join(words))
+    key = WARD_PATTERN.sub(lambda m: f"W{m.group(1) or m.group(2)}", key)
+    key = DISTRICT_PATTERN.sub(lambda m: f"P{m.group(1) or m.group(2)}", key)
+    key = TRAILING_NUMBER_PATTERN.sub(r"P\1", key)
+    return " ".join(key.split())
+
+
+@lru_cache(maxsize=None)
+def precinct_id(state, county, label):
+    """Returns the stable precinct ID for a raw precinct label, or "" if there's no label."""
+    key = normalize_precinct(label)
+    if not key:
+        return ""
+    code = county_code(state, county)
+    key = PRECINCT_ALIASES.get((code, key), key)
+    return f"{code}:{key.replace(' ', '_')}"
+
+
+def index_by_precinct_id(rows):
+    """
+    Groups common-schema rows by precinct_id so they can be hash joined
+    against another release or the turnout data.
+    """
+    index = {}
+    for row in rows:
+        index.setdefault(row["precinct_id"], []).append(row)
+    return index
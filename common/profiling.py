@@ -0,0 +1,178 @@
+import os
+import sys
+import glob
+import json
+import time
+import pstats
+import cProfile
+import argparse
+import resource
+import contextlib
+
+# Per-page phases, in pipeline order
+TRACE_PHASES = ["open", "rasterize", "lattice_detect", "table_build", "transform", "write"]
+
+# Camelot methods that belong to each phase. Camelot's internals move around
+# between releases, so anything that doesn't exist in the installed version is
+# skipped; whatever isn't attributed to a phase below ends up in "open".
+CAMELOT_HOOKS = [
+    ("camelot.backends.ghostscript_backend", "GhostscriptBackend", "convert", "rasterize"),
+    ("camelot.backends.poppler_backend", "PopplerBackend", "convert", "rasterize"),
+    ("camelot.backends.pdfium_backend", "PdfiumBackend", "convert", "rasterize"),
+    ("camelot.backends.image_conversion", "ImageConversionBackend", "convert", "rasterize"),
+    ("camelot.backends.image_conversion", "ImageConversionBackend", "to_array", "rasterize"),
+    ("camelot.parsers.lattice", "Lattice", "_generate_image", "rasterize"),
+    ("camelot.parsers.lattice", "Lattice", "_generate_table_bbox", "lattice_detect"),
+    ("camelot.parsers.lattice", "Lattice", "_generate_table", "table_build"),
+]
+
+_current_trace = None  # The PageTrace being recorded in this worker process
+_instrumented = False
+
+
+class PageTrace:
+    """
+    Timing record for one page of a race PDF.
+    Phases nest (camelot rasterizes from inside line detection, for example),
+    so each phase only counts its own time, not the time of phases inside it.
+    """
+
+    def __init__(self, race, page, trace_dir, profile_stage=None):
+        self.race = race
+        self.page = page
+        self.trace_dir = trace_dir
+        self.profile_stage = profile_stage
+        self.phases = dict.fromkeys(TRACE_PHASES, 0.0)
+        self.stack = []  # [phase, time spent in nested phases]
+        self.started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        profiler = None
+        if name == self.profile_stage:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        self.stack.append([name, 0.0])
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            _, nested = self.stack.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - nested
+            if self.stack:
+                self.stack[-1][1] += elapsed
+            if profiler:
+                profiler.disable()
+                profile_file = os.path.join(
+                    self.trace_dir, f"{self.race}_page_{self.page}_{name}.prof")
+                profiler.dump_stats(profile_file)
+
+    def finish(self, status, tables=0, rows=0):
+        """Appends this page's record to the worker's trace file."""
+        record = {
+            "race": self.race,
+            "page": self.page,
+            "pid": os.getpid(),
+            "status": status,
+            "tables": tables,
+            "rows": rows,
+            "seconds": round(time.perf_counter() - self.started, 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            # ru_maxrss is in KB on Linux
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+        os.makedirs(self.trace_dir, exist_ok=True)
+        with open(os.path.join(self.trace_dir, f"worker_{os.getpid()}.jsonl"), "a") as trace_file:
+            trace_file.write(json.dumps(record) + "\n")
+        return record
+
+
+@contextlib.contextmanager
+def trace_page(race, page, trace_dir, profile_stage=None):
+    """Makes a PageTrace current for the camelot hooks while a page is processed."""
+    global _current_trace
+    instrument_camelot()
+    _current_trace = PageTrace(race, page, trace_dir, profile_stage)
+    try:
+        yield _current_trace
+    finally:
+        _current_trace = None
+
+
+def _wrap(method, phase):
+    def wrapper(*args, **kwargs):
+        if _current_trace is None:
+            return method(*args, **kwargs)
+        with _current_trace.phase(phase):
+            return method(*args, **kwargs)
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def instrument_camelot():
+    """Wraps the camelot methods in CAMELOT_HOOKS so their time is charged to the current page."""
+    global _instrumented
+    if _instrumented:
+        return
+    _instrumented = True
+    import importlib
+    for module_name, class_name, method_name, phase in CAMELOT_HOOKS:
+        try:
+            cls = getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError):
+            continue
+        method = cls.__dict__.get(method_name)
+        if callable(method) and not hasattr(method, "__wrapped__"):
+            setattr(cls, method_name, _wrap(method, phase))
+
+
+def collect_traces(trace_dir, trace_file):
+    """Merges every worker's records into one trace file, ordered by race and page."""
+    records = []
+    for worker_file in glob.glob(os.path.join(trace_dir, "worker_*.jsonl")):
+        with open(worker_file, "r") as input_file:
+            records += [json.loads(line) for line in input_file if line.strip()]
+        os.remove(worker_file)
+    records.sort(key=lambda record: (record["race"], record["page"]))
+    with open(trace_file, "w") as output_file:
+        for record in records:
+            output_file.write(json.dumps(record) + "\n")
+    return records
+
+
+def summarize(records, top=10):
+    """Prints where the time went: per phase, per race, and the slowest pages."""
+    total = sum(record["seconds"] for record in records) or 1.0
+    print(f"{len(records)} pages, {total:.1f}s of worker time")
+    print("By phase:")
+    for name in TRACE_PHASES:
+        seconds = sum(record["phases"].get(name, 0.0) for record in records)
+        print(f"  {name:<15} {seconds:>9.2f}s {100 * seconds / total:>5.1f}%")
+
+    print("By race:")
+    races = {}
+    for record in records:
+        race = races.setdefault(record["race"], {"pages": 0, "seconds": 0.0, "rows": 0})
+        race["pages"] += 1
+        race["seconds"] += record["seconds"]
+        race["rows"] += record["rows"]
+    for name, race in sorted(races.items(), key=lambda item: -item[1]["seconds"]):
+        print(f"  {name:<60} {race['pages']:>5} pages {race['seconds']:>9.2f}s {race['rows']:>8} rows")
+
+    print(f"Slowest {top} pages:")
+    for record in sorted(records, key=lambda record: -record["seconds"])[:top]:
+        print(f"  {record['race']} page {record['page']}: {record['seconds']:.2f}s "
+              f"({record['status']}, {record['tables']} tables, {record['peak_rss_mb']} MB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a parsepdf.py trace file.")
+    parser.add_argument("trace_file", help="e.g. PA/carbon/trace.jsonl")
+    parser.add_argument("--profile", help="A .prof file written with PROFILE_STAGE set, to print its top functions")
+    args = parser.parse_args()
+
+    with open(args.trace_file, "r") as input_file:
+        summarize([json.loads(line) for line in input_file if line.strip()])
+    if args.profile:
+        pstats.Stats(args.profile, stream=sys.stdout).sort_stats("cumulative").print_stats(25)
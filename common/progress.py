@@ -0,0 +1,173 @@
+import sys
+import json
+import time
+import queue
+import threading
+import multiprocessing
+
+PROGRESS_INTERVAL = 2  # Seconds between status line updates on a terminal
+PROGRESS_LOG_INTERVAL = 30  # Seconds between status lines when stderr is a file
+LAGGING_RACES = 3  # Unfinished races listed on the status line, furthest behind first
+
+_events = None  # Where this process sends its progress events, if anyone is listening
+
+
+def init_worker(events):
+    """Pool initializer: sends this worker's progress events to the aggregator's queue."""
+    global _events
+    _events = events
+
+
+def start_race(race, pages):
+    """Tells the aggregator how many pages a race has."""
+    if _events is not None:
+        _events.put(("start", race, {"pages": pages}))
+
+
+def page_done(race, page, status, seconds=0.0, error=None):
+    """
+    Reports one finished page. status is what the parser made of it, e.g.
+    "parsed", "skipped", "no_tables", "cached" (already processed) or "error".
+    """
+    if _events is not None:
+        _events.put(("page", race, {"page": page, "status": status, "seconds": seconds, "error": error}))
+
+
+def format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class ProgressAggregator:
+    """
+    Collects the workers' progress events on one queue and is the only thing
+    writing progress to the terminal:
+        with ProgressAggregator("run_summary.json") as progress:
+            with Pool(4, initializer=init_worker, initargs=(progress.events,)) as pool:
+                ...
+    The status line shows pages done / total, pages/s, ETA, error count and the
+    races furthest behind. At the end it prints a per-race summary and writes
+    it to summary_file.
+    """
+
+    def __init__(self, summary_file=None, stream=sys.stderr):
+        self.summary_file = summary_file
+        self.stream = stream
+        self.interactive = stream.isatty()
+        self.interval = PROGRESS_INTERVAL if self.interactive else PROGRESS_LOG_INTERVAL
+        self.events = multiprocessing.Queue()
+        self.races = {}  # race -> {"pages", "done", "seconds", "statuses", "errors"}
+        self.started = None
+        self.thread = None
+
+    def race(self, race):
+        return self.races.setdefault(
+            race, {"pages": None, "done": 0, "seconds": 0.0, "statuses": {}, "errors": []})
+
+    def apply(self, kind, race, fields):
+        record = self.race(race)
+        if kind == "start":
+            record["pages"] = fields["pages"]
+            return
+        record["done"] += 1
+        record["seconds"] += fields["seconds"]
+        record["statuses"][fields["status"]] = record["statuses"].get(fields["status"], 0) + 1
+        if fields["error"]:
+            record["errors"].append({"page": fields["page"], "error": fields["error"]})
+
+    def totals(self):
+        pages = sum(record["pages"] or record["done"] for record in self.races.values())
+        done = sum(record["done"] for record in self.races.values())
+        cached = sum(record["statuses"].get("cached", 0) for record in self.races.values())
+        errors = sum(len(record["errors"]) for record in self.races.values())
+        return pages, done, cached, errors
+
+    def status_line(self):
+        pages, done, cached, errors = self.totals()
+        elapsed = time.time() - self.started
+        # Pages that were already processed take no time, so they'd skew the rate
+        rate = (done - cached) / elapsed if elapsed > 0 else 0.0
+        eta = format_seconds((pages - done) / rate) if rate > 0 else "?"
+        line = (f"[{format_seconds(elapsed)}] {done}/{pages} pages"
+                f" ({100 * done / pages if pages else 0:.0f}%), {rate:.1f} pages/s, ETA {eta}, {errors} errors")
+        lagging = sorted((record["done"] / record["pages"], race) for race, record in self.races.items()
+                         if record["pages"] and record["done"] < record["pages"])
+        if lagging:
+            line += " | behind: " + ", ".join(
+                f"{race} {self.races[race]['done']}/{self.races[race]['pages']}"
+                for _, race in lagging[:LAGGING_RACES])
+        return line
+
+    def race_line(self, record):
+        statuses = ", ".join(f"{count} {status}" for status, count in sorted(record["statuses"].items()))
+        return (f"{record['done']}/{record['pages'] or record['done']} pages ({statuses}),"
+                f" {record['seconds']:.1f}s of work")
+
+    def write(self, line, end="\n"):
+        if self.interactive:
+            self.stream.write("\r\033[K")
+        self.stream.write(line + end)
+        self.stream.flush()
+
+    def run(self):
+        last_update = time.time()
+        while True:
+            try:
+                event = self.events.get(timeout=self.interval)
+            except queue.Empty:
+                event = None
+            if event == "stop":
+                return
+            if event is not None:
+                self.apply(*event)
+            if time.time() - last_update >= self.interval:
+                self.write(self.status_line(), end="" if self.interactive else "\n")
+                last_update = time.time()
+
+    def __enter__(self):
+        self.started = time.time()
+        init_worker(self.events)  # Pages processed in this process are counted too
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.events.put("stop")
+        self.thread.join()
+        init_worker(None)
+        # Anything still queued arrived after the stop marker
+        while True:
+            try:
+                self.apply(*self.events.get_nowait())
+            except queue.Empty:
+                break
+        self.finish()
+
+    def summary(self):
+        pages, done, cached, errors = self.totals()
+        elapsed = time.time() - self.started
+        return {
+            "pages": pages,
+            "done": done,
+            "cached": cached,
+            "errors": errors,
+            "seconds": round(elapsed, 2),
+            "pages_per_second": round((done - cached) / elapsed, 2) if elapsed > 0 else 0.0,
+            "races": {race: dict(record, seconds=round(record["seconds"], 2))
+                      for race, record in sorted(self.races.items())},
+        }
+
+    def finish(self):
+        summary = self.summary()
+        self.write(f"Done: {summary['done']}/{summary['pages']} pages in {format_seconds(summary['seconds'])}"
+                   f" ({summary['pages_per_second']} pages/s, {summary['cached']} already processed),"
+                   f" {summary['errors']} errors")
+        for race, record in summary["races"].items():
+            self.write(f"  {race}: {self.race_line(record)}")
+            for error in record["errors"]:
+                self.write(f"    page {error['page']}: {error['error']}")
+        if self.summary_file:
+            with open(self.summary_file, "w") as summary_file:
+                json.dump(summary, summary_file, indent=2)
+            self.write(f"Wrote the run summary to {self.summary_file}")
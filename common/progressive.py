@@ -0,0 +1,127 @@
+import os
+import sys
+import glob
+import json
+import time
+import threading
+import subprocess
+
+COVERAGE_FILENAME = "coverage.json"  # Per race (races/<race>/coverage.json) and per county
+REFRESH_INTERVAL = 10  # Seconds between runs of the final script while races are still changing
+
+
+def write_coverage(race_dir, pages_done, pages_total, precincts):
+    """
+    Records how much of a race its CSV covers so far, next to it. Written
+    to a temporary file and renamed, so readers never see half of one.
+    """
+    record = {
+        "race": os.path.basename(race_dir),
+        "pages_done": pages_done,
+        "pages_total": pages_total,
+        "precincts": precincts,
+        "complete": pages_done >= pages_total,
+        "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    path = os.path.join(race_dir, COVERAGE_FILENAME)
+    with open(f"{path}.tmp", "w") as coverage_file:
+        json.dump(record, coverage_file, indent=2)
+    os.replace(f"{path}.tmp", path)
+    return record
+
+
+def clear_coverage(race_dir):
+    """Removes a race's coverage record, which only progressive runs keep up to date."""
+    path = os.path.join(race_dir, COVERAGE_FILENAME)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def count_precincts(df):
+    return int(df["precinct"].nunique()) if df is not None and "precinct" in df.columns else 0
+
+
+def read_coverage(races_directory):
+    """Returns {race: coverage record} for the races that have one."""
+    coverage = {}
+    for path in sorted(glob.glob(os.path.join(races_directory, "*", COVERAGE_FILENAME))):
+        with open(path, "r") as coverage_file:
+            record = json.load(coverage_file)
+        coverage[record["race"]] = record
+    return coverage
+
+
+def write_county_coverage(races_directory, filename=COVERAGE_FILENAME):
+    """
+    Rolls the races' coverage up into one file next to the final output, so a
+    dashboard reading a partial parsed_results.csv knows what's still missing.
+    Returns the county record, or None if no race has coverage (not a
+    progressive run).
+    """
+    races = read_coverage(races_directory)
+    if not races:
+        if os.path.exists(filename):
+            os.remove(filename)  # Left by an earlier progressive run
+        return None
+    record = {
+        "complete": all(race["complete"] for race in races.values()),
+        "pages_done": sum(race["pages_done"] for race in races.values()),
+        "pages_total": sum(race["pages_total"] for race in races.values()),
+        "races": races,
+    }
+    with open(f"{filename}.tmp", "w") as coverage_file:
+        json.dump(record, coverage_file, indent=2)
+    os.replace(f"{filename}.tmp", filename)
+    return record
+
+
+class FinalRefresher:
+    """
+    Re-runs a county's final script (e.g. generate_final_csv.py) whenever the
+    race CSVs have changed, at most every REFRESH_INTERVAL seconds, while a
+    progressive extraction runs:
+        with FinalRefresher("generate_final_csv.py", "races"):
+            ...  # workers publish partial race CSVs
+    Each run rebuilds the final output from scratch out of whatever race CSVs
+    exist; nothing is merged incrementally. It always runs once more on exit,
+    even if no race CSV changed since the last run, because a worker writes
+    its race CSV before the county's coverage.json.
+    """
+
+    def __init__(self, script, races_directory, interval=REFRESH_INTERVAL):
+        self.script = script
+        self.races_directory = races_directory
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.last_seen = None
+        self.runs = 0
+        self.thread = None
+
+    def latest_change(self):
+        paths = glob.glob(os.path.join(self.races_directory, "*", "*.csv"))
+        return max((os.path.getmtime(path) for path in paths), default=None)
+
+    def refresh(self, force=False):
+        latest = self.latest_change()
+        if not force and (latest is None or latest == self.last_seen):
+            return
+        self.last_seen = latest
+        result = subprocess.run([sys.executable, self.script], capture_output=True, text=True)
+        self.runs += 1
+        if result.returncode != 0:
+            print(f"{self.script} failed during the progressive refresh: {result.stderr.strip()}", file=sys.stderr)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.refresh()
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stopped.set()
+        self.thread.join()
+        if exc_type is None:
+            self.refresh(force=True)
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Montgomery prints "****" instead of a count for some precincts
+MASKED_VOTES = "****"
+
+# Explicit schemas for the race CSVs, so read_csv never has to infer dtypes.
+# Every string column repeats a handful of values over thousands of rows, so
+# they're stored as categoricals; votes are nullable ints, with masked counts
+# as <NA>.
+RACE_DTYPES = {
+    "precinct": "category",
+    "method": "category",
+    "candidate": "category",
+    "party": "category",
+    "votes": "Int32",
+}
+
+
+def parse_votes(value):
+    """
+    Converts a vote count cell from camelot to an int, or None if it's masked.
+    Examples:
+        "1,088" -> 1088
+        "****" -> None
+    """
+    if pd.isna(value):
+        return None
+    value = str(value).replace(",", "").strip()
+    return int(value) if value.isdigit() else None
+
+
+def race_frame(records, columns):
+    """Builds a race DataFrame with the categorical schema from a list of dicts."""
+    df = pd.DataFrame.from_records(records, columns=columns)
+    if "votes" in df.columns:
+        df["votes"] = df["votes"].map(parse_votes)
+    return df.astype({column: RACE_DTYPES[column] for column in df.columns if column in RACE_DTYPES})
+
+
+def votes_column(series):
+    """Converts a categorical column of vote cells to Int32, parsing each distinct cell once."""
+    # The extra None at the end keeps missing values (code -1) missing
+    values = pd.array([parse_votes(cell) for cell in series.cat.categories] + [None], dtype="Int32")
+    return pd.Series(values[series.cat.codes.to_numpy()], index=series.index)
+
+
+def read_race_csv(path):
+    """Reads a race (or per-page) CSV with the categorical schema."""
+    columns = pd.read_csv(path, nrows=0).columns
+    # Votes are read as categories too: the C parser can't apply thousands=","
+    # to nullable ints, and there are only a few thousand distinct counts
+    dtype = {column: RACE_DTYPES[column] for column in columns if column in RACE_DTYPES}
+    if "votes" in dtype:
+        dtype["votes"] = "category"
+    df = pd.read_csv(path, dtype=dtype, keep_default_na=False)  # Empty cells stay ""
+    if "votes" in df.columns:
+        df["votes"] = votes_column(df["votes"])
+    return df
+
+
+def map_categories(series, fn):
+    """
+    Applies fn to each category of a categorical Series rather than to every
+    row, and returns the result as a categorical Series. fn may map several
+    categories to the same value.
+    """
+    values = [fn(category) for category in series.cat.categories]
+    categories = sorted(set(values))
+    positions = {value: position for position, value in enumerate(categories)}
+    # The extra -1 at the end keeps missing values (code -1) missing
+    lookup = np.array([positions[value] for value in values] + [-1])
+    codes = lookup[series.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=series.index)
+
+
+def concat_race_frames(frames):
+    """
+    Concatenates race DataFrames without losing the categorical dtypes.
+    pd.concat falls back to object columns when categories differ between
+    frames, so categorical columns are unioned first.
+    """
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    columns = list(frames[0].columns)
+    merged = {}
+    for column in columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            merged[column] = pd.Series(union_categoricals(
+                [df[column] for df in frames], sort_categories=True))
+        else:
+            merged[column] = pd.concat([df[column] for df in frames], ignore_index=True)
+    return pd.DataFrame(merged, columns=columns)
+
+
+def write_race_csv(df, path):
+    """Writes a race DataFrame, putting masked counts back as MASKED_VOTES."""
+    df.to_csv(path, index=False, na_rep=MASKED_VOTES)
@@ -0,0 +1,88 @@
+import os
+import hashlib
+from collections import OrderedDict
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+RASTER_RESOLUTION = 300  # DPI; camelot lattice's default
+RASTER_CACHE_BYTES = 256 * 1024 * 1024  # About 30 letter pages at 300 DPI
+
+
+class PageRasterizer:
+    """
+    camelot image-conversion backend that renders pages with PyMuPDF, e.g.
+        camelot.read_pdf(pdf_path, pages="3", flavor="lattice", backend=PageRasterizer())
+    - Pages are rendered straight to grayscale, the only thing lattice's line
+      detection looks at, and handed over as the BGR array it expects.
+    - Renders are kept in a bounded in-memory LRU keyed by (PDF content hash,
+      page, resolution), so retries, the debug path and re-runs of a page in
+      the same process don't rasterize it again. The key is the file's
+      content, not its path, so a re-split PDF with the same bytes still hits.
+    - Documents stay open between pages and are reopened if the file changes.
+    """
+
+    def __init__(self, resolution=RASTER_RESOLUTION, cache_bytes=RASTER_CACHE_BYTES):
+        self.resolution = resolution
+        self.cache_bytes = cache_bytes
+        self.cache = OrderedDict()  # (content hash, page, resolution) -> grayscale array
+        self.cached_bytes = 0
+        self.documents = {}  # path -> (size, mtime, content hash, fitz document)
+        self.hits = 0
+        self.misses = 0
+
+    def installed(self):
+        return True
+
+    def document(self, pdf_path):
+        """Returns (content hash, open document) for a PDF, reopening it if the file changed."""
+        path = os.path.abspath(pdf_path)
+        stat = os.stat(path)
+        cached = self.documents.get(path)
+        if cached is None or cached[:2] != (stat.st_size, stat.st_mtime):
+            if cached is not None:
+                cached[3].close()
+            with open(path, "rb") as pdf_file:
+                content_hash = hashlib.sha1(pdf_file.read()).hexdigest()
+            cached = (stat.st_size, stat.st_mtime, content_hash, fitz.open(path))
+            self.documents[path] = cached
+        return cached[2], cached[3]
+
+    def render(self, pdf_path, page=1, resolution=None):
+        """Returns the grayscale render of a page (1-based) as a uint8 array, from the cache if it's there."""
+        resolution = resolution or self.resolution
+        content_hash, document = self.document(pdf_path)
+        key = (content_hash, page, resolution)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return self.cache[key]
+
+        self.misses += 1
+        pixmap = document[page - 1].get_pixmap(dpi=resolution, colorspace=fitz.csGRAY, alpha=False)
+        gray = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.stride)
+        gray = gray[:, :pixmap.width].copy()
+        gray.flags.writeable = False  # Shared between callers through the cache
+
+        self.cache[key] = gray
+        self.cached_bytes += gray.nbytes
+        while self.cached_bytes > self.cache_bytes and len(self.cache) > 1:
+            _, evicted = self.cache.popitem(last=False)
+            self.cached_bytes -= evicted.nbytes
+        return gray
+
+    def to_array(self, pdf_path, resolution=None, page=1):
+        """camelot's in-memory hook: the page as a BGR array, like cv2.imread would give."""
+        return cv2.cvtColor(self.render(pdf_path, page, resolution), cv2.COLOR_GRAY2BGR)
+
+    def convert(self, pdf_path, png_path, resolution=None, page=1):
+        """camelot's file hook, used for plotting: writes the page as a PNG."""
+        cv2.imwrite(png_path, self.render(pdf_path, page, resolution))
+
+    def close(self):
+        for _, _, _, document in self.documents.values():
+            document.close()
+        self.documents = {}
+        self.cache.clear()
+        self.cached_bytes = 0
@@ -0,0 +1,315 @@
+import os
+import re
+import sys
+import csv
+import glob
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.compressed import SUFFIXES, base_path, detect_compression, input_exists, open_input, open_output  # noqa: E402
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+DIFF_LIMIT = 5  # Differing rows shown per file
+BUILD_DEPENDENT_CHARACTERS = re.compile(r"[()\s]")  # Kept or dropped in cell text, depending on the camelot build
+
+# Each county pipeline runs its scripts in order, in a scratch copy of the
+# county directory holding only the scripts and the inputs. A stage's goldens
+# are the committed files (globs, relative to the county directory) it must
+# reproduce; stages with no goldens are only held to their budget. A golden
+# may be committed compressed (e.g. parsed_results.csv.gz) when it's large.
+PIPELINES = {
+    "carbon": {
+        "directory": "PA/carbon",
+        "inputs": ["StatementOfVotesCastRPT.pdf"],
+        "stages": [
+            ("split", "splitpdf.py", []),
+            ("extract", "parsepdf.py", ["races/*/parsed/*.csv", "races/*/*.csv"]),
+            ("generate_final", "generate_final_csv.py", ["parsed_results.csv"]),
+        ],
+    },
+    "montgomery": {
+        "directory": "PA/montgomery",
+        "inputs": ["split_sections"],  # The county PDF isn't in the tree
+        "stages": [
+            ("extract", "parsepdf.py", ["races/*/parsed/*.csv", "races/*/*.csv"]),
+            ("generate_final", "generate_final_csv.py", ["parsed_results.csv"]),
+        ],
+    },
+    "cumberland": {
+        "directory": "PA/cumberland",
+        "inputs": ["cumberland_data.txt"],
+        "stages": [
+            ("preprocess", "preprocess.py", ["cumberland_cleaned.txt"]),
+            ("parse", "cumberland.py", ["cumberland_parsed.csv"]),
+        ],
+    },
+    "dauphin": {
+        "directory": "PA/dauphin",
+        "inputs": ["dauphin_data.txt"],
+        "stages": [
+            ("parse", "dauphin.py", []),
+        ],
+    },
+    "lehigh": {
+        "directory": "PA/lehigh",
+        "inputs": ["precincts_8.csv"],
+        "stages": [
+            ("parse", "lehigh.py", ["lehigh_parsed.csv"]),
+        ],
+    },
+    "wayne": {
+        "directory": "MI/wayne",
+        "inputs": ["federal_offices.pdf"],
+        "stages": [
+            ("split", "splitpdf.py", []),
+            ("parse", "parsepdf.py", []),
+        ],
+    },
+}
+
+# (seconds, peak MB) per stage, on a 4-core box; about 1.5x what the stage
+# takes today. Lower them when an optimization lands so it can't regress.
+BUDGETS = {
+    "carbon/split": (5, 150),
+    "carbon/extract": (30, 450),
+    "carbon/generate_final": (5, 150),
+    "montgomery/extract": (600, 850),
+    "montgomery/generate_final": (10, 250),
+    "cumberland/preprocess": (5, 100),
+    "cumberland/parse": (10, 150),
+    "dauphin/parse": (10, 150),
+    "lehigh/parse": (10, 150),
+    "wayne/split": (10, 200),
+    "wayne/parse": (30, 250),
+}
+
+
+def normalize_row(row):
+    """
+    Returns the row in comparable form. Values are compared as written,
+    except for formatting differences that carry no meaning:
+    - vote counts with or without thousands separators ("1,074" / "1074")
+    - "\\" or "/" in source_filename, depending on the OS that wrote it
+    - the spacing and parentheses of candidate cell text, which depend on the
+      camelot build that extracted it: "EUGENE DEPASQUALE(DEM)",
+      "EUGENE  DEPASQUALE (DEM)" and "EUGENE DEPASQUALE DEM" all compare equal,
+      as do "Unresolved Write-In" and "UnresolvedWrite-In"
+    Any other change in output, intended or not, fails until it's blessed.
+    """
+    row = {key: value or "" for key, value in row.items() if key is not None}
+    if "votes" in row:
+        row["votes"] = row["votes"].replace(",", "")
+    if "source_filename" in row:
+        row["source_filename"] = row["source_filename"].replace("\\", "/")
+    if "candidate" in row:
+        row["candidate"] = BUILD_DEPENDENT_CHARACTERS.sub("", row["candidate"])
+    return row
+
+
+def read_rows(filename, columns=None):
+    """Returns (columns, Counter of row tuples) for a CSV (compressed or not), keeping only the given columns."""
+    with open_input(filename) as csvfile:
+        reader = csv.DictReader(csvfile)
+        columns = columns or list(reader.fieldnames)
+        rows = Counter(tuple(normalize_row(row).get(column, "") for column in columns) for row in reader)
+    return columns, rows
+
+
+def compare_csv(golden_file, output_file):
+    """
+    Compares two CSVs row for row, ignoring order, on the golden's columns
+    (outputs may have gained columns since). Returns a list of differences.
+    """
+    columns, golden = read_rows(golden_file)
+    _, output = read_rows(output_file, list(columns))
+    differences = []
+    for label, rows in (("missing", golden - output), ("unexpected", output - golden)):
+        for row, count in rows.items():
+            differences.append(f"{label}: " + ",".join(row) + (f" (x{count})" if count > 1 else ""))
+    return differences
+
+
+def compare_text(golden_file, output_file):
+    with open_input(golden_file) as golden_text, open_input(output_file) as output_text:
+        golden, output = Counter(golden_text.read().splitlines()), Counter(output_text.read().splitlines())
+    return [f"missing: {line}" for line in golden - output] + [f"unexpected: {line}" for line in output - golden]
+
+
+def golden_files(golden_dir, pattern):
+    """The goldens matching a pattern, committed plain or compressed."""
+    return sorted(glob.glob(os.path.join(golden_dir, pattern))
+                  + [path for suffix in SUFFIXES.values() for path in glob.glob(os.path.join(golden_dir, pattern + suffix))])
+
+
+def compare_goldens(patterns, golden_dir, output_dir):
+    """Returns {relative path: [differences]} for every golden file matching the patterns that doesn't match."""
+    failures = {}
+    for pattern in patterns:
+        for golden_file in golden_files(golden_dir, pattern):
+            relative_path = base_path(os.path.relpath(golden_file, golden_dir))
+            output_file = os.path.join(output_dir, relative_path)
+            # A stage may write its output compressed; it's compared all the same
+            if not input_exists(output_file):
+                failures[relative_path] = ["not produced"]
+                continue
+            compare = compare_csv if relative_path.endswith(".csv") else compare_text
+            differences = compare(golden_file, output_file)
+            if differences:
+                failures[relative_path] = differences
+    return failures
+
+
+def prepare_workdir(pipeline, scratch_dir):
+    """Copies a county's scripts and inputs into scratch_dir, at the same depth so their common/ imports work."""
+    county_dir = os.path.join(REPO_ROOT, pipeline["directory"])
+    workdir = os.path.join(scratch_dir, pipeline["directory"])
+    os.makedirs(workdir)
+    os.symlink(os.path.join(REPO_ROOT, "common"), os.path.join(scratch_dir, "common"))
+    for script in glob.glob(os.path.join(county_dir, "*.py")):
+        shutil.copy(script, workdir)
+    for name in pipeline["inputs"]:
+        source = os.path.join(county_dir, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(workdir, name))
+        else:
+            shutil.copy(source, workdir)
+    return workdir
+
+
+def run_stage(script, workdir):
+    """Runs a county script like we do by hand. Returns (exit code, seconds, peak MB over its processes)."""
+    with open(os.path.join(workdir, f"{os.path.splitext(script)[0]}.log"), "w") as log_file:
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, script], cwd=workdir, stdout=log_file, stderr=subprocess.STDOUT)
+        # wait4's peak RSS covers the script and the worker processes it waited for (ru_maxrss is in KB)
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - started
+    return os.waitstatus_to_exitcode(status), seconds, usage.ru_maxrss / 1024
+
+
+_launcher = None
+
+
+def stage_launcher():
+    """
+    The process the stages are started from. A new process's peak RSS starts
+    out at that of the process that started it, so stages started by the
+    harness itself, once it has read a county's goldens, would all report at
+    least the harness's size. A one-worker forkserver pool, started while the
+    harness is still small, keeps the measurement to the stage.
+    """
+    global _launcher
+    if _launcher is None:
+        _launcher = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("forkserver"))
+    return _launcher
+
+
+def log_tail(script, workdir, lines=5):
+    with open(os.path.join(workdir, f"{os.path.splitext(script)[0]}.log"), "r") as log_file:
+        return log_file.read().splitlines()[-lines:]
+
+
+def bless(patterns, golden_dir, output_dir):
+    """
+    Copies a stage's outputs over its goldens, for an intended change in
+    output. A golden committed compressed is rewritten with the same compression.
+    """
+    for pattern in patterns:
+        for output_file in sorted(glob.glob(os.path.join(output_dir, pattern))):
+            golden_file = os.path.join(golden_dir, os.path.relpath(output_file, output_dir))
+            compressed = [golden_file + suffix for suffix in SUFFIXES.values() if os.path.exists(golden_file + suffix)]
+            os.makedirs(os.path.dirname(golden_file), exist_ok=True)
+            if not compressed:
+                shutil.copy(output_file, golden_file)
+                continue
+            with open_input(output_file) as source, \
+                    open_output(golden_file, detect_compression(compressed[0])) as target:
+                shutil.copyfileobj(source, target)
+
+
+def run_pipeline(county, keep=False, blessed=False):
+    """Runs one county's pipeline and returns a result per stage. blessed updates the goldens instead of checking them."""
+    pipeline = PIPELINES[county]
+    scratch_dir = tempfile.mkdtemp(prefix=f"regress_{county}_")
+    results = []
+    try:
+        workdir = prepare_workdir(pipeline, scratch_dir)
+        for name, script, patterns in pipeline["stages"]:
+            stage = f"{county}/{name}"
+            exit_code, seconds, peak_mb = stage_launcher().submit(run_stage, script, workdir).result()
+            budget_seconds, budget_mb = BUDGETS.get(stage, (None, None))
+            result = {"stage": stage, "seconds": round(seconds, 2), "peak_rss_mb": round(peak_mb, 1),
+                      "budget_seconds": budget_seconds, "budget_mb": budget_mb, "failures": []}
+            results.append(result)
+            if exit_code != 0:
+                result["failures"].append(f"{script} exited with {exit_code}: " + " / ".join(log_tail(script, workdir)))
+                break
+            if budget_seconds is not None and seconds > budget_seconds:
+                result["failures"].append(f"took {seconds:.1f}s, budget {budget_seconds}s")
+            if budget_mb is not None and peak_mb > budget_mb:
+                result["failures"].append(f"peaked at {peak_mb:.0f} MB, budget {budget_mb} MB")
+            golden_dir = os.path.join(REPO_ROOT, pipeline["directory"])
+            if blessed:
+                bless(patterns, golden_dir, workdir)
+            result["goldens"] = compare_goldens(patterns, golden_dir, workdir)
+            result["failures"] += [f"{path}: {len(differences)} difference(s)"
+                                   for path, differences in result["goldens"].items()]
+    finally:
+        if keep:
+            print(f"Kept {scratch_dir}")
+        else:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+    return results
+
+
+def print_result(result):
+    status = "FAIL" if result["failures"] else "ok"
+    budget = f"/{result['budget_seconds']}s" if result["budget_seconds"] is not None else ""
+    memory_budget = f"/{result['budget_mb']}" if result["budget_mb"] is not None else ""
+    print(f"{result['stage']:<28} {status:<4} {result['seconds']:>8.1f}s{budget:<6} "
+          f"{result['peak_rss_mb']:>7.0f}{memory_budget} MB")
+    for failure in result["failures"]:
+        print(f"  {failure}")
+    for path, differences in result.get("goldens", {}).items():
+        for difference in differences[:DIFF_LIMIT]:
+            print(f"    {path} {difference}")
+        if len(differences) > DIFF_LIMIT:
+            print(f"    {path} ... {len(differences) - DIFF_LIMIT} more")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-run the county pipelines on their committed inputs and check the outputs "
+                    "against the committed goldens and each stage against its time / memory budget.")
+    parser.add_argument("counties", nargs="*", help=f"Counties to run (default: all of {', '.join(PIPELINES)})")
+    parser.add_argument("-o", "--output", help="Write every stage's result as JSON")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directories for inspection")
+    parser.add_argument("--bless", action="store_true",
+                        help="Replace the goldens with the new outputs (after checking the differences are intended)")
+    args = parser.parse_args()
+
+    unknown = set(args.counties) - set(PIPELINES)
+    if unknown:
+        parser.error(f"Unknown counties: {', '.join(sorted(unknown))}")
+
+    results = []
+    for county in args.counties or PIPELINES:
+        for result in run_pipeline(county, args.keep, args.bless):
+            print_result(result)
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    failed = [result["stage"] for result in results if result["failures"]]
+    print(f"{len(results) - len(failed)}/{len(results)} stages passed" + (f"; failed: {', '.join(failed)}" if failed else ""))
+    sys.exit(1 if failed else 0)
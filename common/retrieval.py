@@ -0,0 +1,56 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+# common/fetch.py records when it downloaded each county input in a file next
+# to it, and the county scripts read DATETIME_RETRIEVED from there. Inputs that
+# are still downloaded or pasted by hand keep the time written in the script.
+RETRIEVAL_FILENAME = "retrieved.json"
+DATETIME_FORMAT = "%m/%d/%Y %I:%M %p"  # How DATETIME_RETRIEVED is written in the results
+
+
+def retrieval_file(path):
+    return os.path.join(os.path.dirname(path), RETRIEVAL_FILENAME)
+
+
+def read_retrievals(path):
+    """Returns the retrieval records of the inputs in path's directory, keyed by file name."""
+    try:
+        with open(retrieval_file(path), "r") as records_file:
+            return json.load(records_file)
+    except FileNotFoundError:
+        return {}
+
+
+def record_retrieval(path, url, retrieved, digest):
+    """
+    Records that the input at path was (re)built from url's content retrieved
+    at retrieved (an ISO timestamp) with sha256 digest.
+    """
+    records = read_retrievals(path)
+    records[os.path.basename(path)] = {"url": url, "datetime_retrieved": retrieved, "sha256": digest}
+    with open(retrieval_file(path), "w") as records_file:
+        json.dump(records, records_file, indent=2, sort_keys=True)
+        records_file.write("\n")
+
+
+def datetime_retrieved(path, default):
+    """
+    DATETIME_RETRIEVED for a county input: when common/fetch.py downloaded it,
+    or default if it didn't (or the input was replaced by hand since).
+    Example:
+        datetime_retrieved("StatementOfVotesCastRPT.pdf", "12/1/2024 09:12 PM") -> "12/03/2024 10:15 AM"
+    """
+    record = read_retrievals(path).get(os.path.basename(path))
+    if record is None or not os.path.exists(path) or file_digest(path) != record["sha256"]:
+        return default
+    return datetime.fromisoformat(record["datetime_retrieved"]).strftime(DATETIME_FORMAT)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as input_file:
+        for chunk in iter(lambda: input_file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
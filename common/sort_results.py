@@ -0,0 +1,130 @@
+import os
+import csv
+import sys
+import heapq
+import shutil
+import argparse
+import tempfile
+from functools import lru_cache
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.compressed import SUFFIXES, open_input, open_output, output_path  # noqa: E402
+
+SORT_BUDGET_ROWS = 200000  # Rows held in memory before a sorted run is spilled to disk
+
+# Default office ordering, the same one the county generate_final_csv.py scripts use
+OFFICE_RANKING = {
+    "PRESIDENTIAL ELECTORS": 1,
+    "UNITED STATES SENATOR": 2,
+    "REPRESENTATIVE IN CONGRESS": 3,
+    "ATTORNEY GENERAL": 4,
+    "AUDITOR GENERAL": 5,
+    "SENATOR IN THE GENERAL ASSEMBLY": 6,
+}
+
+
+def office_ranker(ranking=OFFICE_RANKING):
+    """
+    Returns a function giving an office's rank: the rank of the first prefix
+    in ranking it starts with, or infinity. Each distinct office is only
+    looked up once.
+    """
+    @lru_cache(maxsize=None)
+    def get_office_rank(office):
+        office = office.upper()
+        for key, rank in ranking.items():
+            if office.startswith(key):
+                return rank
+        return float("inf")  # Default rank for unlisted offices
+    return get_office_rank
+
+
+def result_sort_key(get_office_rank):
+    """Returns the compound sort key for common-schema rows: rank, office, precinct, candidate, vote_mode."""
+    def key(row):
+        return (get_office_rank(row["office"]), row["office"], row["precinct"],
+                row["candidate"], row["vote_mode"])
+    return key
+
+
+def write_run(rows, fieldnames, temp_dir):
+    run_file = tempfile.NamedTemporaryFile(
+        "w", newline="", suffix=".csv", dir=temp_dir, delete=False)
+    with run_file:
+        writer = csv.DictWriter(run_file, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    return run_file.name
+
+
+def read_run(run_path):
+    with open(run_path, "r", newline="") as run_file:
+        yield from csv.DictReader(run_file)
+
+
+def external_sort(rows, key, fieldnames, budget=SORT_BUDGET_ROWS):
+    """
+    Yields rows sorted by key, holding at most budget rows in memory.
+    - Input that fits in the budget is sorted in memory.
+    - Otherwise each budget-sized chunk is sorted and spilled to a temporary
+      CSV, and the runs are merged with a k-way heap merge.
+    The sort is stable, so rows with equal keys keep their input order. Rows
+    read back from a run have every field as a string.
+    """
+    buffer = []
+    runs = []
+    temp_dir = None
+    try:
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= budget:
+                if temp_dir is None:
+                    temp_dir = tempfile.mkdtemp(prefix="sort_runs_")
+                buffer.sort(key=key)
+                runs.append(write_run(buffer, fieldnames, temp_dir))
+                buffer = []
+        buffer.sort(key=key)
+        if not runs:
+            yield from buffer
+            return
+        # The in-memory remainder is the last run, so ties still come out in input order
+        yield from heapq.merge(*(read_run(run) for run in runs), buffer, key=key)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def sort_file(input_file, output_file, budget=SORT_BUDGET_ROWS, ranking=OFFICE_RANKING, compression=None):
+    """
+    Sorts a common-schema CSV into the final output order, and returns the row
+    count. The input may be compressed; compression ("gzip" / "zstd") applies
+    to the output.
+    """
+    key = result_sort_key(office_ranker(ranking))
+    count = 0
+    with open_input(input_file) as infile, open_output(output_file, compression) as outfile:
+        reader = csv.DictReader(infile)
+        writer = csv.DictWriter(outfile, fieldnames=reader.fieldnames)
+        writer.writeheader()
+        for row in external_sort(reader, key, reader.fieldnames, budget):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sort a common-schema CSV by office rank, office, precinct, candidate and vote mode.")
+    parser.add_argument("input", help="e.g. a statewide concatenation of county outputs")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--budget", type=int, default=SORT_BUDGET_ROWS,
+                        help=f"Rows to hold in memory per sorted run (default {SORT_BUDGET_ROWS})")
+    parser.add_argument("--compress", choices=sorted(SUFFIXES), help="Compress the output (adds .gz / .zst)")
+    args = parser.parse_args()
+
+    output_file = output_path(args.output, args.compress)
+    if os.path.abspath(args.input) == os.path.abspath(output_file):
+        parser.error("output must be a different file than input")
+    count = sort_file(args.input, args.output, args.budget, compression=args.compress)
+    print(f"Sorted {count} rows into {output_file}")
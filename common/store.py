@@ -0,0 +1,162 @@
+import os
+import re
+import csv
+import sys
+import shutil
+import argparse
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.compressed import open_input  # noqa: E402
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+STORE_DIRECTORY = os.path.join(REPO_ROOT, "store")
+PARTITION_FILENAME = "results.csv"
+
+# Partition levels, outermost first. Each level is a directory named
+# "<column>=<slug>", e.g.
+#   store/election=2024_GENERAL/state=PENNSYLVANIA/county=CUMBERLAND_COUNTY/office=UNITED_STATES_SENATOR/results.csv
+PARTITION_COLUMNS = ["election", "state", "county", "office"]
+
+
+def partition_slug(value):
+    """
+    Returns the directory-safe form of a partition value.
+    Example:
+        "Representative in the General Assembly in the 22nd Legis" -> "REPRESENTATIVE_IN_THE_GENERAL_ASSEMBLY_IN_THE_22ND_LEGIS"
+    """
+    slug = re.sub(r"[^A-Z0-9]+", "_", str(value or "").upper()).strip("_")
+    return slug or "UNKNOWN"
+
+
+def partition_dir(row, store=STORE_DIRECTORY, columns=PARTITION_COLUMNS):
+    return os.path.join(store, *(f"{column}={partition_slug(row[column])}" for column in columns))
+
+
+def publish(results_file, store=STORE_DIRECTORY):
+    """
+    Writes a county output into the store, one file per office.
+    Only the partitions of the election / state / county in the file are
+    touched: they're rebuilt in a staging directory and swapped in, so
+    queries never see a half-written county and no other partition changes.
+    Returns {county directory: row count}.
+    """
+    writers = {}
+    counts = {}
+    staging = {}  # county directory -> staging directory
+    with open_input(results_file) as infile:
+        reader = csv.DictReader(infile)
+        try:
+            for row in reader:
+                county_dir = partition_dir(row, store, PARTITION_COLUMNS[:-1])
+                if county_dir not in staging:
+                    staging[county_dir] = f"{county_dir}.staging"
+                    shutil.rmtree(staging[county_dir], ignore_errors=True)
+                office_dir = os.path.join(
+                    staging[county_dir], f"office={partition_slug(row['office'])}")
+                if office_dir not in writers:
+                    os.makedirs(office_dir, exist_ok=True)
+                    output_file = open(os.path.join(office_dir, PARTITION_FILENAME), "w", newline="")
+                    writer = csv.DictWriter(output_file, fieldnames=reader.fieldnames)
+                    writer.writeheader()
+                    writers[office_dir] = (output_file, writer)
+                writers[office_dir][1].writerow(row)
+                counts[county_dir] = counts.get(county_dir, 0) + 1
+        finally:
+            for output_file, _ in writers.values():
+                output_file.close()
+
+    for county_dir, staging_dir in staging.items():
+        previous_dir = f"{county_dir}.previous"
+        shutil.rmtree(previous_dir, ignore_errors=True)
+        if os.path.exists(county_dir):
+            os.replace(county_dir, previous_dir)
+        os.replace(staging_dir, county_dir)
+        shutil.rmtree(previous_dir, ignore_errors=True)
+    return counts
+
+
+def partitions(store=STORE_DIRECTORY, **predicates):
+    """
+    Returns the partition files matching the predicates, e.g.
+        partitions(election="2024 GENERAL", county="CUMBERLAND COUNTY")
+    A predicate is a value or a list/set of values. Levels with a predicate
+    go straight to the matching directories without listing their siblings,
+    so other elections or counties are never read, or even listed.
+    """
+    unknown = set(predicates) - set(PARTITION_COLUMNS)
+    if unknown:
+        raise ValueError(f"Not partition columns: {', '.join(sorted(unknown))}")
+
+    directories = [store]
+    for column in PARTITION_COLUMNS:
+        wanted = predicates.get(column)
+        next_directories = []
+        for directory in directories:
+            if wanted is None:
+                if os.path.isdir(directory):
+                    next_directories += [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                                         if name.startswith(f"{column}=") and "." not in name]
+                continue
+            values = [wanted] if isinstance(wanted, str) else wanted
+            for value in values:
+                candidate = os.path.join(directory, f"{column}={partition_slug(value)}")
+                if os.path.isdir(candidate):
+                    next_directories.append(candidate)
+        directories = next_directories
+    return [os.path.join(directory, PARTITION_FILENAME) for directory in directories
+            if os.path.exists(os.path.join(directory, PARTITION_FILENAME))]
+
+
+def query(store=STORE_DIRECTORY, where=None, **predicates):
+    """
+    Yields rows from the partitions matching the predicates. where is an
+    optional row filter for everything that isn't a partition column, e.g.
+        query(election="2024 GENERAL", office="UNITED STATES SENATOR",
+              where=lambda row: row["vote_mode"] == "Mail-in")
+    """
+    for partition_file in partitions(store, **predicates):
+        with open(partition_file, "r", newline="") as infile:
+            for row in csv.DictReader(infile):
+                if where is None or where(row):
+                    yield row
+
+
+def parse_predicates(args):
+    return {column: getattr(args, column) for column in PARTITION_COLUMNS if getattr(args, column)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partitioned store of results by election / state / county / office.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    publish_parser = subparsers.add_parser("publish", help="Write county outputs into the store")
+    publish_parser.add_argument("results", nargs="+", help="e.g. PA/cumberland/cumberland_parsed.csv")
+
+    for name, help_text in (("list", "List the matching partitions"), ("query", "Write the matching rows as CSV")):
+        subparser = subparsers.add_parser(name, help=help_text)
+        for column in PARTITION_COLUMNS:
+            subparser.add_argument(f"--{column}", action="append",
+                                   help=f"Only this {column} (repeatable), e.g. --election '2024 GENERAL'")
+        if name == "query":
+            subparser.add_argument("-o", "--output", help="Output CSV (default: stdout)")
+
+    args = parser.parse_args()
+    if args.command == "publish":
+        for results_file in args.results:
+            for county_dir, count in publish(results_file).items():
+                print(f"{results_file}: {count} rows -> {os.path.relpath(county_dir, REPO_ROOT)}")
+    elif args.command == "list":
+        for partition_file in partitions(**parse_predicates(args)):
+            print(os.path.relpath(os.path.dirname(partition_file), STORE_DIRECTORY))
+    else:
+        output_file = open(args.output, "w", newline="") if args.output else sys.stdout
+        writer = None
+        for row in query(**parse_predicates(args)):
+            if writer is None:
+                # Counties add their own columns (e.g. Dauphin's jurisdiction); keep the first file's
+                writer = csv.DictWriter(output_file, fieldnames=list(row), extrasaction="ignore", restval="")
+                writer.writeheader()
+            writer.writerow(row)
+        if args.output:
+            output_file.close()
@@ -0,0 +1,90 @@
+import os
+import sys
+import csv
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.canonicalize import canonical_vote_mode  # noqa: E402
+from common.precincts import precinct_id  # noqa: E402
+
+# The turnout table the parsers write next to their results, from the same
+# read of the source: registered voters and ballots cast per precinct and vote
+# mode. registered_voters is a precinct figure, repeated on each mode's row.
+TURNOUT_COLUMNS = ["election", "state", "county", "precinct", "precinct_id", "vote_mode",
+                   "registered_voters", "ballots_cast", "turnout_percent",
+                   "source_filename", "source_location"]
+
+
+def parse_count(value):
+    """
+    Converts a count as printed to an int, or None if there isn't one.
+    Examples:
+        "1,074" -> 1074
+        "" -> None
+    """
+    value = str(value).replace(",", "").strip()
+    return int(value) if value.isdigit() else None
+
+
+def parse_percent(value):
+    """
+    Converts a printed percentage to a float, or None if there isn't one.
+    Examples:
+        "85.29%" -> 85.29
+        "N/A" -> None
+    """
+    try:
+        return float(str(value).replace("%", "").strip())
+    except ValueError:
+        return None
+
+
+def turnout_row(election, state, county, precinct, vote_mode, registered_voters, ballots_cast,
+                source_filename, source_location, turnout_percent=None):
+    """
+    Builds a turnout row, keyed the same way canonicalize_row keys the results.
+    turnout_percent is the printed figure; if the source doesn't print one it's
+    worked out from the counts.
+    """
+    if turnout_percent is None and registered_voters and ballots_cast is not None:
+        turnout_percent = round(100 * ballots_cast / registered_voters, 2)
+    return {
+        "election": election,
+        "state": state,
+        "county": county,
+        "precinct": precinct,
+        "precinct_id": precinct_id(state, county, precinct),
+        "vote_mode": canonical_vote_mode(vote_mode),
+        "registered_voters": "" if registered_voters is None else registered_voters,
+        "ballots_cast": "" if ballots_cast is None else ballots_cast,
+        "turnout_percent": "" if turnout_percent is None else turnout_percent,
+        "source_filename": source_filename,
+        "source_location": source_location,
+    }
+
+
+def write_turnout(filename, rows):
+    """
+    Writes turnout rows, keeping the first row for each precinct and vote mode:
+    sources that repeat the statistics on every race's pages give the same
+    figures each time. Returns the number of rows written.
+    """
+    seen = set()
+    count = 0
+    with open(filename, "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=TURNOUT_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            key = (row["precinct_id"], row["vote_mode"])
+            if key in seen:
+                continue
+            seen.add(key)
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def read_turnout(filename):
+    """Streams the rows of a turnout CSV, e.g. the per-page ones to be combined with write_turnout."""
+    with open(filename, "r", newline="") as csvfile:
+        yield from csv.DictReader(csvfile)
@@ -0,0 +1,188 @@
+import os
+import sys
+import csv
+import argparse
+
+import pandas as pd
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.canonicalize import canonical_candidate  # noqa: E402
+from common.compressed import base_path, open_input, input_exists  # noqa: E402
+from common.precincts import precinct_id  # noqa: E402
+
+TOTAL_MODE = "Total"
+RACE_KEY = ["office", "precinct_id", "candidate"]
+VIOLATION_COLUMNS = ["check", "office", "precinct", "candidate", "vote_mode", "detail",
+                     "source_filename", "source_location"]
+
+# The parsers that drop the source's own Total column write it to a
+# "<county>_totals.csv" sidecar instead, so the modes can be checked against it
+TOTALS_COLUMNS = ["precinct", "precinct_id", "office", "candidate", "votes",
+                  "source_filename", "source_location"]
+
+
+def totals_row(state, county, precinct, office, candidate, votes, source_filename, source_location):
+    """Builds a totals sidecar row, keyed the same way canonicalize_row keys the results."""
+    return {
+        "precinct": precinct,
+        "precinct_id": precinct_id(state, county, precinct),
+        "office": office,
+        "candidate": canonical_candidate(candidate)[0],
+        "votes": votes,
+        "source_filename": source_filename,
+        "source_location": source_location,
+    }
+
+
+def write_totals(filename, rows):
+    with open(filename, "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=TOTALS_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_results(filename):
+    """Reads a common-schema CSV with categorical strings and numeric votes ("****" -> NaN), compressed or not."""
+    with open_input(filename) as csvfile:
+        df = pd.read_csv(csvfile, dtype="category", keep_default_na=False)
+    df["votes"] = pd.to_numeric(df["votes"].astype(str).str.replace(",", ""), errors="coerce")
+    if "precinct_id" not in df.columns:
+        # Written before the column existed: derive it the way diff_results.row_key does
+        df.insert(df.columns.get_loc("precinct") + 1, "precinct_id", derive_precinct_ids(df))
+    # Results rows point at their line in the output (+1 for the header, +1 from 0)
+    df["source_location"] = f"{os.path.basename(filename)} line " + (df.index + 2).astype(str)
+    return df
+
+
+def derive_precinct_ids(df):
+    """precinct_id for every row, looked up once per distinct (state, county, precinct)."""
+    keys = df[["state", "county", "precinct"]].astype(str)
+    ids = {key: precinct_id(*key) for key in keys.drop_duplicates().itertuples(index=False, name=None)}
+    return pd.Categorical([ids[key] for key in keys.itertuples(index=False, name=None)])
+
+
+def read_totals(filename):
+    with open_input(filename) as csvfile:
+        df = pd.read_csv(csvfile, dtype="category", keep_default_na=False)
+    df["votes"] = pd.to_numeric(df["votes"].astype(str), errors="coerce")
+    return df
+
+
+def violations(df, check, detail, columns=VIOLATION_COLUMNS):
+    df = df.assign(check=check, detail=detail)
+    for column in columns:
+        if column not in df.columns:
+            df[column] = ""
+    return df[columns].astype(str)
+
+
+def check_mode_totals(df, totals=None):
+    """
+    Checks that the vote modes add up to the total, against the file's own
+    Total rows (Montgomery) and/or a totals sidecar. Groups with a masked
+    count anywhere are skipped.
+    """
+    modes = df[df["vote_mode"] != TOTAL_MODE]
+    sums = modes.groupby(RACE_KEY, observed=True)["votes"].agg(["sum", "count", "size"])
+    sums = sums[sums["count"] == sums["size"]]["sum"].rename("mode_sum")
+
+    found = []
+    expected = [df[df["vote_mode"] == TOTAL_MODE]]
+    if totals is not None:
+        expected.append(totals)
+    for total_rows in expected:
+        if total_rows.empty:
+            continue
+        merged = total_rows.join(sums, on=RACE_KEY, how="inner")
+        bad = merged[merged["votes"].notna() & (merged["mode_sum"] != merged["votes"])]
+        if not bad.empty:
+            found.append(violations(
+                bad.assign(vote_mode=TOTAL_MODE), "mode_total",
+                "modes sum to " + bad["mode_sum"].astype(int).astype(str)
+                + ", total is " + bad["votes"].astype(int).astype(str)))
+    return found
+
+
+def check_duplicates(df):
+    """Checks that no precinct appears twice in the same race (same candidate and vote mode)."""
+    duplicated = df[df.duplicated(RACE_KEY + ["vote_mode"], keep=False)]
+    if duplicated.empty:
+        return []
+    counts = duplicated.groupby(RACE_KEY + ["vote_mode"], observed=True)["votes"].transform("size")
+    return [violations(duplicated, "duplicate", "appears " + counts.astype(str) + " times")]
+
+
+def check_candidate_sets(df):
+    """
+    Checks that every precinct in a race lists the same candidates: reports
+    each (precinct, candidate) that's missing but listed in other precincts.
+    """
+    present = df[RACE_KEY + ["precinct", "source_filename"]].drop_duplicates(RACE_KEY)
+    precincts = present.drop_duplicates(["office", "precinct_id"])[
+        ["office", "precinct_id", "precinct", "source_filename"]]
+    candidates = present[["office", "candidate"]].drop_duplicates()
+    expected = precincts.merge(candidates, on="office")
+    missing = expected.merge(present[RACE_KEY], on=RACE_KEY, how="left", indicator=True)
+    missing = missing[missing["_merge"] == "left_only"]
+    if missing.empty:
+        return []
+    precinct_counts = precincts.groupby("office", observed=True).size()
+    listed = present.groupby(["office", "candidate"], observed=True).size().rename("listed")
+    missing = missing.join(listed, on=["office", "candidate"])
+    detail = ("missing here, listed in " + missing["listed"].astype(str) + " of "
+              + missing["office"].map(precinct_counts).astype(str) + " precincts")
+    return [violations(missing.assign(source_location=""), "candidate_set", detail)]
+
+
+def validate(df, totals=None):
+    """Runs every check and returns one DataFrame of violations."""
+    found = check_mode_totals(df, totals) + check_duplicates(df) + check_candidate_sets(df)
+    if not found:
+        return pd.DataFrame(columns=VIOLATION_COLUMNS)
+    return pd.concat(found, ignore_index=True)
+
+
+def totals_file_for(results_file):
+    """Returns the totals sidecar for a county output if it has one, e.g. cumberland_parsed.csv -> cumberland_totals.csv."""
+    results_file = base_path(results_file)
+    if not results_file.endswith("_parsed.csv"):
+        return None
+    totals_file = results_file[:-len("_parsed.csv")] + "_totals.csv"
+    return totals_file if input_exists(totals_file) else None
+
+
+def validate_file(results_file, totals_file=None, output=None):
+    """Validates a common-schema CSV, optionally writes the violations, and returns them."""
+    totals_file = totals_file or totals_file_for(results_file)
+    df = read_results(results_file)
+    totals = read_totals(totals_file) if totals_file else None
+    found = validate(df, totals)
+    if output:
+        found.to_csv(output, index=False)
+    return found
+
+
+def print_summary(found, limit=5):
+    if found.empty:
+        print("No violations.")
+        return
+    for check, group in found.groupby("check", sort=False):
+        print(f"{check}: {len(group)} violation(s)")
+        for row in group.head(limit).itertuples(index=False):
+            source = ", ".join(part for part in (row.source_filename, row.source_location) if part)
+            print(f"  {row.office} / {row.precinct} / {row.candidate} {row.vote_mode}: {row.detail}"
+                  + (f" ({source})" if source else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check a common-schema CSV for vote-mode totals, duplicate precincts and candidate sets.")
+    parser.add_argument("results", help="e.g. PA/cumberland/cumberland_parsed.csv")
+    parser.add_argument("--totals", help="Totals sidecar (default: *_totals.csv next to the results)")
+    parser.add_argument("-o", "--output", help="Write every violation to this CSV")
+    args = parser.parse_args()
+
+    found = validate_file(args.results, args.totals, args.output)
+    print_summary(found)
+    sys.exit(1 if len(found) else 0)
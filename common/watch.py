@@ -0,0 +1,222 @@
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import subprocess
+
+import fitz  # PyMuPDF
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.compressed import input_exists, resolve_input  # noqa: E402
+from common.diff_results import diff_files  # noqa: E402
+from common.page_text import page_hash  # noqa: E402
+from common.validate import validate_file, print_summary  # noqa: E402
+from common.store import publish  # noqa: E402
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+POLL_INTERVAL = 2  # Seconds between scans of the input files
+DEBOUNCE_SECONDS = 5  # Wait this long after the last change before reprocessing
+
+# Re-run only the race PDFs (and pages) that changed, instead of a script
+RACE_STAGE = "race"
+
+# What to watch in each county directory. Each stage maps an input pattern to
+# the scripts that consume it; "final" scripts run after any stage, and
+# "output" is the common-schema file that gets republished with a delta.
+WATCH_TARGETS = {
+    "PA/carbon": {
+        "stages": [
+            ("StatementOfVotesCastRPT.pdf", ["splitpdf.py"]),
+            ("split_sections/*.pdf", RACE_STAGE),
+        ],
+        "final": ["generate_final_csv.py"],
+        "output": "parsed_results.csv",
+    },
+    "PA/montgomery": {
+        "stages": [
+            ("StatementOfVotesCastRPT.pdf", ["splitpdf.py"]),
+            ("split_sections/*.pdf", RACE_STAGE),
+        ],
+        "final": ["generate_final_csv.py"],
+        "output": "parsed_results.csv",
+    },
+    "PA/cumberland": {
+        "stages": [("cumberland_data.txt", ["preprocess.py", "cumberland.py"])],
+        "final": [],
+        "output": "cumberland_parsed.csv",
+    },
+    "PA/dauphin": {
+        "stages": [("dauphin_data.txt", ["dauphin.py"])],
+        "final": [],
+        "output": "dauphin_parsed.csv",
+    },
+    "PA/lehigh": {
+        "stages": [("precincts_8.csv", ["lehigh.py"])],
+        "final": [],
+        "output": "lehigh_parsed.csv",
+    },
+    "MI/wayne": {
+        "stages": [
+            ("federal_offices.pdf", ["splitpdf.py"]),
+            ("split_races/*.pdf", ["parsepdf.py"]),
+        ],
+        "final": [],
+        "output": "wayne_parsed.csv",
+    },
+}
+
+
+def page_hashes(pdf_path):
+    """Returns a content hash for every page of a PDF, so changed pages can be found."""
+    digests = {}
+    with fitz.open(pdf_path) as doc:
+        return [page_hash(page, digests) for page in doc]
+
+
+def run_script(county_dir, args):
+    """Runs a county script from its own directory, like we do by hand."""
+    print(f"  Running {' '.join(args)} in {county_dir}")
+    result = subprocess.run([sys.executable] + args, cwd=county_dir)
+    if result.returncode != 0:
+        print(f"  {args[0]} exited with {result.returncode}")
+    return result.returncode == 0
+
+
+class CountyWatcher:
+    """
+    Polls one county's raw inputs and reprocesses only what changed:
+    - script stages re-run the scripts that read the changed file.
+    - race stages re-extract only the changed pages of the changed race PDFs.
+    Afterwards the final scripts run and the new output is diffed against the
+    previous one.
+    """
+
+    def __init__(self, county, config):
+        self.county = county
+        self.county_dir = os.path.join(REPO_ROOT, county)
+        self.config = config
+        self.snapshot = self.scan()
+        self.pending = set()  # Changed inputs waiting for the debounce
+        self.last_change = None
+        # Baseline page hashes, so the first change doesn't reparse every page
+        self.hashes = {}
+        for path, (index, _) in self.snapshot.items():
+            if self.config["stages"][index][1] == RACE_STAGE:
+                self.hashes[path] = page_hashes(path)
+
+    def scan(self):
+        """Returns {path: (stage index, (mtime, size))} for every watched input."""
+        files = {}
+        for index, (pattern, _) in enumerate(self.config["stages"]):
+            for path in glob.glob(os.path.join(self.county_dir, pattern)):
+                stat = os.stat(path)
+                files[path] = (index, (stat.st_mtime, stat.st_size))
+        return files
+
+    def poll(self):
+        """Records changed inputs and runs their stages once things have settled."""
+        snapshot = self.scan()
+        changed = {path for path, state in snapshot.items()
+                   if self.snapshot.get(path) != state}
+        removed = set(self.snapshot) - set(snapshot)
+        self.snapshot = snapshot
+        if changed or removed:
+            for path in changed:
+                self.pending.add(path)
+            self.last_change = time.monotonic()
+            return
+
+        if self.pending and time.monotonic() - self.last_change >= DEBOUNCE_SECONDS:
+            changed, self.pending = self.pending, set()
+            self.refresh(changed)
+
+    def refresh(self, changed_paths):
+        started = time.monotonic()
+        print(f"{self.county}: {len(changed_paths)} input(s) changed")
+        # The output may be written compressed (OUTPUT_COMPRESSION); the readers
+        # below find whichever copy is newest. previous keeps its bytes as-is.
+        output = os.path.join(self.county_dir, self.config["output"])
+        previous = f"{output}.previous"
+        if input_exists(output):
+            shutil.copyfile(resolve_input(output), previous)
+
+        ran_stage = False
+        stage_indexes = sorted({self.snapshot[path][0] for path in changed_paths
+                                if path in self.snapshot})
+        for index in stage_indexes:
+            _, action = self.config["stages"][index]
+            if action == RACE_STAGE:
+                paths = [path for path in changed_paths if self.snapshot.get(path, (None,))[0] == index]
+                ran_stage |= self.refresh_races(paths)
+            elif all(run_script(self.county_dir, [script]) for script in action):
+                ran_stage = True
+
+        if not ran_stage:
+            print(f"{self.county}: nothing to reprocess")
+            return
+        for script in self.config["final"]:
+            run_script(self.county_dir, [script])
+
+        # Don't publish a delta for output that fails the consistency checks
+        if input_exists(output):
+            found = validate_file(output)
+            if len(found):
+                print(f"{self.county}: output failed validation, not writing a delta")
+                print_summary(found)
+                return
+            # Keep every election's results side by side in the partitioned store
+            publish(output)
+
+        if os.path.exists(previous) and input_exists(output):
+            delta = f"{os.path.splitext(output)[0]}_delta.csv"
+            summary = diff_files(previous, output, delta)
+            print(f"{self.county}: added {summary['added']}, removed {summary['removed']}, "
+                  f"changed {summary['changed']}, net votes {summary['vote_delta']:+d} -> {delta}")
+        print(f"{self.county}: refreshed in {time.monotonic() - started:.1f}s")
+
+    def refresh_races(self, pdf_paths):
+        """Re-extracts the changed pages of each race PDF and re-merges the race."""
+        ran_stage = False
+        for pdf_path in pdf_paths:
+            new_hashes = page_hashes(pdf_path)
+            old_hashes = self.hashes.get(pdf_path, [])
+            self.hashes[pdf_path] = new_hashes
+            # Pages are numbered from 1, like parsepdf.process_page
+            changed_pages = [page_num for page_num, page_hash in enumerate(new_hashes, start=1)
+                             if page_num > len(old_hashes) or old_hashes[page_num - 1] != page_hash]
+            # Pages past the end of a shorter PDF are gone, so their tables must not be merged again
+            removed_pages = list(range(len(new_hashes) + 1, len(old_hashes) + 1))
+            if not changed_pages and not removed_pages:
+                continue
+
+            pdf_file = os.path.basename(pdf_path)
+            print(f"  {pdf_file}: {len(changed_pages)} changed page(s), {len(removed_pages)} removed")
+            run_script(self.county_dir, [
+                "-c",
+                "import parsepdf; "
+                f"parsepdf.invalidate_pages({pdf_file!r}, {changed_pages + removed_pages!r}); "
+                f"parsepdf.process_pdf({pdf_file!r})",
+            ])
+            ran_stage = True
+        return ran_stage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Watch county inputs and reprocess only what changed.")
+    parser.add_argument("counties", nargs="*", default=sorted(WATCH_TARGETS),
+                        help="County directories to watch, e.g. PA/carbon (default: all)")
+    args = parser.parse_args()
+
+    watchers = [CountyWatcher(county, WATCH_TARGETS[county]) for county in args.counties]
+    print(f"Watching {', '.join(args.counties)}. Press Ctrl+C to stop.")
+    try:
+        while True:
+            for watcher in watchers:
+                watcher.poll()
+            time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
@@ -0,0 +1,513 @@
+import os
+import sys
+import json
+import time
+import glob
+import hmac
+import socket
+import secrets
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+import socketserver
+import importlib.util
+from multiprocessing import Process
+
+from PyPDF2 import PdfReader
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.race_frames import write_race_csv  # noqa: E402
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+QUEUE_FILE = os.path.join(REPO_ROOT, "work_queue.sqlite")
+DEFAULT_HOST = "127.0.0.1"  # serve --host 0.0.0.0 to take workers from other hosts
+DEFAULT_PORT = 8765
+TOKEN_VARIABLE = "WORK_QUEUE_TOKEN"  # Shared secret a SocketQueue sends with every call
+PAGES_PER_JOB = 10  # Pages of one race PDF per job
+LEASE_SECONDS = 300  # A job whose worker hasn't reported back in this long goes back in the queue
+MAX_ATTEMPTS = 3  # Leases per job before it's marked failed
+POLL_SECONDS = 2  # How long an idle worker waits before asking again
+
+# Jobs are (county, race PDF, page range). county is relative to the
+# repository root (e.g. "PA/carbon") so workers can have their checkout
+# anywhere; they need the same split_sections/ PDFs as the coordinator.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    county TEXT NOT NULL,
+    pdf TEXT NOT NULL,
+    first_page INTEGER NOT NULL,
+    last_page INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    results TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+"""
+JOB_COLUMNS = ["id", "county", "pdf", "first_page", "last_page", "state", "worker", "attempts", "error"]
+
+
+class SQLiteQueue:
+    """
+    Work queue in a SQLite file. Every process opens its own SQLiteQueue on
+    the same file; leases are taken in an immediate transaction, so two
+    workers never get the same job.
+    """
+
+    def __init__(self, path=QUEUE_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()  # The socket server shares one queue between its threads
+
+    def transaction(self, sql, params=()):
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = sql(cursor) if callable(sql) else cursor.execute(sql, params).fetchall()
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            return result
+
+    def put(self, jobs):
+        """Adds jobs, each a dict with county, pdf, first_page and last_page. Returns how many were added."""
+        def insert(cursor):
+            cursor.executemany(
+                "INSERT INTO jobs (county, pdf, first_page, last_page) VALUES (?, ?, ?, ?)",
+                [(job["county"], job["pdf"], job["first_page"], job["last_page"]) for job in jobs])
+            return len(jobs)
+        return self.transaction(insert)
+
+    def clear(self, county):
+        """Drops every job (and result) for a county, e.g. before resubmitting it."""
+        self.transaction("DELETE FROM jobs WHERE county = ?", (county,))
+
+    def reclaim(self, cursor, now):
+        """Puts expired leases back in the queue, or marks them failed after MAX_ATTEMPTS."""
+        cursor.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, error = 'lease expired' WHERE state = 'leased' AND lease_expires < ?",
+            (MAX_ATTEMPTS, now))
+        return cursor.rowcount
+
+    def lease(self, worker, lease_seconds=LEASE_SECONDS):
+        """Returns the oldest pending job leased to worker, or None if there is nothing to do right now."""
+        def take(cursor):
+            now = time.time()
+            self.reclaim(cursor, now)
+            row = cursor.execute(
+                "SELECT * FROM jobs WHERE state = 'pending' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            cursor.execute(
+                "UPDATE jobs SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?", (worker, now + lease_seconds, row["id"]))
+            job = {column: row[column] for column in JOB_COLUMNS}
+            job.update(state="leased", worker=worker, attempts=row["attempts"] + 1)
+            return job
+        return self.transaction(take)
+
+    def renew(self, job_id, worker, lease_seconds=LEASE_SECONDS):
+        """Extends a lease. Returns False if the job is no longer leased to worker (it was reclaimed)."""
+        rows = self.transaction(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND state = 'leased' RETURNING id",
+            (time.time() + lease_seconds, job_id, worker))
+        return bool(rows)
+
+    def complete(self, job_id, worker, results):
+        """
+        Stores a job's uploaded results ({"parsed/<file>": text, ...}) and marks
+        it done. A late upload for a job that was reclaimed is still accepted
+        if nobody has finished it yet: the pages come out the same either way.
+        """
+        rows = self.transaction(
+            "UPDATE jobs SET state = 'done', worker = ?, error = NULL, results = ? "
+            "WHERE id = ? AND state != 'done' RETURNING id",
+            (worker, json.dumps(results), job_id))
+        return bool(rows)
+
+    def fail(self, job_id, worker, error):
+        """Gives a job back after an error; it's retried until MAX_ATTEMPTS."""
+        self.transaction(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, error = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+            (MAX_ATTEMPTS, error, job_id, worker))
+
+    def status(self, county=None):
+        """Returns {state: job count}, for one county or all of them."""
+        def count(cursor):
+            self.reclaim(cursor, time.time())
+            where, params = ("WHERE county = ?", (county,)) if county else ("", ())
+            return {row["state"]: row["total"] for row in cursor.execute(
+                f"SELECT state, COUNT(*) AS total FROM jobs {where} GROUP BY state", params)}
+        return self.transaction(count)
+
+    def failures(self, county):
+        rows = self.transaction(
+            "SELECT * FROM jobs WHERE county = ? AND state = 'failed' ORDER BY id", (county,))
+        return [{column: row[column] for column in JOB_COLUMNS} for row in rows]
+
+    def results(self, county):
+        """Returns [(job, results)] for the county's finished jobs."""
+        rows = self.transaction(
+            "SELECT * FROM jobs WHERE county = ? AND state = 'done' ORDER BY id", (county,))
+        return [({column: row[column] for column in JOB_COLUMNS}, json.loads(row["results"])) for row in rows]
+
+
+class QueueRequestHandler(socketserver.StreamRequestHandler):
+    """
+    One JSON request per line: {"token": "...", "method": "lease", "args": [...]}
+    -> {"result": ...} or {"error": "..."}. A request without the server's
+    token gets an error and the connection is closed.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            request = json.loads(line)
+            if not hmac.compare_digest(str(request.get("token", "")).encode(), self.server.token.encode()):
+                self.wfile.write((json.dumps({"error": "PermissionError: bad or missing token"}) + "\n").encode())
+                return
+            try:
+                if request["method"] not in SocketQueue.METHODS:
+                    raise ValueError(f"Unknown method {request['method']}")
+                response = {"result": getattr(self.server.queue, request["method"])(*request["args"])}
+            except Exception as e:
+                response = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(response) + "\n").encode())
+
+
+class QueueServer(socketserver.ThreadingTCPServer):
+    """Serves a SQLiteQueue to workers on other hosts, to clients that send its token."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, queue, token):
+        if not token:
+            raise ValueError("QueueServer needs a token")
+        self.queue = queue
+        self.token = token
+        super().__init__(address, QueueRequestHandler)
+
+
+class SocketQueue:
+    """
+    Client for a QueueServer, with the same methods as SQLiteQueue, minus
+    clear: dropping jobs is only done on the host that has the queue file.
+    """
+    METHODS = ["put", "lease", "renew", "complete", "fail", "status", "failures", "results"]
+
+    def __init__(self, host, port=DEFAULT_PORT, token=None):
+        self.address = (host, port)
+        self.token = token if token is not None else os.environ.get(TOKEN_VARIABLE, "")
+
+    def call(self, method, *args):
+        # A connection per call, so workers ride out a coordinator restart
+        with socket.create_connection(self.address, timeout=60) as connection:
+            request = {"token": self.token, "method": method, "args": list(args)}
+            connection.sendall((json.dumps(request) + "\n").encode())
+            with connection.makefile("rb") as response_file:
+                response = json.loads(response_file.readline())
+        if "error" in response:
+            raise RuntimeError(f"{method} failed on {self.address[0]}:{self.address[1]}: {response['error']}")
+        return response["result"]
+
+    def __getattr__(self, method):
+        if method not in self.METHODS:
+            raise AttributeError(method)
+        return lambda *args: self.call(method, *args)
+
+
+def open_queue(spec):
+    """
+    Opens a queue from its spec:
+        "tcp://coordinator:8765" -> SocketQueue (token from $WORK_QUEUE_TOKEN)
+        "work_queue.sqlite" -> SQLiteQueue (workers on the same host, or a shared filesystem)
+    """
+    if spec.startswith("tcp://"):
+        host, _, port = spec[len("tcp://"):].partition(":")
+        return SocketQueue(host, int(port or DEFAULT_PORT))
+    return SQLiteQueue(spec)
+
+
+def county_key(county_dir):
+    return os.path.relpath(os.path.abspath(county_dir), REPO_ROOT).replace(os.sep, "/")
+
+
+def load_parser(county):
+    """Imports a county's parsepdf.py by path (it has a __main__ guard)."""
+    path = os.path.join(REPO_ROOT, county, "parsepdf.py")
+    spec = importlib.util.spec_from_file_location(f"parsepdf_{county.replace('/', '_')}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def page_jobs(county, pdf_file, pages, pages_per_job=PAGES_PER_JOB):
+    """Groups page numbers into jobs of up to pages_per_job consecutive pages."""
+    jobs = []
+    for page_num in sorted(pages):
+        if jobs and jobs[-1]["last_page"] == page_num - 1 \
+                and page_num - jobs[-1]["first_page"] < pages_per_job:
+            jobs[-1]["last_page"] = page_num
+        else:
+            jobs.append({"county": county, "pdf": pdf_file, "first_page": page_num, "last_page": page_num})
+    return jobs
+
+
+def submit(queue, county_dir, pages_per_job=PAGES_PER_JOB):
+    """
+    Queues every page of the county's selected race PDFs that has no parsed or
+    skipped output yet (after invalidate_pages, just the changed pages).
+    Any earlier jobs for the county are dropped when the queue is local; a
+    remote queue can't drop jobs, so clear the county on the serving host
+    first if its PDFs changed. Returns the job count.
+    """
+    county = county_key(county_dir)
+    parser = load_parser(county)
+    county_dir = os.path.join(REPO_ROOT, county)
+    input_dir = os.path.join(county_dir, parser.INPUT_DIRECTORY)
+    jobs = []
+    for pdf_file in sorted(f for f in os.listdir(input_dir) if f.endswith(".pdf") and parser.selected_office(f)):
+        race_name = os.path.splitext(pdf_file)[0]
+        race_dir = os.path.join(county_dir, parser.RACES_DIRECTORY, race_name)
+        total_pages = len(PdfReader(os.path.join(input_dir, pdf_file)).pages)
+        pages = [page_num for page_num in range(1, total_pages + 1)
+                 if not any(os.path.exists(os.path.join(race_dir, sub_dir, f"{race_name}_page_{page_num}.csv"))
+                            for sub_dir in ("parsed", "skipped"))]
+        jobs += page_jobs(county, pdf_file, pages, pages_per_job)
+    if isinstance(queue, SQLiteQueue):
+        queue.clear(county)
+    return queue.put(jobs) if jobs else 0
+
+
+def run_job(job, on_page=None):
+    """
+    Extracts a job's pages with the county's own process_page, into a scratch
+    directory, and returns the files it wrote as {"parsed/<file>": text, ...}.
+    on_page(page_num) is called after each page.
+    """
+    parser = load_parser(job["county"])
+    cwd = os.getcwd()
+    scratch_dir = tempfile.mkdtemp(prefix="work_queue_")
+    os.chdir(os.path.join(REPO_ROOT, job["county"]))  # Traces land in the county's traces/, as with Pool
+    try:
+        parsed_dir, skipped_dir = os.path.join(scratch_dir, "parsed"), os.path.join(scratch_dir, "skipped")
+        os.makedirs(parsed_dir)
+        os.makedirs(skipped_dir)
+        pdf_path = os.path.join(parser.INPUT_DIRECTORY, job["pdf"])
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"{job['county']}/{pdf_path} is not on this host")
+        race_name = os.path.splitext(job["pdf"])[0]
+        for page_num in range(job["first_page"], job["last_page"] + 1):
+            page_df = parser.process_page(pdf_path, page_num, parsed_dir, skipped_dir)
+            if page_df is not None and not parser.PAGE_CACHE:
+                # Pages travel to the collector as CSV text even when the parser doesn't keep them
+                write_race_csv(page_df, os.path.join(parsed_dir, f"{race_name}_page_{page_num}.csv"))
+            if on_page:
+                on_page(page_num)
+        results = {}
+        for sub_dir in ("parsed", "skipped"):
+            for filename in sorted(os.listdir(os.path.join(scratch_dir, sub_dir))):
+                with open(os.path.join(scratch_dir, sub_dir, filename), "r") as result_file:
+                    results[f"{sub_dir}/{filename}"] = result_file.read()
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def work(spec, worker, wait=False):
+    """
+    Worker loop: lease a job, extract its pages (renewing the lease after
+    each one), upload the results, repeat. Returns when nothing is pending
+    or leased, unless wait is set. Returns the number of jobs completed.
+    """
+    queue = open_queue(spec)
+    completed = 0
+    while True:
+        job = queue.lease(worker, LEASE_SECONDS)
+        if job is None:
+            counts = queue.status()
+            if not wait and not counts.get("pending") and not counts.get("leased"):
+                return completed
+            time.sleep(POLL_SECONDS)
+            continue
+
+        print(f"[{worker}] {job['county']} {job['pdf']} pages {job['first_page']}-{job['last_page']}"
+              f" (attempt {job['attempts']})")
+        def renew(page_num):
+            if not queue.renew(job["id"], worker, LEASE_SECONDS):
+                print(f"[{worker}] Lost the lease on job {job['id']} at page {page_num}; finishing it anyway.")
+
+        try:
+            results = run_job(job, renew)
+            queue.complete(job["id"], worker, results)
+            completed += 1
+        except Exception as e:
+            print(f"[{worker}] Job {job['id']} failed: {e}")
+            queue.fail(job["id"], worker, f"{type(e).__name__}: {e}")
+
+
+def start_workers(spec, processes, name=None, wait=False):
+    name = name or socket.gethostname()
+    workers = [Process(target=work, args=(spec, f"{name}-{i + 1}", wait)) for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def result_path(race_dir, relative_path):
+    """
+    Where an uploaded result goes: race_dir/parsed/<file> or
+    race_dir/skipped/<file>. Uploads come from other hosts, so any other
+    path (absolute, "..", a nested directory) raises ValueError.
+    """
+    parts = relative_path.replace("\\", "/").split("/")
+    if os.path.isabs(relative_path) or len(parts) != 2 or parts[0] not in ("parsed", "skipped") \
+            or parts[1] in ("", ".", ".."):
+        raise ValueError(f"Rejected result path {relative_path!r}")
+    output_file = os.path.normpath(os.path.join(race_dir, *parts))
+    if os.path.dirname(os.path.dirname(output_file)) != os.path.normpath(race_dir):
+        raise ValueError(f"Rejected result path {relative_path!r}")
+    return output_file
+
+
+def collect(queue, county_dir):
+    """
+    Writes the county's uploaded pages into races/<race>/parsed and skipped,
+    and merges each race touched, like process_pdf does. Uploads with a path
+    outside their race directory are rejected. Returns the number of failed
+    jobs (their pages are missing from the merge).
+    """
+    county = county_key(county_dir)
+    parser = load_parser(county)
+    county_dir = os.path.join(REPO_ROOT, county)
+    races = set()
+    for job, results in queue.results(county):
+        if os.path.basename(job["pdf"]) != job["pdf"] or job["pdf"] in ("", ".", ".."):
+            print(f"  Rejected job {job['id']}: bad race PDF name {job['pdf']!r}")
+            continue
+        race_name = os.path.splitext(job["pdf"])[0]
+        races.add(race_name)
+        race_dir = os.path.join(county_dir, parser.RACES_DIRECTORY, race_name)
+        for relative_path, text in results.items():
+            try:
+                output_file = result_path(race_dir, relative_path)
+            except ValueError as e:
+                print(f"  Job {job['id']}: {e}")
+                continue
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            with open(output_file, "w") as result_file:
+                result_file.write(text)
+
+    for race_name in sorted(races):
+        race_dir = os.path.join(county_dir, parser.RACES_DIRECTORY, race_name)
+        output_file = os.path.join(race_dir, f"{race_name.lower()}.csv")
+        parser.merge_parsed_csvs(os.path.join(race_dir, "parsed"), output_file)
+        print(f"  Merged all parsed tables into {os.path.relpath(output_file, REPO_ROOT)}.")
+
+    failed = queue.failures(county)
+    for job in failed:
+        print(f"  Failed: {job['pdf']} pages {job['first_page']}-{job['last_page']}"
+              f" after {job['attempts']} attempt(s): {job['error']}")
+    return len(failed)
+
+
+def run_county(spec, county_dir, processes):
+    """
+    What parsepdf.py does with WORK_QUEUE set: queue the county's pages, work
+    on them here alongside any remote workers, wait for the queue to drain,
+    and merge the results.
+    """
+    queue = open_queue(spec)
+    county = county_key(county_dir)
+    print(f"Queued {submit(queue, county_dir)} jobs for {county} on {spec}")
+    for stale_trace in glob.glob(os.path.join(REPO_ROOT, county, "traces", "worker_*.jsonl")):
+        os.remove(stale_trace)
+    workers = start_workers(spec, processes)
+    while True:
+        counts = queue.status(county)
+        if not counts.get("pending") and not counts.get("leased"):
+            break
+        time.sleep(POLL_SECONDS)
+    for worker in workers:
+        worker.join()
+    return collect(queue, county_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run parsepdf.py page extraction on a work queue shared by several hosts.")
+    parser.add_argument("--queue", default=QUEUE_FILE,
+                        help="SQLite file, or tcp://host:port of a 'serve' process (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Serve the SQLite queue to remote workers")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST,
+                              help="Address to listen on (default: %(default)s; 0.0.0.0 for other hosts)")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--token", default=os.environ.get(TOKEN_VARIABLE),
+                              help=f"Shared secret clients must send (default: ${TOKEN_VARIABLE}, or a new random one)")
+
+    submit_parser = subparsers.add_parser("submit", help="Queue the unprocessed pages of counties")
+    submit_parser.add_argument("counties", nargs="+", help="e.g. PA/carbon PA/montgomery")
+    submit_parser.add_argument("--pages-per-job", type=int, default=PAGES_PER_JOB)
+
+    work_parser = subparsers.add_parser("work", help="Pull and run jobs")
+    work_parser.add_argument("--processes", type=int, default=4)
+    work_parser.add_argument("--name", help="Worker name prefix (default: hostname)")
+    work_parser.add_argument("--wait", action="store_true", help="Keep polling when the queue is empty")
+
+    collect_parser = subparsers.add_parser("collect", help="Write uploaded pages into races/ and merge them")
+    collect_parser.add_argument("counties", nargs="+")
+
+    clear_parser = subparsers.add_parser("clear", help="Drop the jobs and results of counties (local queue only)")
+    clear_parser.add_argument("counties", nargs="+")
+
+    status_parser = subparsers.add_parser("status", help="Job counts by state")
+    status_parser.add_argument("counties", nargs="*")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        if args.queue.startswith("tcp://"):
+            parser.error("serve needs a SQLite --queue")
+        token = args.token or secrets.token_urlsafe(24)
+        with QueueServer((args.host, args.port), SQLiteQueue(args.queue), token) as server:
+            print(f"Serving {args.queue} on {args.host}:{args.port}")
+            if not args.token:
+                print(f"Clients need {TOKEN_VARIABLE}={token}")
+            server.serve_forever()
+    elif args.command == "clear":
+        if args.queue.startswith("tcp://"):
+            parser.error("clear needs a SQLite --queue (run it on the serving host)")
+        queue = open_queue(args.queue)
+        for county_dir in args.counties:
+            queue.clear(county_key(county_dir))
+            print(f"{county_dir}: cleared")
+    elif args.command == "submit":
+        queue = open_queue(args.queue)
+        for county_dir in args.counties:
+            print(f"{county_dir}: queued {submit(queue, county_dir, args.pages_per_job)} jobs")
+    elif args.command == "work":
+        for worker in start_workers(args.queue, args.processes, args.name, args.wait):
+            worker.join()
+    elif args.command == "collect":
+        queue = open_queue(args.queue)
+        failed = sum(collect(queue, county_dir) for county_dir in args.counties)
+        sys.exit(1 if failed else 0)
+    else:
+        queue = open_queue(args.queue)
+        for county in args.counties or [None]:
+            counts = queue.status(county_key(county) if county else None)
+            print(f"{county or 'all'}: " + ", ".join(f"{state} {count}" for state, count in sorted(counts.items())))
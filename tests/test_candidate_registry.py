@@ -0,0 +1,32 @@
+import unittest
+
+from common.candidate_registry import CandidateRegistry
+
+
+class CandidateRegistryMatchTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = CandidateRegistry()
+        self.registry.add("ROBERT P CASEY JR", "DEM", "UNITED STATES SENATOR")
+        self.registry.add("KAMALA D HARRIS(DEM)", "", "PRESIDENTIAL ELECTORS")
+
+    def test_fuzzy_match_within_the_office_family(self):
+        self.assertEqual(self.registry.lookup_party("ROBERT CASEY JR", "UNITED STATES SENATOR"), "DEM")
+        self.assertEqual(self.registry.lookup_party("KAMALA HARRIS", "PRESIDENT OF THE UNITED STATES"), "DEM")
+
+    def test_shared_surname_in_another_office_is_not_matched(self):
+        # Same last name, close enough to fuzzy match, but a different race
+        self.assertIsNone(self.registry.match("ROBERT P CASEY", "AUDITOR GENERAL"))
+        self.assertIsNone(self.registry.match("KAMALA HARRIS", "REPRESENTATIVE IN THE GENERAL ASSEMBLY"))
+        self.assertEqual(self.registry.lookup_party("ROBERT P CASEY", "AUDITOR GENERAL"), "")
+
+    def test_shared_surname_in_the_same_office(self):
+        self.registry.add("JOHN CASEY", "REP", "UNITED STATES SENATOR")
+        self.assertEqual(self.registry.lookup_party("JOHN CASEY", "UNITED STATES SENATOR"), "REP")
+        self.assertEqual(self.registry.lookup_party("ROBERT CASEY JR", "UNITED STATES SENATOR"), "DEM")
+
+    def test_without_an_office_the_whole_block_is_searched(self):
+        self.assertEqual(self.registry.lookup_party("ROBERT CASEY JR"), "DEM")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from common.canonicalize import canonicalize_row
+
+
+class WriteInTest(unittest.TestCase):
+    def test_unresolved_write_in_keeps_its_marker(self):
+        row = canonicalize_row({"candidate": "(Other)", "party": "Unresolved Write-In", "writein": "yes"})
+        self.assertEqual((row["candidate"], row["party"], row["writein"]), ("WRITE-IN", "UNRESOLVED", "yes"))
+
+    def test_write_in_rows_are_marked(self):
+        # Cumberland's parser only marks "Write-In Totals", not every spelling of it
+        row = canonicalize_row({"candidate": "TOTALS", "party": "", "writein": "no"})
+        self.assertEqual((row["candidate"], row["party"], row["writein"]), ("WRITE-IN", "", "yes"))
+
+    def test_other_candidates_keep_their_writein_value(self):
+        row = canonicalize_row({"candidate": "Shondra Irving", "party": "Qualified Write In", "writein": "yes"})
+        self.assertEqual((row["candidate"], row["writein"]), ("SHONDRA IRVING", "yes"))
+
+
+if __name__ == "__main__":
+    unittest.main()
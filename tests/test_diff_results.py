@@ -0,0 +1,37 @@
+import unittest
+
+from common.diff_results import diff_rows
+
+
+def result(precinct, office, candidate, votes, party="", vote_mode="Total"):
+    return {"state": "PA", "county": "Lehigh", "precinct": precinct, "office": office,
+            "candidate": candidate, "party": party, "vote_mode": vote_mode, "votes": str(votes)}
+
+
+class DiffRowsTest(unittest.TestCase):
+    def test_rows_sharing_a_key_are_all_kept(self):
+        old = [result("Allentown 1", "Auditor General", "Write-In", 3),
+               result("Allentown 1", "Auditor General", "Write-In", 5)]
+        new = [result("Allentown 1", "Auditor General", "Write-In", 3)]
+        changes = list(diff_rows(old, new))
+        self.assertEqual([(change["change"], change["old_votes"]) for change in changes], [("removed", 5)])
+
+        changes = list(diff_rows(old, old + [result("Allentown 1", "Auditor General", "Write-In", 2)]))
+        self.assertEqual([(change["change"], change["new_votes"]) for change in changes], [("added", 2)])
+
+    def test_party_is_part_of_the_key(self):
+        old = [result("Allentown 1", "Straight Party", "", 10, party="DEM"),
+               result("Allentown 1", "Straight Party", "", 20, party="REP")]
+        new = [result("Allentown 1", "Straight Party", "", 20, party="REP"),
+               result("Allentown 1", "Straight Party", "", 12, party="DEM")]
+        changes = list(diff_rows(old, new))
+        self.assertEqual([(change["party"], change["delta"]) for change in changes], [("DEM", 2)])
+
+    def test_ballot_question_choice_moved_out_of_party(self):
+        old = [result("Allentown 1", "Question 1", "", 40, party="Yes")]
+        new = [result("Allentown 1", "Question 1", "YES", 40)]
+        self.assertEqual(list(diff_rows(old, new)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
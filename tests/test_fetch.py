@@ -0,0 +1,124 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+import fitz  # PyMuPDF
+
+from common.retrieval import datetime_retrieved, read_retrievals
+
+# aiohttp is only needed for fetching; common.fetch imports it at module level
+try:
+    from aiohttp import web
+
+    from common.fetch import FetchCache, fetch_all
+except ImportError:
+    web = None
+
+
+def report_pdf(text):
+    with fitz.open() as doc:
+        doc.new_page().insert_text((72, 72), text)
+        return doc.tobytes()
+
+
+class StandInServer:
+    """A county results server: serves files with an ETag and answers conditional requests."""
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+
+    async def handle(self, request):
+        self.requests.append((request.path, request.headers.get("If-None-Match")))
+        if request.path not in self.files:
+            raise web.HTTPNotFound()
+        body = self.files[request.path]
+        etag = f'"{hash(body) & 0xffffffff:x}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, headers={"ETag": etag})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{name}", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+
+@unittest.skipUnless(web, "aiohttp not installed")
+class FetchTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache = FetchCache(os.path.join(self.root, ".fetch_cache"))
+        self.server = StandInServer()
+        self.loop = asyncio.new_event_loop()
+        self.base_url = self.loop.run_until_complete(self.server.start())
+        self.sources = [
+            {"url": f"{self.base_url}/report.pdf", "destination": "PA/test/report.pdf"},
+            {"url": f"{self.base_url}/precinct-report", "download": "PA/paste/precinct-report.pdf",
+             "destination": "PA/paste/data.txt", "convert": "pdf_text"},
+            {"url": f"{self.base_url}/index.html", "download": "PA/manual/index.html",
+             "destination": "PA/manual/precincts.csv", "manual": "export the CSV by hand"},
+            {"url": f"{self.base_url}/missing.pdf", "destination": "PA/missing/report.pdf"},
+        ]
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.server.runner.cleanup())
+        self.loop.close()
+        shutil.rmtree(self.root)
+
+    def fetch(self):
+        statuses = self.loop.run_until_complete(fetch_all(self.sources, self.cache, self.root))
+        return [statuses[source["url"]] for source in self.sources]
+
+    def path(self, relative_path):
+        return os.path.join(self.root, relative_path)
+
+    def test_only_changed_sources_are_rewritten(self):
+        self.server.files = {"/report.pdf": b"%PDF first", "/precinct-report": report_pdf("CAMP HILL 1"),
+                             "/index.html": b"<html>results</html>"}
+        self.assertEqual(self.fetch(), ["changed", "changed", "manual", "error"])
+        with open(self.path("PA/test/report.pdf"), "rb") as report:
+            self.assertEqual(report.read(), b"%PDF first")
+        with open(self.path("PA/paste/data.txt")) as data:
+            self.assertEqual(data.read().strip(), "CAMP HILL 1")
+        self.assertTrue(os.path.exists(self.path("PA/manual/index.html")))
+        self.assertFalse(os.path.exists(self.path("PA/manual/precincts.csv")))
+
+        # Second poll: conditional requests, nothing rewritten
+        self.server.requests.clear()
+        os.utime(self.path("PA/test/report.pdf"), (0, 0))
+        self.assertEqual(self.fetch(), ["unchanged", "unchanged", "unchanged", "error"])
+        self.assertTrue(all(etag for path, etag in self.server.requests if path != "/missing.pdf"))
+        self.assertEqual(os.path.getmtime(self.path("PA/test/report.pdf")), 0)
+
+        self.server.files["/report.pdf"] = b"%PDF second"
+        self.assertEqual(self.fetch(), ["changed", "unchanged", "unchanged", "error"])
+        with open(self.path("PA/test/report.pdf"), "rb") as report:
+            self.assertEqual(report.read(), b"%PDF second")
+
+    def test_retrieval_time_is_recorded_for_the_parsers(self):
+        self.server.files = {"/report.pdf": b"%PDF first", "/precinct-report": report_pdf("CAMP HILL 1"),
+                             "/index.html": b"<html>results</html>"}
+        self.fetch()
+        report = self.path("PA/test/report.pdf")
+        record = read_retrievals(report)["report.pdf"]
+        self.assertEqual(record["url"], f"{self.base_url}/report.pdf")
+        self.assertNotEqual(datetime_retrieved(report, "hand-saved"), "hand-saved")
+        self.assertNotEqual(datetime_retrieved(self.path("PA/paste/data.txt"), "hand-saved"), "hand-saved")
+        self.assertEqual(datetime_retrieved(self.path("PA/manual/precincts.csv"), "hand-saved"), "hand-saved")
+
+        # An input replaced by hand since the fetch falls back to the script's time
+        with open(report, "wb") as report_file:
+            report_file.write(b"%PDF edited")
+        self.assertEqual(datetime_retrieved(report, "hand-saved"), "hand-saved")
+
+
+if __name__ == "__main__":
+    unittest.main()
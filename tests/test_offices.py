@@ -0,0 +1,33 @@
+import unittest
+
+from common.offices import RaceSections
+
+
+class RaceSectionsTest(unittest.TestCase):
+    def test_page_holding_two_races_goes_to_both(self):
+        sections = RaceSections()
+        self.assertTrue(sections.add("Representative in Congress 12th District", 0, "page-a"))
+        self.assertTrue(sections.add("Representative in Congress 12th District", 1, "page-b"))
+        # Page 1 ends the 12th District and starts the 13th
+        self.assertTrue(sections.add("Representative in Congress 13th District", 1, "page-b"))
+        self.assertTrue(sections.add("Representative in Congress 13th District", 2, "page-c"))
+        self.assertEqual(sections.items(), [
+            ("Representative in Congress 12th District", [0, 1]),
+            ("Representative in Congress 13th District", [1, 2]),
+        ])
+        self.assertEqual(sections.duplicate_pages, [])
+
+    def test_repeated_page_is_only_added_once_per_race(self):
+        sections = RaceSections()
+        sections.add("United States Senator", 0, "page-a")
+        sections.add("Electors of President and Vice- President", 1, "page-b")
+        self.assertFalse(sections.add("Electors of President and Vice-President", 2, "page-b"))
+        self.assertEqual(sections.items(), [
+            ("United States Senator", [0]),
+            ("Electors of President and Vice-President", [1]),
+        ])
+        self.assertEqual(sections.duplicate_pages, [2])
+
+
+if __name__ == "__main__":
+    unittest.main()
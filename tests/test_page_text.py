@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import fitz  # PyMuPDF
+
+from common.offices import RaceSections
+from common.page_text import PageTextStore, page_hash
+
+
+def shared_stream_pdf(texts):
+    """One page per text, all with the same content stream: "draw Form XObject /X1". Only /X1 differs."""
+    doc = fitz.open()
+    font = doc.get_new_xref()
+    doc.update_object(font, "<</Type/Font/Subtype/Type1/BaseFont/Helvetica>>")
+    for text in texts:
+        form = doc.get_new_xref()
+        doc.update_object(form, f"<</Type/XObject/Subtype/Form/BBox[0 0 612 792]"
+                                f"/Resources<</Font<</F1 {font} 0 R>>>>>>")
+        doc.update_stream(form, f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode())
+        page = doc.new_page()
+        contents = doc.get_new_xref()
+        doc.update_object(contents, "<<>>")
+        doc.update_stream(contents, b"q /X1 Do Q")
+        doc.xref_set_key(page.xref, "Contents", f"{contents} 0 R")
+        doc.xref_set_key(page.xref, "Resources", f"<</XObject<</X1 {form} 0 R>>>>")
+    return doc
+
+
+class PageHashTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.doc = shared_stream_pdf(["PRESIDENTIAL ELECTORS", "UNITED STATES SENATOR"])
+
+    def tearDown(self):
+        self.doc.close()
+        shutil.rmtree(self.directory)
+
+    def test_pages_sharing_a_content_stream_differ(self):
+        first, second = self.doc[0], self.doc[1]
+        self.assertEqual(first.read_contents(), second.read_contents())
+        self.assertNotEqual(page_hash(first), page_hash(second))
+
+        store = PageTextStore(os.path.join(self.directory, "page_text.sqlite"))
+        layers = [store.page(page) for page in self.doc]
+        self.assertEqual([layer.text.strip() for layer in layers], ["PRESIDENTIAL ELECTORS", "UNITED STATES SENATOR"])
+        store.close()
+
+        sections = RaceSections()
+        self.assertTrue(sections.add("Race", 0, layers[0].key))
+        self.assertTrue(sections.add("Race", 1, layers[1].key))
+        self.assertEqual(sections.items(), [("Race", [0, 1])])
+
+    def test_copied_page_keeps_its_hash(self):
+        copy = fitz.open()
+        copy.insert_pdf(self.doc, from_page=1, to_page=1)
+        copy.insert_pdf(self.doc, from_page=0, to_page=0)
+        self.assertEqual(page_hash(copy[0]), page_hash(self.doc[1]))
+        self.assertEqual(page_hash(copy[1]), page_hash(self.doc[0]))
+        copy.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
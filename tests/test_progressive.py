@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from common.progressive import FinalRefresher
+
+# A stand-in final script that counts how often it ran
+COUNTING_SCRIPT = '''
+with open("runs.txt", "a") as runs:
+    runs.write("run\\n")
+'''
+
+
+class FinalRefresherTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.directory)
+        os.makedirs(os.path.join("races", "RACE"))
+        with open("final.py", "w") as script:
+            script.write(COUNTING_SCRIPT)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_runs_on_exit_when_no_race_csv_changed(self):
+        with open(os.path.join("races", "RACE", "RACE.csv"), "w") as race_csv:
+            race_csv.write("precinct,votes\n")
+        with FinalRefresher("final.py", "races", interval=3600) as refresher:
+            refresher.refresh()
+            # Only coverage.json is written after this; the race CSV is unchanged
+        self.assertEqual(refresher.runs, 2)
+        with open("runs.txt") as runs:
+            self.assertEqual(len(runs.readlines()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from common.validate import read_results, validate_file
+
+# Common-schema rows as written before the precinct_id column existed
+HEADER = "election,state,county,precinct,office,candidate,party,vote_mode,votes,source_filename\n"
+ROWS = [
+    "2024 GENERAL,PENNSYLVANIA,CARBON COUNTY,Banks Township,PRESIDENTIAL ELECTORS,CHASE OLIVER,LIB,Total,1,a.csv\n",
+    "2024 GENERAL,PENNSYLVANIA,CARBON COUNTY,Banks Township,PRESIDENTIAL ELECTORS,JILL STEIN,GRN,Total,2,a.csv\n",
+    "2024 GENERAL,PENNSYLVANIA,CARBON COUNTY,BANKS TWP,PRESIDENTIAL ELECTORS,JILL STEIN,GRN,Total,2,b.csv\n",
+    "2024 GENERAL,PENNSYLVANIA,CARBON COUNTY,Beaver Meadows,PRESIDENTIAL ELECTORS,CHASE OLIVER,LIB,Total,\"1,000\",a.csv\n",
+]
+
+
+class ValidateWithoutPrecinctIdTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.results_file = os.path.join(self.directory, "parsed_results.csv")
+        with open(self.results_file, "w") as results:
+            results.write(HEADER + "".join(ROWS))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_precinct_id_is_derived(self):
+        df = read_results(self.results_file)
+        self.assertEqual(list(df.columns[3:5]), ["precinct", "precinct_id"])
+        self.assertEqual(df["precinct_id"][0], "PA:CARBON:BANKS_TWP")
+        self.assertEqual(df["precinct_id"][2], "PA:CARBON:BANKS_TWP")
+        self.assertEqual(df["votes"][3], 1000)
+
+    def test_validator_runs(self):
+        found = validate_file(self.results_file)
+        self.assertEqual(sorted(found["check"]), ["candidate_set", "duplicate", "duplicate"])
+        [missing] = found[found["check"] == "candidate_set"].itertuples()
+        self.assertEqual((missing.precinct, missing.candidate), ("Beaver Meadows", "JILL STEIN"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import fitz  # PyMuPDF
+
+from common import watch
+from common.watch import RACE_STAGE, CountyWatcher
+
+# A stand-in county parser that records which pages the watcher invalidated
+FAKE_PARSER = '''
+import json
+
+
+def invalidate_pages(pdf_file, page_nums):
+    with open("invalidated.json", "w") as record:
+        json.dump([pdf_file, page_nums], record)
+
+
+def process_pdf(pdf_file):
+    pass
+'''
+
+
+def race_pdf(path, pages):
+    with fitz.open() as doc:
+        for text in pages:
+            doc.new_page().insert_text((72, 72), text)
+        doc.save(path)
+
+
+class RefreshRacesTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.county_dir = os.path.join(self.root, "PA", "test")
+        os.makedirs(os.path.join(self.county_dir, "split_sections"))
+        with open(os.path.join(self.county_dir, "parsepdf.py"), "w") as parser_file:
+            parser_file.write(FAKE_PARSER)
+        self.pdf_path = os.path.join(self.county_dir, "split_sections", "RACE.pdf")
+        race_pdf(self.pdf_path, ["page 1", "page 2", "page 3", "page 4"])
+        patcher = mock.patch.object(watch, "REPO_ROOT", self.root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        config = {"stages": [("split_sections/*.pdf", RACE_STAGE)], "final": [], "output": "out.csv"}
+        self.watcher = CountyWatcher("PA/test", config)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def invalidated(self):
+        with open(os.path.join(self.county_dir, "invalidated.json")) as record:
+            return json.load(record)
+
+    def test_shrunk_pdf_invalidates_the_removed_pages(self):
+        race_pdf(self.pdf_path, ["page 1", "page 2 revised"])
+        self.assertTrue(self.watcher.refresh_races([self.pdf_path]))
+        self.assertEqual(self.invalidated(), ["RACE.pdf", [2, 3, 4]])
+
+    def test_unchanged_pdf_is_skipped(self):
+        race_pdf(self.pdf_path, ["page 1", "page 2", "page 3", "page 4"])
+        self.assertFalse(self.watcher.refresh_races([self.pdf_path]))
+
+
+if __name__ == "__main__":
+    unittest.main()
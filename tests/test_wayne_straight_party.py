@@ -0,0 +1,41 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+WAYNE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "MI", "wayne")
+sys.path.append(WAYNE_DIRECTORY)
+
+import parsepdf  # noqa: E402
+import straightparty  # noqa: E402
+from common.page_text import PageTextStore  # noqa: E402
+
+# partisan_offices.pdf isn't checked in; a race page has the same precinct canvass layout
+RACE_PDF = os.path.join(WAYNE_DIRECTORY, "split_races", "Electors_of_President_and_Vice-President_of_the_United_States.pdf")
+
+
+class StraightPartyPageTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        store = PageTextStore(os.path.join(self.directory, "page_text.sqlite"))
+        self.addCleanup(store.close)
+        patcher = mock.patch.object(parsepdf, "_page_text", store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parses_a_real_page(self):
+        rows, problems = straightparty.parse_straight_party_page((RACE_PDF, 0))
+        self.assertEqual(problems, [])
+        self.assertTrue(rows)
+        self.assertEqual({row["vote_mode"] for row in rows} & {"Total"}, set())
+        self.assertIn("DEM", {row["party"] for row in rows})
+        self.assertTrue(all(row["precinct_id"].startswith("MI:WAYNE:") for row in rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from common import work_queue
+from common.work_queue import QueueServer, SocketQueue, SQLiteQueue, collect, result_path
+
+# A stand-in county parser: collect only needs RACES_DIRECTORY and merge_parsed_csvs
+FAKE_PARSER = '''
+import os
+RACES_DIRECTORY = "races"
+
+
+def merge_parsed_csvs(parsed_dir, output_file):
+    with open(output_file, "w") as merged:
+        for name in sorted(os.listdir(parsed_dir)):
+            with open(os.path.join(parsed_dir, name)) as page:
+                merged.write(page.read())
+'''
+
+
+def job(county="PA/test", pdf="RACE.pdf", first_page=1, last_page=2):
+    return {"county": county, "pdf": pdf, "first_page": first_page, "last_page": last_page}
+
+
+class SQLiteQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue = SQLiteQueue(os.path.join(self.directory, "queue.sqlite"))
+
+    def tearDown(self):
+        self.queue.connection.close()
+        shutil.rmtree(self.directory)
+
+    def test_lease_complete_results(self):
+        self.assertEqual(self.queue.put([job(), job(first_page=3, last_page=3)]), 2)
+        leased = self.queue.lease("worker-1")
+        self.assertEqual((leased["first_page"], leased["state"], leased["attempts"]), (1, "leased", 1))
+        self.assertNotEqual(self.queue.lease("worker-2")["id"], leased["id"])
+        self.assertIsNone(self.queue.lease("worker-3"))
+
+        self.assertTrue(self.queue.complete(leased["id"], "worker-1", {"parsed/RACE_page_1.csv": "a\n"}))
+        self.assertFalse(self.queue.complete(leased["id"], "worker-1", {}))  # Already done
+        [(done, results)] = self.queue.results("PA/test")
+        self.assertEqual(done["id"], leased["id"])
+        self.assertEqual(results, {"parsed/RACE_page_1.csv": "a\n"})
+        self.assertEqual(self.queue.status("PA/test"), {"done": 1, "leased": 1})
+
+    def test_expired_lease_is_requeued_then_failed(self):
+        self.queue.put([job()])
+        for attempt in range(1, work_queue.MAX_ATTEMPTS + 1):
+            leased = self.queue.lease("worker", lease_seconds=-1)
+            self.assertEqual(leased["attempts"], attempt)
+        self.assertIsNone(self.queue.lease("worker"))
+        [failed] = self.queue.failures("PA/test")
+        self.assertEqual(failed["error"], "lease expired")
+
+
+class QueueServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue = SQLiteQueue(os.path.join(self.directory, "queue.sqlite"))
+        self.server = QueueServer(("127.0.0.1", 0), self.queue, "secret")
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.port = self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.queue.connection.close()
+        shutil.rmtree(self.directory)
+
+    def test_round_trip_with_token(self):
+        client = SocketQueue("127.0.0.1", self.port, token="secret")
+        self.assertEqual(client.put([job()]), 1)
+        leased = client.lease("remote-1")
+        self.assertTrue(client.complete(leased["id"], "remote-1", {"parsed/RACE_page_1.csv": "a\n"}))
+        [(_, results)] = client.results("PA/test")
+        self.assertEqual(results, {"parsed/RACE_page_1.csv": "a\n"})
+
+    def test_wrong_or_missing_token_is_refused(self):
+        for token in ("wrong", ""):
+            with self.assertRaisesRegex(RuntimeError, "token"):
+                SocketQueue("127.0.0.1", self.port, token=token).put([job()])
+        self.assertEqual(self.queue.status(), {})
+
+    def test_clear_is_not_served(self):
+        client = SocketQueue("127.0.0.1", self.port, token="secret")
+        client.put([job()])
+        with self.assertRaises(AttributeError):
+            client.clear("PA/test")
+        with self.assertRaisesRegex(RuntimeError, "Unknown method clear"):
+            client.call("clear", "PA/test")
+        self.assertEqual(self.queue.status("PA/test"), {"pending": 1})
+
+    def test_server_needs_a_token(self):
+        with self.assertRaises(ValueError):
+            QueueServer(("127.0.0.1", 0), self.queue, "")
+
+
+class CollectTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.county_dir = os.path.join(self.root, "PA", "test")
+        os.makedirs(self.county_dir)
+        with open(os.path.join(self.county_dir, "parsepdf.py"), "w") as parser_file:
+            parser_file.write(FAKE_PARSER)
+        self.queue = SQLiteQueue(os.path.join(self.root, "queue.sqlite"))
+        patcher = mock.patch.object(work_queue, "REPO_ROOT", self.root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.queue.connection.close()
+        shutil.rmtree(self.root)
+
+    def finish(self, results, pdf="RACE.pdf"):
+        self.queue.put([job(pdf=pdf)])
+        leased = self.queue.lease("worker")
+        self.queue.complete(leased["id"], "worker", results)
+
+    def test_round_trip_writes_and_merges(self):
+        self.finish({"parsed/RACE_page_1.csv": "page 1\n", "parsed/RACE_page_2.csv": "page 2\n",
+                     "skipped/RACE_page_3.csv_table_1.csv": "times cast\n"})
+        self.assertEqual(collect(self.queue, self.county_dir), 0)
+        race_dir = os.path.join(self.county_dir, "races", "RACE")
+        with open(os.path.join(race_dir, "race.csv")) as merged:
+            self.assertEqual(merged.read(), "page 1\npage 2\n")
+        self.assertTrue(os.path.exists(os.path.join(race_dir, "skipped", "RACE_page_3.csv_table_1.csv")))
+
+    def test_paths_outside_the_race_directory_are_rejected(self):
+        outside = os.path.join(self.root, "outside.csv")
+        self.finish({"parsed/RACE_page_1.csv": "page 1\n", "../../../../outside.csv": "x",
+                     "parsed/../../../../../outside.csv": "x", outside: "x", "parsed/deeper/page.csv": "x",
+                     "races/RACE_page_2.csv": "x"})
+        collect(self.queue, self.county_dir)
+        self.assertFalse(os.path.exists(outside))
+        race_dir = os.path.join(self.county_dir, "races", "RACE")
+        written = sorted(os.path.relpath(os.path.join(path, name), race_dir)
+                         for path, _, names in os.walk(race_dir) for name in names)
+        self.assertEqual(written, ["parsed/RACE_page_1.csv", "race.csv"])
+
+    def test_race_pdf_outside_the_races_directory_is_rejected(self):
+        self.finish({"parsed/x.csv": "x"}, pdf="../../escape.pdf")
+        collect(self.queue, self.county_dir)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "escape")))
+
+    def test_result_path(self):
+        race_dir = os.path.join(self.root, "races", "RACE")
+        self.assertEqual(result_path(race_dir, "parsed/RACE_page_1.csv"),
+                         os.path.join(race_dir, "parsed", "RACE_page_1.csv"))
+        for bad_path in ("../x.csv", "parsed/..", "/etc/passwd", "parsed\\..\\..\\x.csv", "x.csv", "parsed/"):
+            with self.assertRaises(ValueError, msg=bad_path):
+                result_path(race_dir, bad_path)
+
+
+if __name__ == "__main__":
+    unittest.main()